@@ -3,7 +3,7 @@ API v1 router aggregation
 """
 
 from fastapi import APIRouter
-from app.api.v1.endpoints import devices, flows, system, websocket
+from app.api.v1.endpoints import devices, flows, metrics, system, websocket
 
 api_router = APIRouter()
 
@@ -11,4 +11,5 @@ api_router = APIRouter()
 api_router.include_router(devices.router, prefix="/devices", tags=["devices"])
 api_router.include_router(flows.router, prefix="/flows", tags=["flows"])
 api_router.include_router(system.router, prefix="/system", tags=["system"])
+api_router.include_router(metrics.router, tags=["metrics"])
 api_router.include_router(websocket.router, prefix="/ws", tags=["websocket"])
\ No newline at end of file
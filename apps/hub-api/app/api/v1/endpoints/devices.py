@@ -3,23 +3,82 @@ Device management endpoints
 """
 
 from typing import List, Optional, Dict, Any
+from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query, Body
 import structlog
 
-from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceList, DeviceStatus
+from app.core.responses import CodecJSONResponse
+from app.core.timing import TimedRoute
+from app.schemas.device import (
+    CapabilityQueryResponse,
+    DeviceCreate,
+    DeviceUpdate,
+    DeviceResponse,
+    DevicePage,
+    DeviceSort,
+    DeviceStatus,
+)
+from app.schemas.telemetry import TelemetryResolution, TelemetryResponse
 from app.services.device_service import device_service
+from app.services.nats_service import nats_service
+from app.services.telemetry_service import telemetry_store
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = structlog.get_logger()
 
 
-@router.get("/", response_model=DeviceList)
+@router.get("/", response_model=DevicePage)
 async def list_devices(
-    status: Optional[DeviceStatus] = Query(None, description="Filter by device status")
+    status: Optional[DeviceStatus] = Query(None, description="Filter by device status"),
+    type: Optional[str] = Query(None, description="Filter by device type"),
+    claimed: Optional[bool] = Query(None, description="Filter by claimed flag"),
+    capability: Optional[str] = Query(None, description="Filter by capability, e.g. motor or motor.differential"),
+    sort: DeviceSort = Query(DeviceSort.last_seen_desc, description="Order by last_seen"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of devices per page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,status"),
 ):
-    """List all discovered devices"""
-    devices = await device_service.list_devices(status=status)
-    return DeviceList(devices=devices, total=len(devices))
+    """List discovered devices, one page at a time"""
+    selected = None
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in DeviceResponse.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    try:
+        page = device_service.query_devices(
+            status=status,
+            type=type,
+            claimed=claimed,
+            capability=capability,
+            descending=sort == DeviceSort.last_seen_desc,
+            cursor=cursor,
+            limit=limit,
+            fields=selected,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Devices are already serialized; skip response model validation
+    return CodecJSONResponse(page)
+
+
+@router.get("/capabilities", response_model=CapabilityQueryResponse)
+async def query_capabilities(
+    require: List[str] = Query([], description="Required capabilities, e.g. motor.differential:v1.0"),
+    status: Optional[DeviceStatus] = Query(None, description="Only devices with this status"),
+):
+    """Find devices that provide every required capability"""
+    try:
+        devices = device_service.find_devices(require, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CapabilityQueryResponse(
+        requirements=require,
+        status=status,
+        devices=devices,
+        total=len(devices),
+    )
 
 
 @router.get("/{device_id}", response_model=DeviceResponse)
@@ -31,6 +90,33 @@ async def get_device(device_id: str):
     return device
 
 
+@router.get("/{device_id}/telemetry", response_model=TelemetryResponse)
+async def get_device_telemetry(
+    device_id: str,
+    schema: Optional[str] = Query(None, description="Filter by HAL schema id"),
+    field: Optional[str] = Query(None, description="Filter by field path, e.g. acceleration.x_meters_per_sec2"),
+    start_time: Optional[datetime] = Query(None, description="Start of the time range"),
+    end_time: Optional[datetime] = Query(None, description="End of the time range"),
+    resolution: TelemetryResolution = Query(TelemetryResolution.raw, description="Raw samples or rollup buckets"),
+    limit: Optional[int] = Query(None, ge=1, le=100000, description="Maximum number of most recent points per series"),
+):
+    """Query device telemetry history"""
+    # Every worker holds part of the samples; gather them all
+    series = await nats_service.query_telemetry(
+        device_id,
+        schema=schema,
+        field=field,
+        start=start_time.timestamp() if start_time else None,
+        end=end_time.timestamp() if end_time else None,
+        resolution=resolution.value,
+        limit=limit,
+    )
+    if not series and not telemetry_store.has_device(device_id) and not await device_service.get_device(device_id):
+        raise HTTPException(status_code=404, detail="Device not found")
+    # Columns are plain lists of floats; skip validating every sample
+    return CodecJSONResponse({"device_id": device_id, "resolution": resolution.value, "series": series})
+
+
 @router.post("/", response_model=DeviceResponse)
 async def create_device(device_data: DeviceCreate):
     """Register a new device"""
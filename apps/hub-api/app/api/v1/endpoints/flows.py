@@ -2,22 +2,23 @@
 Flow management endpoints for Node-RED integration
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Query, Body
 import structlog
 
-from app.schemas.flow import FlowCreate, FlowUpdate, FlowResponse, FlowDeploy
+from app.schemas.flow import FlowCreate, FlowUpdate, FlowResponse, FlowSummary, FlowDeploy, FlowDeploymentReport, FlowVersionInfo
 from app.services.flow_service import flow_service
+from app.core.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = structlog.get_logger()
 
 
-@router.get("/", response_model=List[FlowResponse])
+@router.get("/", response_model=List[FlowSummary])
 async def list_flows(
     deployed_only: bool = Query(False, description="Only show deployed flows")
 ):
-    """List available flows"""
+    """List available flows (without their configs)"""
     return await flow_service.list_flows(deployed_only=deployed_only)
 
 
@@ -30,6 +31,24 @@ async def get_flow(flow_id: str):
     return flow
 
 
+@router.get("/{flow_id}/versions", response_model=List[FlowVersionInfo])
+async def list_flow_versions(flow_id: str):
+    """List the stored versions of a flow"""
+    versions = await flow_service.get_versions(flow_id)
+    if versions is None:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    return versions
+
+
+@router.get("/{flow_id}/versions/{version}", response_model=Dict[str, Any])
+async def get_flow_version(flow_id: str, version: int):
+    """Get the config of one version of a flow"""
+    config = await flow_service.get_version_config(flow_id, version)
+    if config is None:
+        raise HTTPException(status_code=404, detail="Flow version not found")
+    return config
+
+
 @router.post("/", response_model=FlowResponse)
 async def create_flow(flow_data: FlowCreate):
     """Create a new flow"""
@@ -45,13 +64,22 @@ async def update_flow(flow_id: str, update_data: FlowUpdate):
     return flow
 
 
-@router.post("/{flow_id}/deploy", response_model=FlowResponse)
+@router.post("/{flow_id}/deploy", response_model=FlowDeploymentReport)
 async def deploy_flow(flow_id: str, deploy_data: FlowDeploy = Body(default=FlowDeploy())):
-    """Deploy flow to devices"""
-    flow = await flow_service.deploy_flow(flow_id, deploy_data.target_nodes)
-    if not flow:
-        raise HTTPException(status_code=404, detail="Flow not found")
-    return flow
+    """Deploy flow to devices and report which nodes confirmed it"""
+    report = await flow_service.deploy_flow(flow_id, deploy_data.target_nodes)
+    if not report:
+        raise HTTPException(status_code=404, detail="Flow not found or has no target nodes")
+    return report
+
+
+@router.get("/{flow_id}/deployment", response_model=FlowDeploymentReport)
+async def get_flow_deployment(flow_id: str):
+    """Get the report of the flow's most recent deployment"""
+    report = flow_service.get_deployment(flow_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Flow not found or never deployed")
+    return report
 
 
 @router.delete("/{flow_id}/undeploy", response_model=FlowResponse)
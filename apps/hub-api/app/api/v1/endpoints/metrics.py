@@ -0,0 +1,16 @@
+"""
+Prometheus metrics endpoint
+"""
+
+from fastapi import APIRouter, Response
+
+from app.core.metrics import CONTENT_TYPE_LATEST, render
+from app.core.timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=render(), media_type=CONTENT_TYPE_LATEST)
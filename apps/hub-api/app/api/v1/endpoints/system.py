@@ -2,103 +2,145 @@
 System management endpoints
 """
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from typing import Optional, List
 from datetime import datetime
 import structlog
-import platform
-import psutil
-import time
 
-from app.schemas.system import SystemInfo, HealthCheck, LogEntry, LogLevel
+from app.schemas.system import (
+    SystemInfo,
+    HealthCheck,
+    LogEntry,
+    LogLevel,
+    LogQuery,
+    IngestQueueStats,
+    SchemaRegistryStats,
+    DatabasePoolStats,
+    LivenessStats,
+    DiscoveryStats,
+    SharedStateStats,
+    LoopProfilerStats,
+)
 from app.core.config import settings
-from app.core.nats import nats_client
+from app.core.log_buffer import log_buffer
+from app.core.profiling import collapse, loop_profiler
+from app.core.timing import TimedRoute
+from app.db.session import pool_stats
+from app.services.discovery_service import discovery_coalescer
+from app.services.ingest_service import ingest_pipeline
+from app.services.liveness_service import liveness_service
+from app.services.schema_registry import schema_registry
+from app.services.shared_state import shared_state
+from app.services.system_monitor import system_monitor
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = structlog.get_logger()
 
-# Track startup time for uptime calculation
-STARTUP_TIME = time.time()
-
 
 @router.get("/info", response_model=SystemInfo)
 async def get_system_info():
-    """Get system information"""
-    memory = psutil.virtual_memory()
-    cpu_percent = psutil.cpu_percent(interval=0.1)
+    """Get system information
     
-    return SystemInfo(
-        version=settings.VERSION,
-        hostname=platform.node(),
-        platform=f"{platform.system()} {platform.release()}",
-        python_version=platform.python_version(),
-        uptime_seconds=time.time() - STARTUP_TIME,
-        memory_usage_mb=memory.used / 1024 / 1024,
-        cpu_percent=cpu_percent,
-        nats_connected=nats_client.is_connected,
-        redis_connected=False,  # TODO: Check Redis connection
-        database_connected=False,  # TODO: Check database connection
-    )
+    Served from the system monitor's last sample (every ``SYSTEM_SAMPLE_INTERVAL`` seconds).
+    """
+    return await system_monitor.info()
 
 
 @router.get("/health", response_model=HealthCheck)
 async def get_system_health():
-    """Get detailed system health"""
-    checks = {
-        "nats": nats_client.is_connected,
-        "api": True,  # We're responding, so API is healthy
-        "redis": False,  # TODO: Implement Redis health check
-        "database": False,  # TODO: Implement database health check
-    }
-    
-    # Determine overall status
-    if all(checks.values()):
-        status = "healthy"
-    elif any(checks.values()):
-        status = "degraded"
-    else:
-        status = "unhealthy"
+    """Get detailed system health
     
-    return HealthCheck(
-        status=status,
-        version=settings.VERSION,
-        checks=checks,
-    )
+    NATS, and the database and Redis when configured, are pinged in the
+    background; this returns the last result.
+    """
+    return await system_monitor.health()
 
 
 @router.get("/logs", response_model=List[LogEntry])
 async def get_system_logs(
     level: Optional[LogLevel] = Query(None, description="Filter by log level"),
-    module: Optional[str] = Query(None, description="Filter by module"),
+    module: Optional[str] = Query(None, description="Filter by module (includes submodules)"),
+    start_time: Optional[datetime] = Query(None, description="Only logs at or after this time (UTC)"),
+    end_time: Optional[datetime] = Query(None, description="Only logs before this time (UTC)"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of logs to return")
 ):
-    """Get recent system logs"""
-    # TODO: Implement actual log retrieval from structured logging
-    # For now, return sample data
-    sample_logs = [
-        LogEntry(
-            timestamp=datetime.utcnow(),
-            level=LogLevel.info,
-            message="System started successfully",
-            module="main",
-            metadata={"version": settings.VERSION}
-        ),
-        LogEntry(
-            timestamp=datetime.utcnow(),
-            level=LogLevel.info,
-            message="NATS connection established",
-            module="nats",
-            metadata={"url": settings.NATS_URL}
-        ),
-    ]
+    """Get recent system logs, newest first
     
-    # Apply filters
-    if level:
-        sample_logs = [log for log in sample_logs if log.level == level]
-    if module:
-        sample_logs = [log for log in sample_logs if log.module == module]
+    Served from the in-process log buffer (``LOG_BUFFER_SIZE`` events).
+    Subscribe to ``log.<level>.<module>`` topics on the events WebSocket to
+    tail new ones.
+    """
+    query = LogQuery(level=level, module=module, start_time=start_time, end_time=end_time, limit=limit)
+    return log_buffer.query(
+        level=query.level.value if query.level else None,
+        module=query.module,
+        start_time=query.start_time,
+        end_time=query.end_time,
+        limit=query.limit,
+    )
+
+
+@router.get("/ingest", response_model=List[IngestQueueStats])
+async def get_ingest_stats():
+    """Get telemetry ingest queue depth and drop counters"""
+    return ingest_pipeline.stats()
+
+
+@router.get("/liveness", response_model=List[LivenessStats])
+async def get_liveness_stats():
+    """Get device and node heartbeat tracking counters"""
+    return liveness_service.stats()
+
+
+@router.get("/discovery", response_model=DiscoveryStats)
+async def get_discovery_stats():
+    """Get mDNS announcement coalescing counters"""
+    return discovery_coalescer.stats()
+
+
+@router.get("/shared-state", response_model=SharedStateStats)
+async def get_shared_state_stats():
+    """Get registry sharing and broadcast counters between workers"""
+    return shared_state.stats()
+
+
+@router.get("/schemas", response_model=SchemaRegistryStats)
+async def get_schema_stats():
+    """Get HAL schema validation latency and failure counters"""
+    return schema_registry.stats()
+
+
+@router.get("/database", response_model=DatabasePoolStats)
+async def get_database_stats():
+    """Get database connection pool usage and checkout wait times"""
+    return pool_stats()
+
+
+@router.get("/loop", response_model=LoopProfilerStats)
+async def get_loop_stats():
+    """Get event-loop lag and the slow callbacks recorded by the loop profiler"""
+    return {**loop_profiler.stats(), "loop_lag_ms": system_monitor.loop_lag * 1000}
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    duration: float = Query(5.0, gt=0, description="Seconds to sample for"),
+    interval: float = Query(0.005, ge=0.001, le=1.0, description="Seconds between samples"),
+):
+    """Sample the event loop's stack and return collapsed stacks
     
-    return sample_logs[:limit]
+    One ``frame;frame;frame count`` line per distinct stack, for
+    flamegraph.pl, speedscope or inferno. Needs ``LOOP_PROFILING_ENABLED``;
+    ``duration`` is capped at ``PROFILE_MAX_DURATION``.
+    """
+    if not settings.LOOP_PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Loop profiling is disabled")
+    try:
+        stacks = await loop_profiler.profile(min(duration, settings.PROFILE_MAX_DURATION), interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(collapse(stacks))
 
 
 @router.post("/backup")
@@ -3,28 +3,35 @@ WebSocket endpoints for real-time communication
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Set
-import json
+from typing import Dict, Optional
 import structlog
 
+from app.core import codec
+from app.services.nats_bridge import SubjectNotAllowedError, nats_bridge
+from app.services.shared_state import shared_state
+from app.services.websocket_service import connection_manager
+
 router = APIRouter()
 logger = structlog.get_logger()
 
-# Active WebSocket connections
-active_connections: Set[WebSocket] = set()
-
 
 @router.websocket("/events")
 async def websocket_events(websocket: WebSocket):
-    """WebSocket endpoint for real-time events"""
+    """WebSocket endpoint for real-time events
+
+    Clients receive nothing until they subscribe to one or more topic
+    patterns (NATS-style wildcards, e.g. ``device.*.telemetry`` or ``>``).
+    ``nats.subscribe`` forwards raw NATS messages on a subject pattern as
+    ``{"type": "nats", "pattern": ..., "subject": ..., "data": ...}`` frames.
+    """
     await websocket.accept()
-    active_connections.add(websocket)
+    client = await connection_manager.connect(websocket)
     
     try:
         logger.info("WebSocket client connected")
         
         # Send initial connection message
-        await websocket.send_json({
+        client.send_json({
             "type": "connection",
             "status": "connected",
             "message": "Connected to Tafy Hub"
@@ -33,38 +40,73 @@ async def websocket_events(websocket: WebSocket):
         # Keep connection alive and handle messages
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = codec.loads(data)
             
             # Handle different message types
             if message.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                client.send_json({"type": "pong"})
             elif message.get("type") == "subscribe":
-                # TODO: Implement topic subscription
                 topic = message.get("topic")
+                if not topic:
+                    client.send_json({"type": "error", "message": "Missing topic"})
+                    continue
+                connection_manager.subscribe(client, topic, message.get("coalesce"))
                 logger.info("Client subscribed to topic", topic=topic)
-                await websocket.send_json({
+                client.send_json({
                     "type": "subscribed",
                     "topic": topic
                 })
+            elif message.get("type") == "unsubscribe":
+                topic = message.get("topic")
+                connection_manager.unsubscribe(client, topic)
+                client.send_json({
+                    "type": "unsubscribed",
+                    "topic": topic
+                })
+            elif message.get("type") == "nats.subscribe":
+                subject = message.get("subject", "")
+                try:
+                    await nats_bridge.add(client, subject, message.get("coalesce"))
+                except SubjectNotAllowedError:
+                    client.send_json({"type": "error", "message": "Subject not allowed", "subject": subject})
+                    continue
+                except Exception as e:
+                    logger.error("NATS bridge subscribe failed", subject=subject, error=str(e))
+                    client.send_json({"type": "error", "message": "Subscribe failed", "subject": subject})
+                    continue
+                client.send_json({
+                    "type": "nats.subscribed",
+                    "subject": subject
+                })
+            elif message.get("type") == "nats.unsubscribe":
+                subject = message.get("subject", "")
+                await nats_bridge.remove(client, subject)
+                client.send_json({
+                    "type": "nats.unsubscribed",
+                    "subject": subject
+                })
                 
     except WebSocketDisconnect:
         logger.info("WebSocket client disconnected")
     except Exception as e:
         logger.error("WebSocket error", error=str(e))
     finally:
-        active_connections.discard(websocket)
+        await nats_bridge.remove_client(client)
+        await connection_manager.disconnect(websocket)
 
 
-async def broadcast_event(event: Dict):
-    """Broadcast event to all connected WebSocket clients"""
-    disconnected = set()
-    
-    for connection in active_connections:
-        try:
-            await connection.send_json(event)
-        except:
-            disconnected.add(connection)
-            
-    # Remove disconnected clients
-    for conn in disconnected:
-        active_connections.discard(conn)
\ No newline at end of file
+async def broadcast_event(event: Dict, topic: Optional[str] = None) -> int:
+    """Broadcast event to WebSocket clients subscribed to its topic
+
+    The topic defaults to the event's ``type``. The event is serialized once
+    and queued for each matching client; slow clients never block the caller.
+    With several workers the serialized event is also handed to the others,
+    which forward it to their own clients. Returns the number of local
+    clients it was queued for.
+    """
+    topic = topic or event.get("type", "")
+    if not shared_state.enabled:
+        return connection_manager.broadcast(topic, event)
+    payload = codec.dumps_str(event)
+    await shared_state.broadcast(topic, payload)
+    return connection_manager.publish(topic, payload)
@@ -0,0 +1,100 @@
+"""
+JSON codec shared by the NATS, WebSocket and HTTP paths
+
+Uses orjson or msgspec when installed (``pip install ".[perf]"``) and falls
+back to the standard library. ``JSON_BACKEND`` selects a backend explicitly;
+the default ``auto`` picks the fastest one available.
+"""
+
+from typing import Any, Union
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+import json
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for types the backend does not handle natively"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (UUID, Decimal)):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_codec():
+    encoder = json.JSONEncoder(default=_default, separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(obj: Any) -> bytes:
+        return encoder.encode(obj).encode()
+
+    return dumps, json.loads, (ValueError,)
+
+
+def _orjson_codec():
+    import orjson
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=option)
+
+    return dumps, orjson.loads, (orjson.JSONDecodeError,)
+
+
+def _msgspec_codec():
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    decoder = msgspec.json.Decoder()
+    return encoder.encode, decoder.decode, (msgspec.DecodeError, ValueError)
+
+
+_BACKENDS = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "json": _stdlib_codec,
+}
+
+
+def _load_backend(name: str):
+    candidates = ["orjson", "msgspec", "json"] if name == "auto" else [name]
+    for candidate in candidates:
+        try:
+            return (candidate, *_BACKENDS[candidate]())
+        except ImportError:
+            if name != "auto":
+                logger.warning("JSON backend not installed, using stdlib", backend=candidate)
+    return ("json", *_stdlib_codec())
+
+
+BACKEND, _dumps, _loads, DecodeError = _load_backend(settings.JSON_BACKEND)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object as compact UTF-8 JSON bytes"""
+    return _dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode an object as a compact JSON string"""
+    return _dumps(obj).decode()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON from bytes or str; raises one of ``DecodeError`` on bad input"""
+    return _loads(data)
@@ -2,7 +2,7 @@
 Application configuration using Pydantic Settings
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl, field_validator
 
@@ -29,12 +29,84 @@ class Settings(BaseSettings):
     NATS_URL: str = "nats://localhost:4222"
     NATS_USER: Optional[str] = None
     NATS_PASSWORD: Optional[str] = None
-    
+    NATS_QUEUE_GROUP: str = "hub-api"  # workers split telemetry ingest through this queue group
+
+    # JSON codec backend: auto, orjson, msgspec or json
+    JSON_BACKEND: str = "auto"
+
+    # Telemetry ingest (batched, bounded per-subject queues)
+    INGEST_QUEUE_SIZE: int = 10000
+    INGEST_BATCH_SIZE: int = 256
+    INGEST_BATCH_INTERVAL: float = 0.05  # seconds
+    INGEST_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest, drop_newest or block
+
+    # Telemetry store (per device/schema/field ring buffers)
+    TELEMETRY_RAW_WINDOW: float = 60.0  # seconds of raw samples kept
+    TELEMETRY_RAW_CAPACITY: int = 6000  # max raw samples per series
+    TELEMETRY_RETENTION_1S: int = 900  # number of 1 s buckets kept
+    TELEMETRY_RETENTION_10S: int = 720  # number of 10 s buckets kept
+    TELEMETRY_RETENTION_1M: int = 1440  # number of 1 min buckets kept
+    TELEMETRY_MAX_SERIES: int = 10000
+    TELEMETRY_GATHER_TIMEOUT: float = 0.5  # seconds to wait for other workers' samples
+
+    # HAL schema validation (hal.v1.*.data and telemetry envelopes)
+    HAL_SCHEMAS_DIR: Optional[str] = None  # defaults to packages/hal-schemas/schemas in a checkout
+    SCHEMA_VALIDATION_ENABLED: bool = True
+    SCHEMA_VALIDATION_SAMPLE_EVERY: int = 1  # validate 1 in N messages per schema
+
+    # WebSocket fan-out
+    WS_CLIENT_QUEUE_SIZE: int = 1000
+    WS_COALESCE_TOPICS: List[str] = ["device.*.telemetry", "hal.v1.*.data"]
+    WS_NATS_ALLOWED_SUBJECTS: List[str] = ["device.>", "hal.>", "node.>", "hub.events.>"]
+
     # Database Settings (optional, can use NATS KV instead)
     DATABASE_URL: Optional[str] = None
     
+    # Async engine pool (asyncpg / aiosqlite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_QUERY_CACHE_SIZE: int = 500  # compiled SQL cache entries
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection
+    
+    # Liveness (devices and nodes go offline after missing heartbeats)
+    LIVENESS_DEVICE_TIMEOUT: float = 5.0  # seconds without a device heartbeat or status
+    LIVENESS_NODE_TIMEOUT: float = 30.0  # seconds without a node heartbeat (sent every 10 s)
+    LIVENESS_TICK: float = 0.5  # expiry resolution in seconds
+    
+    # mDNS discovery (announcements per instance are coalesced over this window)
+    DISCOVERY_COALESCE_WINDOW: float = 0.5  # seconds
+    
+    # Flow deployment (request/reply to every target node)
+    FLOW_DEPLOY_TIMEOUT: float = 5.0  # seconds to wait for each node's acknowledgement
+    FLOW_DEPLOY_CONCURRENCY: int = 256  # deploy requests in flight at once
+    
+    # Flow repository (configs are loaded on demand and cached)
+    FLOW_CONFIG_CACHE_SIZE: int = 64  # hot flow configs kept in memory
+    
+    # Device registry write-behind (only used when DATABASE_URL is set)
+    DEVICE_FLUSH_INTERVAL: float = 1.0  # seconds
+    DEVICE_FLUSH_BATCH_SIZE: int = 500
+    
+    # System monitor (/system/info and /system/health are served from its last sample)
+    SYSTEM_SAMPLE_INTERVAL: float = 5.0  # seconds between host stats and health check refreshes
+    SYSTEM_HEALTH_TIMEOUT: float = 2.0  # seconds each dependency gets to answer a health check
+    SYSTEM_LOOP_LAG_INTERVAL: float = 0.25  # seconds between event-loop lag probes
+    
+    # Event-loop profiling (opt-in: times every callback the loop runs)
+    LOOP_PROFILING_ENABLED: bool = False  # record slow callbacks and allow /system/profile
+    LOOP_SLOW_CALLBACK: float = 0.05  # seconds a callback may hold the loop before it is recorded
+    LOOP_SLOW_CALLBACK_HISTORY: int = 100  # slow callbacks kept for /system/loop
+    PROFILE_MAX_DURATION: float = 30.0  # longest sampling profile /system/profile will run
+    
     # Redis Settings (optional)
+    # Set to share registries and WebSocket events between several workers
     REDIS_URL: Optional[str] = None
+    REDIS_STATE_PREFIX: str = "hub"  # prefix of the registry hashes and pub/sub channels
+    REDIS_LEADER_TTL: float = 10.0  # seconds the leader lease lasts without renewal
+    REDIS_SEEN_INTERVAL: float = 2.0  # seconds between last_seen updates sent to other workers
     
     # Security Settings
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -44,6 +116,19 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"  # json or console
+    LOG_BUFFER_SIZE: int = 10000  # recent events kept for /system/logs and log.* WebSocket topics
+    LOG_ASYNC: bool = False  # render and write logs on a background thread
+    LOG_QUEUE_SIZE: int = 10000  # events waiting for the writer thread; newer ones are dropped
+    LOG_BATCH_SIZE: int = 256  # events rendered and written per write call
+    LOG_RATE_LIMIT: int = 0  # events per second per call site; 0 disables
+    LOG_RATE_LIMIT_LEVELS: List[str] = ["debug"]
+    # Path prefix -> fraction of requests logged (metrics still cover every request)
+    LOG_REQUEST_SAMPLING: Dict[str, float] = {
+        "/health": 0.0,
+        "/api/v1/health": 0.0,
+        "/api/v1/system/health": 0.0,
+        "/api/v1/metrics": 0.0,
+    }
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -3,11 +3,12 @@ Custom exceptions and error handlers
 """
 
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import structlog
 
+from app.core.responses import CodecJSONResponse
+
 logger = structlog.get_logger()
 
 
@@ -60,7 +61,7 @@ async def tafy_exception_handler(request: Request, exc: TafyException):
         path=request.url.path,
     )
     
-    return JSONResponse(
+    return CodecJSONResponse(
         status_code=exc.status_code,
         content={
             "error": exc.message,
@@ -78,7 +79,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         path=request.url.path,
     )
     
-    return JSONResponse(
+    return CodecJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "error": "Validation failed",
@@ -96,7 +97,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         path=request.url.path,
     )
     
-    return JSONResponse(
+    return CodecJSONResponse(
         status_code=exc.status_code,
         content={
             "error": exc.detail,
@@ -113,7 +114,7 @@ async def general_exception_handler(request: Request, exc: Exception):
         path=request.url.path,
     )
     
-    return JSONResponse(
+    return CodecJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": "Internal server error",
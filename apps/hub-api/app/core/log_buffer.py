@@ -0,0 +1,222 @@
+"""
+In-process ring buffer of recent log events
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from bisect import bisect_left
+from datetime import datetime, timezone
+import heapq
+import sys
+import threading
+import time
+
+from app.core.config import settings
+
+# Keys structlog adds that are stored as entry fields rather than metadata
+_RESERVED = ("event", "level", "logger", "timestamp")
+
+# Value types kept as-is in metadata; anything else is rendered with str()
+_PLAIN = (str, int, float, bool, type(None))
+
+# (timestamp, level, module, event, metadata)
+Entry = Tuple[float, str, str, Any, Dict[str, Any]]
+
+
+def _epoch(moment: datetime) -> float:
+    """POSIX timestamp of a datetime, reading naive ones as UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, _PLAIN):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    return str(value)
+
+
+class _SeqIndex:
+    """Ascending sequence numbers of the entries with one level or module"""
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def trim(self, oldest: int):
+        """Forget sequence numbers that have been overwritten in the ring"""
+        if self.head < len(self.seqs) and self.seqs[self.head] < oldest:
+            self.head = bisect_left(self.seqs, oldest, self.head)
+            if self.head > 1024 and self.head * 2 > len(self.seqs):
+                del self.seqs[:self.head]
+                self.head = 0
+
+    def newest_first(self, lo: int, hi: int) -> Iterator[int]:
+        """Sequence numbers in [lo, hi), newest first"""
+        start = bisect_left(self.seqs, lo, self.head)
+        end = bisect_left(self.seqs, hi, start)
+        for position in range(end - 1, start - 1, -1):
+            yield self.seqs[position]
+
+
+class LogBuffer:
+    """Bounded ring buffer of log events with level and module indexes
+
+    Used as a structlog processor: every event that passes the level filter
+    is stored as a tuple with interned level and module names, a float
+    timestamp and the raw event and key/value pairs; the message and
+    metadata are only rendered when read. Queries walk per-level or
+    per-module indexes of sequence numbers and binary-search the time range
+    (timestamps are assumed to grow with the sequence number), so filtered
+    reads never scan the whole buffer. Events are also offered to WebSocket
+    clients subscribed to ``log.<level>.<module>``.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._ring: List[Optional[Entry]] = [None] * capacity
+        self._next = 0
+        self._levels: Dict[str, _SeqIndex] = {}
+        self._modules: Dict[str, _SeqIndex] = {}
+        self._lock = threading.Lock()
+        self._loop_thread: Optional[int] = None
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    @property
+    def oldest(self) -> int:
+        """Sequence number of the oldest entry still in the ring"""
+        return max(0, self._next - self.capacity)
+
+    def stream_from(self, thread_id: int):
+        """Stream events logged on this thread (the event loop's) to WebSocket clients"""
+        self._loop_thread = thread_id
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        level = sys.intern(str(event_dict.get("level", method_name)))
+        module = sys.intern(str(event_dict.get("logger") or "root"))
+        metadata = {key: value for key, value in event_dict.items() if key not in _RESERVED}
+        self.append(time.time(), level, module, event_dict.get("event"), metadata)
+        return event_dict
+
+    def append(self, timestamp: float, level: str, module: str, event: Any, metadata: Dict[str, Any]):
+        """Store one event, overwriting the oldest when full"""
+        entry = (timestamp, level, module, event, metadata)
+        with self._lock:
+            seq = self._next
+            self._ring[seq % self.capacity] = entry
+            self._next = seq + 1
+            for indexes, key in ((self._levels, level), (self._modules, module)):
+                index = indexes.get(key)
+                if index is None:
+                    index = indexes[key] = _SeqIndex()
+                index.seqs.append(seq)
+            if seq % self.capacity == 0 and seq:
+                # Once per lap of the ring, drop index entries it overwrote
+                oldest = self.oldest
+                for index in (*self._levels.values(), *self._modules.values()):
+                    index.trim(oldest)
+
+        if self._loop_thread is not None and threading.get_ident() == self._loop_thread:
+            self._stream(entry)
+
+    def _stream(self, entry: Entry):
+        from app.services.websocket_service import connection_manager
+
+        if connection_manager.clients:
+            connection_manager.broadcast(f"log.{entry[1]}.{entry[2]}", {"type": "log", **self.render(entry)})
+
+    @staticmethod
+    def render(entry: Entry) -> Dict[str, Any]:
+        """An entry as LogEntry fields"""
+        timestamp, level, module, event, metadata = entry
+        return {
+            "timestamp": datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None),
+            "level": level,
+            "module": module,
+            "message": "" if event is None else str(event),
+            "metadata": _plain(metadata),
+        }
+
+    def _seq_at(self, timestamp: float, lo: int, hi: int) -> int:
+        """First sequence number in [lo, hi) logged at or after ``timestamp``"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ring[mid % self.capacity][0] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(
+        self,
+        level: Optional[str] = None,
+        module: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Newest matching entries first
+
+        ``module`` matches that module and its submodules; times are UTC.
+        """
+        with self._lock:
+            lo, hi = self.oldest, self._next
+            if start_time is not None:
+                lo = self._seq_at(_epoch(start_time), lo, hi)
+            if end_time is not None:
+                hi = self._seq_at(_epoch(end_time), lo, hi)
+
+            prefix = None if module is None else module + "."
+            entries = []
+            for seq in self._candidates(level, module, lo, hi):
+                entry = self._ring[seq % self.capacity]
+                if level is not None and entry[1] != level:
+                    continue
+                if module is not None and entry[2] != module and not entry[2].startswith(prefix):
+                    continue
+                entries.append(entry)
+                if len(entries) >= limit:
+                    break
+        return [self.render(entry) for entry in entries]
+
+    def _candidates(self, level: Optional[str], module: Optional[str], lo: int, hi: int) -> Iterable[int]:
+        """Sequence numbers worth checking, newest first, from the smaller index"""
+        if level is None and module is None:
+            return range(hi - 1, lo - 1, -1)
+
+        level_index = None if level is None else self._levels.get(level)
+        module_indexes = None
+        if module is not None:
+            prefix = module + "."
+            module_indexes = [
+                index for name, index in self._modules.items()
+                if name == module or name.startswith(prefix)
+            ]
+        if (level is not None and level_index is None) or module_indexes == []:
+            return ()
+
+        if module_indexes is None or (
+            level_index is not None and len(level_index) < sum(len(index) for index in module_indexes)
+        ):
+            return level_index.newest_first(lo, hi)
+        if len(module_indexes) == 1:
+            return module_indexes[0].newest_first(lo, hi)
+        return heapq.merge(*(index.newest_first(lo, hi) for index in module_indexes), reverse=True)
+
+    def modules(self) -> List[str]:
+        """Module names seen in the buffer"""
+        return sorted(self._modules)
+
+
+# Singleton instance
+log_buffer = LogBuffer(settings.LOG_BUFFER_SIZE)
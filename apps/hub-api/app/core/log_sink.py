@@ -0,0 +1,181 @@
+"""
+Non-blocking log output and per-call-site rate limiting for structlog
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+from datetime import datetime, timezone
+import queue
+import sys
+import threading
+import time
+import structlog
+
+from app.core.config import settings
+
+# Renders an event dict to one line, like structlog's JSONRenderer
+Renderer = Callable[[Any, str, Dict[str, Any]], str]
+
+_STOP = object()
+
+# Rate-limit windows kept before starting over
+_MAX_CALL_SITES = 10000
+
+
+class QueueLogSink:
+    """Last structlog processor in queue mode: hands events to a writer thread
+
+    The calling thread only puts the event dict on a bounded queue and
+    drops it from the processor chain. A background thread renders events
+    in batches and writes each batch to the stream with one call. When the
+    queue is full new events are dropped and counted, and the writer
+    reports the count in its next batch instead of blocking the event loop.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, stream: Optional[TextIO] = None):
+        self.batch_size = batch_size
+        self.stream = stream
+        self.renderer: Renderer = structlog.processors.JSONRenderer()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_size)
+        self._thread: Optional[threading.Thread] = None
+        self._reported_drops = 0
+
+        # Counters
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.render_errors = 0
+
+    @property
+    def depth(self) -> int:
+        """Events waiting to be written"""
+        return self._queue.qsize()
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(event_dict)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+        raise structlog.DropEvent
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Write everything queued so far and stop the writer thread"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is _STOP for item in batch)
+            self.write([item for item in batch if item is not _STOP])
+            if stop:
+                return
+
+    def write(self, events: List[Dict[str, Any]]):
+        """Render and write one batch"""
+        lines = []
+        for event_dict in events:
+            try:
+                lines.append(self.renderer(None, event_dict.get("level", "info"), event_dict))
+            except Exception:
+                self.render_errors += 1
+
+        dropped = self.dropped
+        if dropped != self._reported_drops:
+            lines.append(self.renderer(None, "warning", {
+                "event": "Log events dropped",
+                "level": "warning",
+                "logger": __name__,
+                "dropped": dropped - self._reported_drops,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }))
+            self._reported_drops = dropped
+
+        if not lines:
+            return
+        stream = self.stream or sys.stdout
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except Exception:
+            self.render_errors += 1
+            return
+        self.written += len(events)
+        self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counters"""
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "render_errors": self.render_errors,
+        }
+
+
+class CallsiteRateLimiter:
+    """Caps events per second from each call site at the given levels
+
+    A call site is identified by logger name and event message, which is
+    a literal at almost every call. The first event after a throttled
+    second carries ``suppressed`` with the number of events dropped.
+    """
+
+    def __init__(self, rate: int, levels: Iterable[str]):
+        self.rate = rate
+        self.levels = frozenset(levels)
+        # (logger, event) -> [window start, events, suppressed]
+        self._windows: Dict[Tuple[Any, Any], List[Any]] = {}
+
+        # Counters
+        self.suppressed = 0
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if self.rate <= 0 or method_name not in self.levels:
+            return event_dict
+        event = event_dict.get("event")
+        if not isinstance(event, str):
+            return event_dict
+
+        key = (event_dict.get("logger"), event)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= 1.0:
+            if window is not None and window[2]:
+                event_dict["suppressed"] = window[2]
+            elif window is None and len(self._windows) >= _MAX_CALL_SITES:
+                self._windows.clear()
+            window = self._windows[key] = [now, 0, 0]
+
+        if window[1] >= self.rate:
+            window[2] += 1
+            self.suppressed += 1
+            raise structlog.DropEvent
+        window[1] += 1
+        return event_dict
+
+
+# Singleton instances
+log_sink = QueueLogSink(settings.LOG_QUEUE_SIZE, settings.LOG_BATCH_SIZE)
+log_rate_limiter = CallsiteRateLimiter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_LIMIT_LEVELS)
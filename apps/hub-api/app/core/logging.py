@@ -3,12 +3,19 @@ Structured logging configuration
 """
 
 import structlog
+import atexit
 import logging
 from app.core.config import settings
+from app.core.log_buffer import log_buffer
+from app.core.log_sink import log_rate_limiter, log_sink
 
 
 def configure_logging():
-    """Configure structured logging for the application"""
+    """Configure structured logging for the application
+    
+    With ``LOG_ASYNC`` events are rendered and written by ``log_sink`` on a
+    background thread; otherwise they go through stdlib logging as before.
+    """
     
     # Set base log level
     logging.basicConfig(
@@ -16,21 +23,35 @@ def configure_logging():
         format="%(message)s",
     )
     
+    renderer = (
+        structlog.processors.JSONRenderer() if settings.LOG_FORMAT == "json"
+        else structlog.dev.ConsoleRenderer()
+    )
+    processors = [
+        structlog.stdlib.filter_by_level,
+        structlog.contextvars.merge_contextvars,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        log_rate_limiter,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        log_buffer,
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.UnicodeDecoder(),
+    ]
+    if settings.LOG_ASYNC:
+        log_sink.renderer = renderer
+        log_sink.start()
+        atexit.register(log_sink.stop)
+        processors.append(log_sink)
+    else:
+        processors.append(renderer)
+    
     # Configure structlog
     structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer() if settings.LOG_FORMAT == "json" 
-            else structlog.dev.ConsoleRenderer(),
-        ],
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         cache_logger_on_first_use=True,
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,147 @@
+"""
+Prometheus metrics for the hub's hot paths
+
+Latencies are histograms observed where the work happens. Everything else
+(NATS traffic, queue depths, registry sizes) is already counted by the
+services as plain attributes and only read when ``/metrics`` is scraped, so
+the message paths pay nothing extra for it.
+"""
+
+from typing import Iterator
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    GCCollector,
+    Histogram,
+    PlatformCollector,
+    ProcessCollector,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+PlatformCollector(registry=REGISTRY)
+GCCollector(registry=REGISTRY)
+
+# Requests that matched no route share one label value
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "hub_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=REGISTRY,
+)
+
+HTTP_REQUESTS = Counter(
+    "hub_http_requests",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+
+NATS_HANDLER_DURATION = Histogram(
+    "hub_nats_handler_duration_seconds",
+    "NATS handler latency per subscription (per batch for batched subscriptions)",
+    ["pattern"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+    registry=REGISTRY,
+)
+
+
+class HubCollector(Collector):
+    """Reads the services' own counters at scrape time"""
+
+    def collect(self) -> Iterator[Metric]:
+        from app.core.log_sink import log_rate_limiter, log_sink
+        from app.core.nats import nats_client
+        from app.services.device_service import device_service
+        from app.services.flow_service import flow_service
+        from app.services.ingest_service import ingest_pipeline
+        from app.services.nats_service import nats_service
+        from app.services.system_monitor import system_monitor
+        from app.services.websocket_service import connection_manager
+
+        messages = CounterMetricFamily(
+            "hub_nats_messages", "NATS messages by direction and subject pattern", labels=["direction", "pattern"]
+        )
+        payload_bytes = CounterMetricFamily(
+            "hub_nats_bytes", "NATS payload bytes by direction and subject pattern", labels=["direction", "pattern"]
+        )
+        decode_errors = CounterMetricFamily(
+            "hub_nats_decode_errors", "NATS messages that were not a valid JSON object", labels=["pattern"]
+        )
+        for pattern, traffic in nats_service.traffic().items():
+            messages.add_metric(["in", pattern], traffic["messages"])
+            payload_bytes.add_metric(["in", pattern], traffic["bytes"])
+            decode_errors.add_metric([pattern], traffic["decode_errors"])
+
+        queue_depth = GaugeMetricFamily(
+            "hub_ingest_queue_depth", "Messages waiting in a batched ingest queue", labels=["pattern"]
+        )
+        dropped = CounterMetricFamily(
+            "hub_ingest_dropped", "Messages dropped by a full ingest queue", labels=["pattern"]
+        )
+        for queue in ingest_pipeline.stats():
+            pattern = queue["subject"]
+            messages.add_metric(["in", pattern], queue["received"])
+            payload_bytes.add_metric(["in", pattern], queue["bytes_received"])
+            decode_errors.add_metric([pattern], queue["decode_errors"])
+            queue_depth.add_metric([pattern], queue["depth"])
+            dropped.add_metric([pattern], queue["dropped"])
+
+        for pattern, count in nats_client.sent_messages.items():
+            messages.add_metric(["out", pattern], count)
+            payload_bytes.add_metric(["out", pattern], nats_client.sent_bytes[pattern])
+
+        yield messages
+        yield payload_bytes
+        yield decode_errors
+        yield queue_depth
+        yield dropped
+
+        depths = [client.queue_depth for client in connection_manager.clients.values()]
+        yield GaugeMetricFamily("hub_websocket_clients", "Connected WebSocket clients", value=len(depths))
+        yield GaugeMetricFamily(
+            "hub_websocket_queue_depth", "Events queued for all WebSocket clients", value=sum(depths)
+        )
+        yield GaugeMetricFamily(
+            "hub_websocket_queue_depth_max", "Events queued for the slowest WebSocket client", value=max(depths, default=0)
+        )
+
+        devices = GaugeMetricFamily("hub_devices", "Registered devices by status", labels=["status"])
+        for status, count in device_service.status_counts().items():
+            devices.add_metric([status], count)
+        yield devices
+
+        dropped_logs = CounterMetricFamily(
+            "hub_log_events_dropped", "Log events not written", labels=["reason"]
+        )
+        dropped_logs.add_metric(["queue_full"], log_sink.dropped)
+        dropped_logs.add_metric(["rate_limited"], log_rate_limiter.suppressed)
+        yield dropped_logs
+        yield GaugeMetricFamily("hub_log_queue_depth", "Log events waiting for the writer thread", value=log_sink.depth)
+
+        yield GaugeMetricFamily(
+            "hub_event_loop_lag_seconds", "How late the event loop ran the last lag probe", value=system_monitor.loop_lag
+        )
+
+        flows = flow_service.stats()
+        yield GaugeMetricFamily("hub_flows", "Flows in the registry", value=flows["flows"])
+        yield GaugeMetricFamily("hub_flows_deployed", "Deployed flows", value=flows["deployed"])
+        yield GaugeMetricFamily(
+            "hub_flow_config_cache_size", "Flow configs in the LRU cache", value=flows["config_cache"]["size"]
+        )
+
+
+REGISTRY.register(HubCollector())
+
+
+def render() -> bytes:
+    """Current metrics in the Prometheus text format"""
+    return generate_latest(REGISTRY)
+
@@ -4,12 +4,28 @@ NATS client singleton for the application
 
 import nats
 from nats.js import JetStreamContext
-from typing import Optional
+from typing import Any, Dict, Optional
+from functools import lru_cache
+import time
 import structlog
+from app.core import codec
 from app.core.config import settings
 
 logger = structlog.get_logger()
 
+# Subject prefixes whose second token is a device or node id
+_ID_PREFIXES = ("device", "node")
+
+
+@lru_cache(maxsize=4096)
+def subject_pattern(subject: str) -> str:
+    """Collapse the id in ``device.<id>.*`` and ``node.<id>.*`` subjects to ``*``"""
+    tokens = subject.split(".")
+    if len(tokens) > 2 and tokens[0] in _ID_PREFIXES:
+        tokens[1] = "*"
+        return ".".join(tokens)
+    return subject
+
 
 class NATSClient:
     """NATS client wrapper with connection management"""
@@ -18,6 +34,10 @@ class NATSClient:
         self.nc: Optional[nats.NATS] = None
         self.js: Optional[JetStreamContext] = None
         
+        # Outbound traffic per subject pattern
+        self.sent_messages: Dict[str, int] = {}
+        self.sent_bytes: Dict[str, int] = {}
+        
     async def connect(self):
         """Connect to NATS server"""
         try:
@@ -51,11 +71,41 @@ class NATSClient:
         """Check if connected to NATS"""
         return self.nc is not None and self.nc.is_connected
         
-    async def publish(self, subject: str, data: bytes):
-        """Publish message to subject"""
+    async def rtt(self, timeout: float = 2.0) -> float:
+        """Round-trip time to the server in seconds (a PING/PONG via flush)"""
+        if not self.is_connected:
+            raise RuntimeError("NATS not connected")
+        start = time.perf_counter()
+        await self.nc.flush(timeout=timeout)
+        return time.perf_counter() - start
+        
+    async def publish(self, subject: str, data: Any, reply: Optional[str] = None):
+        """Publish message to subject, JSON-encoding anything that isn't bytes"""
+        if not self.is_connected:
+            raise RuntimeError("NATS not connected")
+        if not isinstance(data, (bytes, bytearray)):
+            data = codec.dumps(data)
+        await self.nc.publish(subject, data, reply=reply or "")
+        self._count_sent(subject, data)
+        
+    async def request(self, subject: str, data: Any, timeout: float) -> Any:
+        """Send a request and decode the JSON reply
+        
+        Raises ``nats.errors.TimeoutError`` when no reply arrives in time and
+        ``nats.errors.NoRespondersError`` when nobody is subscribed.
+        """
         if not self.is_connected:
             raise RuntimeError("NATS not connected")
-        await self.nc.publish(subject, data)
+        if not isinstance(data, (bytes, bytearray)):
+            data = codec.dumps(data)
+        self._count_sent(subject, data)
+        msg = await self.nc.request(subject, data, timeout=timeout)
+        return codec.loads(msg.data)
+        
+    def _count_sent(self, subject: str, data: bytes):
+        pattern = subject_pattern(subject)
+        self.sent_messages[pattern] = self.sent_messages.get(pattern, 0) + 1
+        self.sent_bytes[pattern] = self.sent_bytes.get(pattern, 0) + len(data)
         
     async def subscribe(self, subject: str, callback):
         """Subscribe to subject with callback"""
@@ -0,0 +1,199 @@
+"""
+Opt-in event-loop profiling: slow callbacks and sampled stacks
+"""
+
+from typing import Any, Callable, Deque, Dict, List, Optional
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+import asyncio
+import os
+import sys
+import threading
+import time
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# What the current task is running, e.g. "nats device.*.status" or
+# "GET /api/v1/devices/{device_id}". Set by the NATS handler wrappers, the
+# ingest queues and TimedRoute; tasks that serve one thing set it once and
+# leave it, so it is still set when the step that blocked the loop returns.
+current_operation: ContextVar[Optional[str]] = ContextVar("current_operation", default=None)
+
+
+def describe_callback(callback: Callable[..., Any]) -> str:
+    """Stable name for an event-loop callback (a task step names its coroutine)"""
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        callback = task.get_coro()
+        return f"task {getattr(callback, '__qualname__', type(callback).__qualname__)}"
+    return getattr(callback, "__qualname__", None) or type(callback).__qualname__
+
+
+def _frame_name(code: Any) -> str:
+    path = code.co_filename.split(os.sep)
+    return f"{code.co_qualname} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def sample_stacks(thread_id: int, duration: float, interval: float) -> Counter[str]:
+    """Sample one thread's Python stack every ``interval`` seconds for ``duration``
+
+    Returns collapsed stacks (outermost frame first, joined with ``;``)
+    with the number of samples each was seen in.
+    """
+    stacks: Counter[str] = Counter()
+    names: Dict[Any, str] = {}
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            break
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = _frame_name(code)
+            frames.append(name)
+            frame = frame.f_back
+        frames.reverse()
+        stacks[";".join(frames)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+class LoopProfiler:
+    """Records event-loop callbacks that hold the loop longer than ``threshold``
+
+    ``install`` wraps ``asyncio.Handle._run``, which every callback and
+    task step on the standard asyncio loop goes through, so each one is
+    timed with two ``perf_counter`` calls. A slow one is named by the
+    ``current_operation`` of its task (the NATS subscription or route),
+    falling back to the callback or coroutine name, and is logged as a
+    warning. uvloop runs callbacks in C, so nothing is recorded under it;
+    run uvicorn with ``--loop asyncio`` to profile. ``profile`` samples the
+    loop thread's stack from another thread and works on any loop.
+    """
+
+    def __init__(self, threshold: float, history: int):
+        self.threshold = threshold
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=history)
+        # operation -> [count, total seconds, max seconds]
+        self._operations: Dict[str, List[Any]] = {}
+        self._original_run: Optional[Callable[[asyncio.Handle], None]] = None
+        self._profile_lock = threading.Lock()
+
+        # Counters
+        self.slow_callbacks = 0
+        self.profiles = 0
+
+    @property
+    def installed(self) -> bool:
+        return self._original_run is not None
+
+    @property
+    def profiling(self) -> bool:
+        """Whether a sampling profile is running"""
+        return self._profile_lock.locked()
+
+    def install(self):
+        """Start timing every callback run by asyncio event loops"""
+        if self.installed:
+            return
+        try:
+            if not isinstance(asyncio.get_running_loop(), asyncio.BaseEventLoop):
+                logger.warning("Event loop does not run asyncio handles; slow callbacks will not be recorded")
+        except RuntimeError:
+            pass
+
+        original = self._original_run = asyncio.Handle._run
+        threshold = self.threshold
+        clock = time.perf_counter
+
+        def _run(handle: asyncio.Handle):
+            start = clock()
+            original(handle)
+            duration = clock() - start
+            if duration >= threshold:
+                self.record(handle, duration)
+
+        asyncio.Handle._run = _run
+
+    def uninstall(self):
+        """Stop timing callbacks"""
+        if self._original_run is not None:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+
+    def record(self, handle: asyncio.Handle, duration: float):
+        """Record one slow callback"""
+        callback = describe_callback(handle._callback)
+        operation = handle._context.get(current_operation) or callback
+        totals = self._operations.get(operation)
+        if totals is None:
+            totals = self._operations[operation] = [0, 0.0, 0.0]
+        totals[0] += 1
+        totals[1] += duration
+        totals[2] = max(totals[2], duration)
+        self.slow_callbacks += 1
+        self.recent.append({
+            "operation": operation,
+            "callback": callback,
+            "duration_ms": duration * 1000,
+            "timestamp": datetime.utcnow(),
+        })
+        logger.warning(
+            "Slow event loop callback",
+            operation=operation,
+            callback=callback,
+            duration_ms=round(duration * 1000, 2),
+        )
+
+    async def profile(self, duration: float, interval: float) -> Counter[str]:
+        """Sample the calling loop's stack from a thread; one profile at a time
+
+        Raises ``RuntimeError`` when a profile is already running.
+        """
+        if not self._profile_lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            thread_id = threading.get_ident()
+            stacks = await asyncio.to_thread(sample_stacks, thread_id, duration, interval)
+            self.profiles += 1
+            return stacks
+        finally:
+            self._profile_lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Slow callback counters, slowest operations first, and the latest ones"""
+        operations = [
+            {
+                "operation": operation,
+                "count": count,
+                "total_ms": total * 1000,
+                "max_ms": longest * 1000,
+            }
+            for operation, (count, total, longest) in self._operations.items()
+        ]
+        operations.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "enabled": self.installed,
+            "threshold_ms": self.threshold * 1000,
+            "slow_callbacks": self.slow_callbacks,
+            "profiles": self.profiles,
+            "profiling": self.profiling,
+            "operations": operations,
+            "recent": list(reversed(self.recent)),
+        }
+
+
+def collapse(stacks: Counter[str]) -> str:
+    """Collapsed-stack text (``frame;frame;frame count`` lines) for flamegraph tools"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# Singleton instance
+loop_profiler = LoopProfiler(settings.LOOP_SLOW_CALLBACK, settings.LOOP_SLOW_CALLBACK_HISTORY)
@@ -0,0 +1,15 @@
+"""
+Response classes backed by the shared JSON codec
+"""
+
+from typing import Any
+from fastapi.responses import JSONResponse
+
+from app.core import codec
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSON response rendered with the configured codec backend"""
+
+    def render(self, content: Any) -> bytes:
+        return codec.dumps(content)
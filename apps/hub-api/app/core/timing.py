@@ -0,0 +1,104 @@
+"""
+Per-request timing phases for the Server-Timing header
+"""
+
+from typing import Any, Callable, Optional
+from contextvars import ContextVar
+import asyncio
+import functools
+import time
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.profiling import current_operation
+
+
+class RequestTiming:
+    """perf_counter marks taken as a request moves through the app
+
+    ``LoggingMiddleware`` creates one per request; ``TimedRoute`` marks when
+    the route starts and when the endpoint starts and returns. Phases:
+
+    - routing: route matching, request parsing and dependencies
+    - handler: the endpoint itself
+    - serialization: response model validation and encoding
+    - middleware: everything else before the response starts
+    """
+
+    __slots__ = ("start", "route", "handler_start", "handler_end", "response")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.route: Optional[float] = None
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+        self.response: Optional[float] = None
+
+    def phases(self) -> dict:
+        """Phase durations in milliseconds, up to the start of the response"""
+        end = self.response or time.perf_counter()
+        total = (end - self.start) * 1000
+        phases = {}
+        if self.route is not None and self.handler_start is not None and self.handler_end is not None:
+            phases["routing"] = (self.handler_start - self.route) * 1000
+            phases["handler"] = (self.handler_end - self.handler_start) * 1000
+            phases["serialization"] = (end - self.handler_end) * 1000
+        phases["middleware"] = total - sum(phases.values())
+        phases["total"] = total
+        return phases
+
+    def header(self) -> str:
+        """Server-Timing header value"""
+        return ", ".join(f"{name};dur={duration:.3f}" for name, duration in self.phases().items())
+
+
+# Timing of the request being handled
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_timing", default=None)
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap an endpoint to mark when it starts and returns, keeping its signature"""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            timing = current_timing.get()
+            if timing is None:
+                return await endpoint(*args, **kwargs)
+            timing.handler_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timing.handler_end = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            timing = current_timing.get()
+            if timing is None:
+                return endpoint(*args, **kwargs)
+            timing.handler_start = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                timing.handler_end = time.perf_counter()
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records routing, handler and serialization phases"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+        operation = f"{','.join(sorted(self.methods or ()))} {self.path}"
+
+        async def timed_handler(request: Request) -> Response:
+            current_operation.set(operation)
+            timing = current_timing.get()
+            if timing is not None:
+                timing.route = time.perf_counter()
+            return await handler(request)
+
+        return timed_handler
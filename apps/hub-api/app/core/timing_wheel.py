@@ -0,0 +1,79 @@
+"""
+Hashed timing wheel for bulk expiry
+"""
+
+from typing import Dict, Hashable, List, Optional
+import math
+
+
+class TimingWheel:
+    """Hashed timing wheel keyed by arbitrary hashable keys
+
+    Deadlines are hashed into ``slots`` buckets of ``tick`` seconds, so
+    scheduling and cancelling are O(1) and ``advance`` only visits the
+    buckets for ticks that have passed. Deadlines more than one rotation
+    away stay in their bucket until their own tick comes round. Keys expire
+    up to one ``tick`` late. The wheel has no timer of its own: the owner
+    calls ``advance`` with the current time, typically from one loop task.
+    """
+
+    def __init__(self, tick: float, slots: int = 512, start: float = 0.0):
+        self.tick = tick
+        self._slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._origin = start
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot_of
+
+    def _tick_at(self, when: float) -> int:
+        return math.ceil((when - self._origin) / self.tick)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Expire ``key`` at ``deadline``, replacing any earlier schedule"""
+        self.cancel(key)
+        target = max(self._cursor + 1, self._tick_at(deadline))
+        slot = target % len(self._slots)
+        self._slots[slot][key] = target
+        self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        """Remove a key; returns False if it was not scheduled"""
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """Scheduled expiry time of a key (rounded up to its tick)"""
+        slot = self._slot_of.get(key)
+        if slot is None:
+            return None
+        return self._origin + self._slots[slot][key] * self.tick
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move the wheel to ``now`` and return the keys that expired"""
+        current = int((now - self._origin) / self.tick)
+        if current <= self._cursor:
+            return []
+
+        # After a long pause every bucket needs at most one visit
+        first = max(self._cursor + 1, current - len(self._slots) + 1)
+        self._cursor = current
+
+        expired: List[Hashable] = []
+        for tick in range(first, current + 1):
+            bucket = self._slots[tick % len(self._slots)]
+            if not bucket:
+                continue
+            due = [key for key, target in bucket.items() if target <= current]
+            for key in due:
+                del bucket[key]
+                del self._slot_of[key]
+            expired.extend(due)
+        return expired
@@ -1,7 +1,7 @@
 """Database base imports."""
 
-from app.db.base_class import Base
+from app.models.base import Base
 from app.models.device import Device
-from app.models.flow import Flow
+from app.models.flow import Flow, FlowElement, FlowVersion
 
-__all__ = ["Base", "Device", "Flow"]
\ No newline at end of file
+__all__ = ["Base", "Device", "Flow", "FlowElement", "FlowVersion"]
\ No newline at end of file
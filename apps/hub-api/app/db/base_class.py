@@ -1,5 +0,0 @@
-"""Database base class."""
-
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
\ No newline at end of file
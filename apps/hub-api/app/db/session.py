@@ -2,34 +2,152 @@
 Database session configuration
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import Any, AsyncGenerator, Dict, Optional
+import time
 
 from app.core.config import settings
 
-# Create engine only if database URL is configured
-engine = None
-SessionLocal = None
+# Async drivers for the URL schemes we accept
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Map a database URL to its async driver (asyncpg or aiosqlite)"""
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+class PoolMetrics:
+    """Connection pool wait time and timeout counters"""
+
+    def __init__(self):
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        """Record one connection checkout"""
+        self.waits += 1
+        self.total_wait += seconds
+        if seconds > self.max_wait:
+            self.max_wait = seconds
+        if timed_out:
+            self.timeouts += 1
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out)
+
+
+def create_hub_async_engine(url: str) -> AsyncEngine:
+    """Create the async engine with the configured pool and statement caching"""
+    async_url = async_database_url(url)
+    options: Dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+        "echo": False,
+    }
+
+    if not async_url.startswith("sqlite"):
+        # SQLite picks its own pool; sizing only applies to server databases
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    if async_url.startswith("postgresql+asyncpg"):
+        # asyncpg prepares statements per connection; keep them cached
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+
+    return create_async_engine(async_url, **options)
+
+
+# Create the engine only if database URL is configured
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
 
 if settings.DATABASE_URL:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        pool_pre_ping=True,
-        echo=False,
-    )
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_hub_async_engine(settings.DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 
-def get_db() -> Generator:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Database dependency to be used in FastAPI endpoints
+    Async database dependency; does not block the event loop
     """
-    if SessionLocal is None:
+    if AsyncSessionLocal is None:
         raise RuntimeError("Database not configured. Set DATABASE_URL in environment.")
-    
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def ping_database() -> bool:
+    """Run ``SELECT 1`` on a pooled connection"""
+    if async_engine is None:
+        return False
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return True
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Async engine pool usage and checkout wait times"""
+    stats: Dict[str, Any] = {
+        "configured": async_engine is not None,
+        "pool_class": None,
+        "size": None,
+        "checked_out": None,
+        "checked_in": None,
+        "overflow": None,
+        "waits": pool_metrics.waits,
+        "timeouts": pool_metrics.timeouts,
+        "avg_wait_ms": pool_metrics.total_wait / pool_metrics.waits * 1000 if pool_metrics.waits else 0.0,
+        "max_wait_ms": pool_metrics.max_wait * 1000,
+    }
+    if async_engine is None:
+        return stats
+
+    pool = async_engine.pool
+    stats["pool_class"] = type(pool).__name__
+    for key, method in (
+        ("size", "size"),
+        ("checked_out", "checkedout"),
+        ("checked_in", "checkedin"),
+        ("overflow", "overflow"),
+    ):
+        if hasattr(pool, method):
+            stats[key] = getattr(pool, method)()
+    return stats
@@ -4,13 +4,28 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.log_buffer import log_buffer
+from app.core.profiling import loop_profiler
+from app.core.logging import configure_logging
+from app.core.responses import CodecJSONResponse
 from app.middleware.logging import LoggingMiddleware
 from app.api.v1.api import api_router
 from app.core.exceptions import add_exception_handlers
 from app.core.nats import nats_client
+from app.db.init_db import init_db
+from app.services.device_service import device_service
+from app.services.discovery_service import discovery_coalescer
+from app.services.flow_service import flow_service
+from app.services.liveness_service import liveness_service
 from app.services.nats_service import nats_service
+from app.services.schema_registry import schema_registry
+from app.services.shared_state import shared_state
+from app.services.system_monitor import system_monitor
+from app.services.websocket_service import connection_manager
 import structlog
+import threading
 
+configure_logging()
 logger = structlog.get_logger()
 
 
@@ -19,6 +34,7 @@ app = FastAPI(
     description="API for Tafy Studio Robot Hub",
     version="0.0.1",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=CodecJSONResponse,
 )
 
 # Set up CORS
@@ -55,30 +71,58 @@ async def startup_event():
     """Startup event handler."""
     logger.info("Starting Tafy Hub API")
     
+    # Tail logs logged on the event loop to log.* WebSocket subscribers
+    log_buffer.stream_from(threading.get_ident())
+    
+    # Compile HAL schemas before any messages arrive
+    if settings.SCHEMA_VALIDATION_ENABLED:
+        schema_registry.load(settings.HAL_SCHEMAS_DIR)
+    
+    # Share registries and WebSocket events with other workers (if Redis is configured)
+    await shared_state.start()
+    shared_state.on_broadcast(connection_manager.publish)
+    
+    # Initialize database and load the device registry (if configured)
+    await init_db()
+    await device_service.start()
+    await flow_service.start()
+    
     # Initialize NATS connection
     try:
         await nats_client.connect()
         logger.info("Connected to NATS")
         
-        # Set up standard subscriptions
+        # Set up standard subscriptions (the leader also starts liveness tracking)
         await nats_service.setup_standard_subscriptions()
         logger.info("NATS subscriptions initialized")
     except Exception as e:
         logger.error("Failed to connect to NATS", error=str(e))
         # Continue running without NATS for development
     
-    # Initialize database (if needed)
-    # from app.db.init_db import init_db
-    # await init_db()
+    # Sample system stats and dependency health in the background
+    system_monitor.start()
+    
+    # Time every event-loop callback and record the slow ones (opt-in)
+    if settings.LOOP_PROFILING_ENABLED:
+        loop_profiler.install()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event handler."""
     logger.info("Shutting down Tafy Hub API")
+    await system_monitor.stop()
+    loop_profiler.uninstall()
     
-    # Close NATS connection
+    # Stop subscriptions, ingest queues and pending discovery, then close NATS connection
+    await nats_service.close()
+    await discovery_coalescer.stop()
     await nats_client.close()
     
+    # Stop liveness checks and flush pending device writes
+    await liveness_service.stop()
+    await device_service.stop()
+    await shared_state.stop()
+    
     # Clean up resources
     logger.info("Cleanup complete")
\ No newline at end of file
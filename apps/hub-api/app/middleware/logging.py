@@ -2,56 +2,132 @@
 Request logging middleware
 """
 
+import itertools
+import os
+import random
 import time
-import uuid
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import structlog
 
+from app.core.config import settings
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, UNMATCHED_ROUTE
+from app.core.timing import RequestTiming, current_timing
+
 logger = structlog.get_logger()
 
+# Request ids are a random per-process prefix and a counter: unique across
+# workers and restarts, without the cost of a uuid4 per request
+_ID_PREFIX = os.urandom(4).hex()
+_ids = itertools.count(1)
+
+
+def next_request_id() -> str:
+    """Cheap unique request id"""
+    return f"{_ID_PREFIX}-{next(_ids):x}"
+
+
+def log_sample_rate(path: str) -> float:
+    """Fraction of requests to a path that are logged (longest matching prefix wins)"""
+    rate = 1.0
+    matched = -1
+    for prefix, prefix_rate in settings.LOG_REQUEST_SAMPLING.items():
+        if len(prefix) > matched and (path == prefix or path.startswith(prefix.rstrip("/") + "/")):
+            rate, matched = prefix_rate, len(prefix)
+    return rate
+
+
+class LoggingMiddleware:
+    """Pure ASGI middleware for request ids, timing, metrics and logging
+
+    Binds ``request_id`` for structlog, adds ``X-Request-ID`` and
+    ``Server-Timing`` (see ``RequestTiming``) response headers and records
+    request metrics. Requests are logged subject to ``LOG_REQUEST_SAMPLING``,
+    so health checks and scrapes stay out of the logs. An incoming
+    ``X-Request-ID`` header is kept.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._sample_rates: dict = {}
+        # (method, route, status) -> (latency histogram, request counter) children
+        self._series: dict = {}
+
+    def _should_log(self, path: str) -> bool:
+        rate = self._sample_rates.get(path)
+        if rate is None:
+            rate = log_sample_rate(path)
+            if len(self._sample_rates) < 1024:
+                self._sample_rates[path] = rate
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        timing_token = current_timing.set(timing)
+        request_id = _header(scope, b"x-request-id")
+        if not request_id or len(request_id) > 128:
+            request_id = next_request_id()
+        context_tokens = structlog.contextvars.bind_contextvars(request_id=request_id)
+        method = scope["method"]
+        path = scope["path"]
+        should_log = self._should_log(path)
+        status_code = 500
+
+        if should_log:
+            client = scope.get("client")
+            logger.info(
+                "Request started",
+                method=method,
+                path=path,
+                client=client[0] if client else None,
+            )
+
+        async def send_with_headers(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                timing.response = time.perf_counter()
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                headers.append("Server-Timing", timing.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            duration = time.perf_counter() - timing.start
+
+            # Label by route template, so /devices/{device_id} is one series
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            series = self._series.get((method, route, status_code))
+            if series is None:
+                series = self._series[(method, route, status_code)] = (
+                    HTTP_REQUEST_DURATION.labels(method, route),
+                    HTTP_REQUESTS.labels(method, route, str(status_code)),
+                )
+            series[0].observe(duration)
+            series[1].inc()
+
+            if should_log:
+                logger.info(
+                    "Request completed",
+                    method=method,
+                    path=path,
+                    status_code=status_code,
+                    duration_ms=round(duration * 1000, 2),
+                )
+
+            structlog.contextvars.reset_contextvars(**context_tokens)
+            current_timing.reset(timing_token)
+
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging all requests"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Generate request ID
-        request_id = str(uuid.uuid4())
-        
-        # Add request ID to context
-        structlog.contextvars.bind_contextvars(request_id=request_id)
-        
-        # Log request
-        logger.info(
-            "Request started",
-            method=request.method,
-            path=request.url.path,
-            client=request.client.host if request.client else None,
-        )
-        
-        # Time the request
-        start_time = time.time()
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Calculate duration
-        duration = time.time() - start_time
-        
-        # Log response
-        logger.info(
-            "Request completed",
-            method=request.method,
-            path=request.url.path,
-            status_code=response.status_code,
-            duration_ms=round(duration * 1000, 2),
-        )
-        
-        # Add request ID to response headers
-        response.headers["X-Request-ID"] = request_id
-        
-        # Clear context
-        structlog.contextvars.clear_contextvars()
-        
-        return response
\ No newline at end of file
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
@@ -2,7 +2,7 @@
 Flow model for Node-RED flows
 """
 
-from sqlalchemy import String, JSON, Boolean, Text, Integer, DateTime
+from sqlalchemy import String, JSON, Boolean, Text, Integer, DateTime, ForeignKey, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 from typing import Dict, Any, List
 from datetime import datetime
@@ -18,8 +18,8 @@ class Flow(Base, TimestampMixin):
     name: Mapped[str] = mapped_column(String(255))
     description: Mapped[str] = mapped_column(Text, nullable=True)
     
-    # Flow configuration (Node-RED JSON)
-    config: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    # Flow configuration (Node-RED JSON); can be megabytes, so only loaded on request
+    config: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict, deferred=True)
     
     # Deployment status
     deployed: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -38,4 +38,44 @@ class Flow(Base, TimestampMixin):
     flow_metadata: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
     
     def __repr__(self) -> str:
-        return f"<Flow {self.id}: {self.name} (v{self.version})>"
\ No newline at end of file
+        return f"<Flow {self.id}: {self.name} (v{self.version})>"
+
+
+class FlowVersion(Base):
+    """One saved version of a flow's configuration"""
+    __tablename__ = "flow_versions"
+    __table_args__ = (UniqueConstraint("flow_id", "version"),)
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    flow_id: Mapped[str] = mapped_column(
+        String(64),
+        ForeignKey("flows.id", ondelete="CASCADE"),
+        index=True
+    )
+    version: Mapped[int] = mapped_column(Integer)
+    
+    # Content hash of the version's element manifest (see FlowStore)
+    root: Mapped[str] = mapped_column(String(64))
+    elements: Mapped[int] = mapped_column(Integer, default=0)
+    # [path, hash] pairs in config order; the content is in flow_elements
+    manifest: Mapped[List[List[str]]] = mapped_column(JSON, default=list, deferred=True)
+    
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    def __repr__(self) -> str:
+        return f"<FlowVersion {self.flow_id} v{self.version}>"
+
+
+class FlowElement(Base):
+    """One node, tab or other config element, stored once under its content hash"""
+    __tablename__ = "flow_elements"
+    
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[Any] = mapped_column(JSON)
+    
+    def __repr__(self) -> str:
+        return f"<FlowElement {self.hash[:12]}>"
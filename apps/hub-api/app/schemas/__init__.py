@@ -2,20 +2,30 @@
 Pydantic schemas for request/response validation
 """
 
-from .device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceList
-from .flow import FlowCreate, FlowUpdate, FlowResponse, FlowDeploy
+from .device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceList, DevicePage, DeviceSort, CapabilityQueryResponse
+from .flow import FlowCreate, FlowUpdate, FlowResponse, FlowSummary, FlowDeploy, FlowDeploymentReport, FlowVersionInfo
 from .system import SystemInfo, HealthCheck, LogEntry
+from .telemetry import TelemetryResolution, TelemetrySeries, TelemetryResponse
 
 __all__ = [
     "DeviceCreate",
     "DeviceUpdate", 
     "DeviceResponse",
     "DeviceList",
+    "DevicePage",
+    "DeviceSort",
+    "CapabilityQueryResponse",
     "FlowCreate",
     "FlowUpdate",
     "FlowResponse",
+    "FlowSummary",
     "FlowDeploy",
+    "FlowDeploymentReport",
+    "FlowVersionInfo",
     "SystemInfo",
     "HealthCheck",
     "LogEntry",
+    "TelemetryResolution",
+    "TelemetrySeries",
+    "TelemetryResponse",
 ]
\ No newline at end of file
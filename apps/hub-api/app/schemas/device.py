@@ -3,7 +3,7 @@ Device schemas for API validation
 """
 
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
 from enum import Enum
 
@@ -21,7 +21,8 @@ class DeviceBase(BaseModel):
     """Base device schema"""
     name: str = Field(..., min_length=1, max_length=255)
     type: str = Field(..., min_length=1, max_length=64)
-    capabilities: Dict[str, Any] = Field(default_factory=dict)
+    # Either versioned strings ("motor.differential:v1.0") or {"motor": ["differential"]}
+    capabilities: Union[List[str], Dict[str, Any]] = Field(default_factory=dict)
     device_metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -36,7 +37,7 @@ class DeviceUpdate(BaseModel):
     """Schema for updating a device"""
     name: Optional[str] = Field(None, min_length=1, max_length=255)
     status: Optional[DeviceStatus] = None
-    capabilities: Optional[Dict[str, Any]] = None
+    capabilities: Optional[Union[List[str], Dict[str, Any]]] = None
     device_metadata: Optional[Dict[str, Any]] = None
     ip_address: Optional[str] = None
 
@@ -60,4 +61,25 @@ class DeviceResponse(DeviceBase):
 class DeviceList(BaseModel):
     """Schema for device list responses"""
     devices: List[DeviceResponse]
-    total: int
\ No newline at end of file
+    total: int
+
+
+class DeviceSort(str, Enum):
+    """Device list ordering"""
+    last_seen = "last_seen"
+    last_seen_desc = "-last_seen"
+
+
+class DevicePage(BaseModel):
+    """Schema for paginated device list responses"""
+    devices: List[Dict[str, Any]]
+    total: int
+    next_cursor: Optional[str] = None
+
+
+class CapabilityQueryResponse(BaseModel):
+    """Schema for capability query responses"""
+    requirements: List[str]
+    status: Optional[DeviceStatus] = None
+    devices: List[str]
+    total: int
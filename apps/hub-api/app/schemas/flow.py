@@ -5,6 +5,7 @@ Flow schemas for API validation
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from enum import Enum
 
 
 class FlowBase(BaseModel):
@@ -44,7 +45,62 @@ class FlowResponse(FlowBase):
     }
 
 
+class FlowSummary(BaseModel):
+    """Schema for flow list entries (no config)"""
+    id: str
+    name: str
+    description: Optional[str] = None
+    target_nodes: List[str] = Field(default_factory=list)
+    flow_metadata: Dict[str, Any] = Field(default_factory=dict)
+    deployed: bool
+    deployed_at: Optional[datetime]
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+
 class FlowDeploy(BaseModel):
     """Schema for flow deployment"""
     target_nodes: Optional[List[str]] = Field(None, description="Specific nodes to deploy to")
-    force: bool = Field(False, description="Force deployment even if already deployed")
\ No newline at end of file
+    force: bool = Field(False, description="Force deployment even if already deployed")
+
+
+class NodeDeployStatus(str, Enum):
+    """Outcome of deploying a flow to one node"""
+    pending = "pending"
+    ok = "ok"
+    failed = "failed"
+    timed_out = "timed_out"
+
+
+class NodeDeployResult(BaseModel):
+    """Deployment result for one node"""
+    node: str
+    status: NodeDeployStatus
+    mode: Optional[str] = Field(None, description="delta or full")
+    bytes_sent: int = 0
+    latency_ms: Optional[float] = Field(None, description="Time until the node replied")
+    error: Optional[str] = None
+
+
+class FlowDeploymentReport(BaseModel):
+    """Schema for flow deployment responses"""
+    flow_id: str
+    version: int
+    deployed: bool = Field(..., description="Whether at least one node confirmed the flow")
+    deployed_at: Optional[datetime]
+    started_at: datetime
+    duration_ms: float
+    succeeded: int
+    failed: int
+    timed_out: int
+    bytes_sent: int
+    nodes: List[NodeDeployResult]
+
+
+class FlowVersionInfo(BaseModel):
+    """One stored version of a flow config"""
+    version: int
+    root: str = Field(..., description="Content hash of the version's element manifest")
+    elements: int
+    created_at: datetime
@@ -26,6 +26,13 @@ class SystemInfo(BaseModel):
     uptime_seconds: float
     memory_usage_mb: float
     cpu_percent: float
+    process_rss_mb: float
+    process_cpu_percent: float
+    open_fds: Optional[int] = Field(None, description="Not available on Windows")
+    threads: int
+    loop_lag_ms: float = Field(..., description="How late the event loop ran the last lag probe")
+    loop_lag_max_ms: float = Field(..., description="Worst event-loop lag since the previous sample")
+    sampled_at: datetime
     nats_connected: bool
     redis_connected: bool
     database_connected: bool
@@ -36,6 +43,7 @@ class HealthCheck(BaseModel):
     status: str = Field(..., description="healthy, degraded, or unhealthy")
     version: str
     checks: Dict[str, bool] = Field(..., description="Individual component health checks")
+    latency_ms: Dict[str, float] = Field(default_factory=dict, description="Round-trip time of each passing check")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -54,4 +62,121 @@ class LogQuery(BaseModel):
     module: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
-    limit: int = Field(100, ge=1, le=1000)
\ No newline at end of file
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class IngestQueueStats(BaseModel):
+    """Ingest queue depth and counters"""
+    subject: str
+    policy: str
+    depth: int
+    max_size: int
+    received: int
+    bytes_received: int
+    processed: int
+    dropped: int
+    batches: int
+    decode_errors: int
+    handler_errors: int
+
+
+class SchemaValidatorStats(BaseModel):
+    """Validation counters for one HAL schema"""
+    schema_id: str
+    checked: int
+    skipped: int = Field(..., description="Messages not checked due to sampling")
+    failures: int
+    avg_latency_us: float
+    max_latency_us: float
+    last_error: Optional[str] = None
+
+
+class SchemaRegistryStats(BaseModel):
+    """Loaded HAL schemas and validation counters"""
+    loaded: int
+    unknown: int = Field(..., description="Messages whose schema id is not registered")
+    schemas: List[SchemaValidatorStats]
+
+
+class DatabasePoolStats(BaseModel):
+    """Async engine connection pool usage"""
+    configured: bool
+    pool_class: Optional[str] = None
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    waits: int = Field(..., description="Connection checkouts through the instrumented pool")
+    timeouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class DiscoveryStats(BaseModel):
+    """mDNS announcement coalescing counters"""
+    window: float = Field(..., description="Seconds announcements are coalesced per device")
+    pending: int
+    received: int
+    coalesced: int = Field(..., description="Announcements superseded within the window")
+    unchanged: int = Field(..., description="Announcements that matched the registry")
+    created: int
+    updated: int
+    invalid: int
+    errors: int = Field(..., description="Announcements that failed to apply (e.g. invalid TXT records)")
+
+
+class SharedStateStats(BaseModel):
+    """Registry sharing and WebSocket fan-out between workers"""
+    enabled: bool
+    backend: Optional[str] = Field(None, description="redis, or null for a single worker")
+    worker_id: str
+    leader: bool = Field(..., description="Whether this worker handles NATS-driven device state")
+    leader_changes: int
+    writes: int
+    reads: int
+    invalidations_sent: int
+    invalidations_received: int
+    broadcasts_sent: int
+    broadcasts_received: int
+    updates_sent: int
+    updates_received: int
+
+
+class LivenessStats(BaseModel):
+    """Heartbeat tracking for devices or nodes"""
+    name: str
+    ttl: float = Field(..., description="Seconds without a heartbeat before going offline")
+    tracked: int
+    alive: int
+    beats: int
+    went_online: int
+    went_offline: int
+
+
+
+class SlowCallback(BaseModel):
+    """One event-loop callback that ran longer than the threshold"""
+    operation: str = Field(..., description="Route or NATS subscription, else the callback name")
+    callback: str
+    duration_ms: float
+    timestamp: datetime
+
+
+class SlowOperationStats(BaseModel):
+    """Slow callbacks of one operation"""
+    operation: str
+    count: int
+    total_ms: float
+    max_ms: float
+
+
+class LoopProfilerStats(BaseModel):
+    """Event-loop lag and slow callback counters"""
+    enabled: bool = Field(..., description="Whether callbacks are being timed (LOOP_PROFILING_ENABLED)")
+    threshold_ms: float
+    loop_lag_ms: float = Field(..., description="How late the event loop ran the last lag probe")
+    slow_callbacks: int
+    profiles: int
+    profiling: bool = Field(..., description="Whether a sampling profile is running")
+    operations: List[SlowOperationStats] = Field(..., description="Slowest total first")
+    recent: List[SlowCallback] = Field(..., description="Newest first")
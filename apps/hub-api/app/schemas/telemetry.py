@@ -0,0 +1,43 @@
+"""
+Telemetry schemas for API validation
+"""
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from enum import Enum
+
+
+class TelemetryResolution(str, Enum):
+    """Telemetry query resolution"""
+    raw = "raw"
+    second = "1s"
+    ten_seconds = "10s"
+    minute = "1m"
+
+
+class TelemetrySeries(BaseModel):
+    """Columnar samples for one telemetry field
+
+    Raw queries fill ``values``; rollup queries fill the min/max/mean/last
+    and count columns, with ``timestamps`` holding each bucket's start.
+    """
+    schema_id: str = Field(..., alias="schema")
+    field: str
+    timestamps: List[float] = Field(..., description="Epoch seconds")
+    values: Optional[List[float]] = None
+    min: Optional[List[float]] = None
+    max: Optional[List[float]] = None
+    mean: Optional[List[float]] = None
+    last: Optional[List[float]] = None
+    count: Optional[List[int]] = None
+
+    model_config = {
+        "populate_by_name": True
+    }
+
+
+class TelemetryResponse(BaseModel):
+    """Schema for telemetry query responses"""
+    device_id: str
+    resolution: TelemetryResolution
+    series: List[TelemetrySeries]
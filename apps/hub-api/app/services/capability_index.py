@@ -0,0 +1,175 @@
+"""
+Versioned capability index over registered devices
+"""
+
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+import re
+
+# domain.kind:vMAJOR.MINOR, with the kind and version optional
+_CAPABILITY = re.compile(r"^([a-z0-9_-]+)(?:\.([a-z0-9_-]+))?(?::v(\d+)(?:\.(\d+))?)?$")
+
+# (major, minor); None for capabilities declared without a version
+Version = Optional[Tuple[int, int]]
+
+_EMPTY: Set[str] = frozenset()
+
+
+class Requirement:
+    """A parsed capability requirement such as ``motor.differential:v1.2``
+
+    A versioned requirement is met by the same major version with an equal
+    or newer minor version; without a version any declaration matches.
+    """
+
+    __slots__ = ("name", "domain", "major", "minor")
+
+    def __init__(self, name: str, domain: str, major: Optional[int], minor: int):
+        self.name = name
+        self.domain = domain
+        self.major = major
+        self.minor = minor
+
+    def __repr__(self) -> str:
+        if self.major is None:
+            return f"Requirement({self.name!r})"
+        return f"Requirement('{self.name}:v{self.major}.{self.minor}')"
+
+
+def parse_requirement(text: str) -> Requirement:
+    """Parse a capability requirement; raises ValueError if malformed"""
+    match = _CAPABILITY.match(text.strip())
+    if not match:
+        raise ValueError(f"Invalid capability: {text}")
+    domain, kind, major, minor = match.groups()
+    if kind is None and major is not None:
+        raise ValueError(f"Versioned capability needs a kind: {text}")
+    name = f"{domain}.{kind}" if kind else domain
+    return Requirement(name, domain, None if major is None else int(major), int(minor or 0))
+
+
+def parse_capabilities(capabilities: Any) -> Dict[str, Version]:
+    """Normalize a device's capabilities to ``{"domain.kind": version}``
+
+    Accepts the TXT-record list form (``["motor.differential:v1.0"]``) and
+    the registration dict form (``{"motor": ["differential"]}``, which has
+    no versions). Malformed entries are skipped.
+    """
+    parsed: Dict[str, Version] = {}
+    if isinstance(capabilities, dict):
+        for domain, kinds in capabilities.items():
+            if isinstance(kinds, (list, tuple, set)):
+                for kind in kinds:
+                    parsed.setdefault(f"{domain}.{kind}", None)
+            else:
+                parsed.setdefault(str(domain), None)
+    elif isinstance(capabilities, (list, tuple, set)):
+        for capability in capabilities:
+            if not isinstance(capability, str):
+                continue
+            match = _CAPABILITY.match(capability.strip())
+            if not match:
+                continue
+            domain, kind, major, minor = match.groups()
+            name = f"{domain}.{kind}" if kind else domain
+            version = None if major is None else (int(major), int(minor or 0))
+            # Keep the newest version if a device lists one twice
+            if parsed.get(name) is None or (version is not None and version > parsed[name]):
+                parsed[name] = version
+    return parsed
+
+
+class CapabilityIndex:
+    """Inverted index from capability to devices
+
+    Devices are indexed by domain (``motor``), by capability
+    (``motor.differential``) and by capability and major version, which
+    records each device's minor version. A query intersects one set per
+    requirement, smallest first, so its cost follows the number of
+    matching devices rather than the fleet size.
+    """
+
+    def __init__(self):
+        self._by_name: Dict[str, Set[str]] = {}
+        self._by_major: Dict[Tuple[str, int], Dict[str, int]] = {}
+        self._declared: Dict[str, Dict[str, Version]] = {}
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._declared)
+
+    def capabilities_of(self, device_id: str) -> Dict[str, Version]:
+        """Parsed capabilities of an indexed device"""
+        return dict(self._declared.get(device_id, {}))
+
+    def add(self, device_id: str, capabilities: Any):
+        """Index a device, replacing anything it declared before"""
+        self.remove(device_id)
+        declared = parse_capabilities(capabilities)
+        self._declared[device_id] = declared
+        for name, version in declared.items():
+            self._by_name.setdefault(name, set()).add(device_id)
+            domain = name.split(".", 1)[0]
+            if domain != name:
+                self._by_name.setdefault(domain, set()).add(device_id)
+            if version is not None:
+                self._by_major.setdefault((name, version[0]), {})[device_id] = version[1]
+        self.generation += 1
+
+    def remove(self, device_id: str):
+        """Drop a device from the index"""
+        declared = self._declared.pop(device_id, None)
+        if declared is None:
+            return
+        for name, version in declared.items():
+            names = (name, name.split(".", 1)[0])
+            for key in names:
+                ids = self._by_name.get(key)
+                if ids is not None:
+                    ids.discard(device_id)
+                    if not ids:
+                        del self._by_name[key]
+            if version is not None:
+                minors = self._by_major.get((name, version[0]))
+                if minors is not None:
+                    minors.pop(device_id, None)
+                    if not minors:
+                        del self._by_major[(name, version[0])]
+        self.generation += 1
+
+    def match(self, requirement: Requirement) -> Set[str]:
+        """Devices that meet one requirement"""
+        if requirement.major is None:
+            return self._by_name.get(requirement.name, _EMPTY)
+        minors = self._by_major.get((requirement.name, requirement.major))
+        if not minors:
+            return _EMPTY
+        if requirement.minor == 0:
+            return minors.keys()
+        return {device_id for device_id, minor in minors.items() if minor >= requirement.minor}
+
+    def query(
+        self,
+        requirements: Iterable[str],
+        within: Optional[Set[str]] = None,
+    ) -> Set[str]:
+        """Devices meeting every requirement, optionally restricted to ``within``
+
+        Raises ValueError for a malformed requirement.
+        """
+        sets = [self.match(parse_requirement(text)) for text in requirements]
+        if within is not None:
+            sets.append(within)
+        if not sets:
+            return set(self._declared)
+
+        sets.sort(key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            if not result:
+                break
+            result.intersection_update(ids)
+        return result
+
+    def summary(self) -> Dict[str, int]:
+        """Number of devices per capability name"""
+        return {name: len(ids) for name, ids in sorted(self._by_name.items())}
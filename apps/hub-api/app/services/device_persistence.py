@@ -0,0 +1,225 @@
+"""
+Write-behind persistence of the device registry to SQL
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set
+from datetime import datetime, timezone
+import asyncio
+import structlog
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.device import Device, DeviceStatus as ModelDeviceStatus
+from app.schemas.device import DeviceStatus
+
+logger = structlog.get_logger()
+
+# Columns written on every flush; ``id`` is the conflict target
+_COLUMNS = (
+    "id",
+    "name",
+    "type",
+    "status",
+    "claimed",
+    "capabilities",
+    "device_metadata",
+    "ip_address",
+    "mac_address",
+    "last_seen",
+    "created_at",
+    "updated_at",
+)
+_UPDATE_COLUMNS = _COLUMNS[1:]
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """The registry works in naive UTC; databases may hand back aware values"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def device_to_row(device: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an in-memory device to a ``devices`` row"""
+    row = {column: device.get(column) for column in _COLUMNS}
+    row["status"] = ModelDeviceStatus(DeviceStatus(device["status"]).value)
+    row["capabilities"] = device.get("capabilities") or {}
+    row["device_metadata"] = device.get("device_metadata") or {}
+    return row
+
+
+def row_to_device(row: Device) -> Dict[str, Any]:
+    """Convert a ``devices`` row to the in-memory device dict"""
+    device = {column: getattr(row, column) for column in _COLUMNS}
+    device["status"] = DeviceStatus(row.status.value)
+    for column in ("last_seen", "created_at", "updated_at"):
+        device[column] = naive_utc(device[column])
+    return device
+
+
+class DeviceWriteBehind:
+    """Coalescing write-behind for device rows
+
+    The registry stays authoritative in memory; changes only mark a device
+    dirty. A background task snapshots the dirty devices and writes them in
+    one transaction of batched UPSERTs, every ``flush_interval`` seconds or
+    as soon as ``batch_size`` devices are dirty. Any number of updates to a
+    device between flushes cost one row write.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = (
+            settings.DEVICE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.batch_size = batch_size or settings.DEVICE_FLUSH_BATCH_SIZE
+
+        self._dirty: Set[str] = set()
+        self._source: Callable[[str], Optional[Dict[str, Any]]] = lambda device_id: None
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.flushes = 0
+        self.rows_written = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a database is configured"""
+        return self.session_factory is not None
+
+    @property
+    def pending(self) -> int:
+        """Number of devices waiting to be written"""
+        return len(self._dirty)
+
+    def _resolve_session_factory(self):
+        if self.session_factory is None:
+            from app.db.session import AsyncSessionLocal
+
+            self.session_factory = AsyncSessionLocal
+
+    async def load(self) -> List[Dict[str, Any]]:
+        """Read every persisted device"""
+        self._resolve_session_factory()
+        if not self.enabled:
+            return []
+
+        async with self.session_factory() as session:
+            devices = [row_to_device(row) for row in await session.scalars(select(Device))]
+        logger.info("Devices loaded from database", count=len(devices))
+        return devices
+
+    def start(self, source: Callable[[str], Optional[Dict[str, Any]]]):
+        """Start flushing; ``source`` returns the current state of a device"""
+        self._resolve_session_factory()
+        self._source = source
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="device-write-behind")
+
+    async def stop(self):
+        """Stop the flusher after writing anything still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.enabled:
+            await self.flush()
+
+    def mark(self, device_id: str):
+        """Schedule a device to be written on the next flush"""
+        if not self.enabled:
+            return
+        self._dirty.add(device_id)
+        if len(self._dirty) >= self.batch_size:
+            self._full.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write all dirty devices in one transaction; returns rows written"""
+        async with self._flush_lock:
+            self._full.clear()
+            if not self._dirty:
+                return 0
+
+            # Snapshot on the event loop so rows are consistent
+            dirty, self._dirty = self._dirty, set()
+            rows = []
+            for device_id in dirty:
+                device = self._source(device_id)
+                if device is not None:
+                    rows.append(device_to_row(device))
+
+            try:
+                await self._write(rows)
+            except Exception as e:
+                self.errors += 1
+                # Retry on the next flush; newer marks are already in _dirty
+                self._dirty |= dirty
+                logger.error("Device flush failed", rows=len(rows), error=str(e))
+                return 0
+
+            self.flushes += 1
+            self.rows_written += len(rows)
+            logger.debug("Devices flushed", rows=len(rows))
+            return len(rows)
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        async with self.session_factory() as session:
+            async with session.begin():
+                insert = dialect_insert(session.get_bind().dialect.name)
+                for start in range(0, len(rows), self.batch_size):
+                    chunk = rows[start:start + self.batch_size]
+                    if insert is None:
+                        for row in chunk:
+                            await session.merge(Device(**row))
+                        continue
+                    stmt = insert(Device.__table__)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[Device.__table__.c.id],
+                        set_={column: stmt.excluded[column] for column in _UPDATE_COLUMNS},
+                    )
+                    await session.execute(stmt, chunk)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pending rows and flush counters"""
+        return {
+            "enabled": self.enabled,
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "errors": self.errors,
+        }
+
+
+def dialect_insert(dialect: str):
+    """INSERT construct with ON CONFLICT support, if the dialect has one"""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+# Singleton instance
+device_write_behind = DeviceWriteBehind()
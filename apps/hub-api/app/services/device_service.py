@@ -2,23 +2,238 @@
 Device management service
 """
 
-from typing import List, Optional, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from bisect import bisect_left, bisect_right
 from datetime import datetime
+import asyncio
+import base64
 import structlog
 
 from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceStatus
+from app.core import codec
+from app.core.config import settings
 from app.core.nats import nats_client
+from app.services.capability_index import CapabilityIndex, parse_requirement
+from app.services.device_persistence import device_write_behind
+from app.services.shared_state import shared_state
 
 logger = structlog.get_logger()
 
+# Single-valued fields with a secondary index
+_INDEXED_FIELDS = ("status", "type", "claimed")
+
+# Sort key for the last_seen order: (last_seen, id)
+SeenKey = Tuple[datetime, str]
+
+_EMPTY: Set[str] = frozenset()
+
+
+def encode_cursor(key: SeenKey) -> str:
+    """Opaque pagination cursor for a position in the last_seen order"""
+    return base64.urlsafe_b64encode(codec.dumps([key[0].isoformat(), key[1]])).decode()
+
+
+def decode_cursor(cursor: str) -> SeenKey:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        seen, device_id = codec.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(seen), str(device_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
 
 class DeviceService:
-    """Service for managing devices"""
+    """Service for managing devices
+    
+    Devices are kept in memory with secondary indexes by status, type,
+    claimed flag and capability, plus a list ordered by ``last_seen``, so
+    filtered, paginated listings cost about one page of work. Serialized
+    responses are cached per device and dropped whenever it changes.
+    
+    Heartbeats only touch ``last_seen``: they patch it into the cached
+    response and mark the device stale in the order, which is re-sorted
+    on the next listing rather than on every heartbeat.
+    
+    With several workers, every change is shared through ``shared_state``
+    by the worker that made it and the registry doubles as a read-through
+    cache. Heartbeat ``last_seen`` values are sent to the other workers in
+    batches every ``REDIS_SEEN_INTERVAL``.
+    """
     
     def __init__(self):
         self._devices: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in _INDEXED_FIELDS}
+        self.capabilities = CapabilityIndex()
+        self._by_last_seen: List[SeenKey] = []
+        # Devices whose entry in _by_last_seen is outdated or missing
+        self._stale_seen: Set[str] = set()
+        self._serialized: Dict[str, Dict[str, Any]] = {}
+        # Devices whose heartbeat last_seen the other workers have not been sent
+        self._unsent_seen: Set[str] = set()
+        self._seen_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Load persisted devices and start write-behind to the database"""
+        for device in await device_write_behind.load():
+            self._insert(device)
+        device_write_behind.start(self._devices.get)
+        shared_state.on_invalidate("devices", self._reload_shared)
+        shared_state.on_update("devices", self._apply_seen)
+        if shared_state.enabled and self._seen_task is None:
+            self._seen_task = asyncio.create_task(self._send_seen_periodically(), name="device-seen")
+    
+    async def stop(self):
+        """Flush pending device writes"""
+        if self._seen_task:
+            self._seen_task.cancel()
+            try:
+                await self._seen_task
+            except asyncio.CancelledError:
+                pass
+            self._seen_task = None
+        await device_write_behind.stop()
+    
+    @staticmethod
+    def _seen_key(device: Dict[str, Any]) -> SeenKey:
+        return (device.get("last_seen") or datetime.min, device["id"])
+    
+    @staticmethod
+    def _add(index: Dict[Any, Set[str]], value: Any, device_id: str):
+        index.setdefault(value, set()).add(device_id)
+    
+    @staticmethod
+    def _discard(index: Dict[Any, Set[str]], value: Any, device_id: str):
+        ids = index.get(value)
+        if ids is not None:
+            ids.discard(device_id)
+            if not ids:
+                del index[value]
+    
+    def _insert(self, device: Dict[str, Any]):
+        """Add a device and index it, replacing any device with the same id"""
+        device_id = device["id"]
+        if device_id in self._devices:
+            self._remove(device_id)
+        
+        self._devices[device_id] = device
+        for field in _INDEXED_FIELDS:
+            self._add(self._indexes[field], device[field], device_id)
+        self.capabilities.add(device_id, device.get("capabilities"))
+        self._stale_seen.add(device_id)
+    
+    def _remove(self, device_id: str):
+        device = self._devices.pop(device_id)
+        for field in _INDEXED_FIELDS:
+            self._discard(self._indexes[field], device[field], device_id)
+        self.capabilities.remove(device_id)
+        self._stale_seen.add(device_id)
+        self._serialized.pop(device_id, None)
+    
+    def _update(self, device: Dict[str, Any], changes: Dict[str, Any]):
+        """Apply changes to a device, keeping indexes, cache and persistence in step"""
+        device_id = device["id"]
+        for field in _INDEXED_FIELDS:
+            if field in changes and changes[field] != device[field]:
+                self._discard(self._indexes[field], device[field], device_id)
+                self._add(self._indexes[field], changes[field], device_id)
+        
+        if "capabilities" in changes:
+            self.capabilities.add(device_id, changes["capabilities"])
+        
+        if "last_seen" in changes and changes["last_seen"] != device.get("last_seen"):
+            self._stale_seen.add(device_id)
+        
+        device.update(changes)
+        self._serialized.pop(device_id, None)
+        device_write_behind.mark(device_id)
+    
+    def _set_seen(self, device: Dict[str, Any], seen: datetime):
+        """Set last_seen without dropping the cached response or re-sorting"""
+        device_id = device["id"]
+        device["last_seen"] = seen
+        self._stale_seen.add(device_id)
+        serialized = self._serialized.get(device_id)
+        if serialized is not None:
+            serialized["last_seen"] = seen.isoformat()
+    
+    def _seen_order(self) -> List[SeenKey]:
+        """The last_seen order, brought up to date with the stale devices"""
+        if self._stale_seen:
+            stale = self._stale_seen
+            order = [key for key in self._by_last_seen if key[1] not in stale]
+            order.extend(sorted(
+                self._seen_key(self._devices[device_id]) for device_id in stale if device_id in self._devices
+            ))
+            # Two sorted runs: timsort merges them in linear time
+            order.sort()
+            self._by_last_seen = order
+            self._stale_seen = set()
+        return self._by_last_seen
+    
+    def serialize(self, device_id: str, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """JSON-ready device dict, cached until the device changes"""
+        serialized = self._serialized.get(device_id)
+        if serialized is None:
+            serialized = DeviceResponse(**self._devices[device_id]).model_dump(mode="json")
+            self._serialized[device_id] = serialized
+        if fields is None:
+            return serialized
+        return {field: serialized[field] for field in fields}
+    
+    async def _share(self, device_id: str):
+        """Hand a change to the other workers"""
+        if shared_state.enabled:
+            await shared_state.put("devices", device_id, self.serialize(device_id))
+    
+    async def share(self, device_id: str):
+        """Hand a change made outside this service (e.g. by discovery) to the other workers"""
+        await self._share(device_id)
+    
+    async def _reload_shared(self, device_ids: List[str]):
+        """Re-read devices another worker changed"""
+        for device_id in device_ids:
+            data = await shared_state.get("devices", device_id)
+            if data is None:
+                if device_id in self._devices:
+                    self._remove(device_id)
+                continue
+            device = DeviceResponse(**data).model_dump()
+            # The stored copy only has the last_seen of the last full change
+            current = self._devices.get(device_id)
+            if current is not None and current["last_seen"] and (
+                device["last_seen"] is None or current["last_seen"] > device["last_seen"]
+            ):
+                device["last_seen"] = current["last_seen"]
+            self._insert(device)
+    
+    async def send_seen(self):
+        """Send the heartbeat last_seen values recorded since the last call to the other workers"""
+        unsent, self._unsent_seen = self._unsent_seen, set()
+        await shared_state.update("devices", {
+            device_id: self._devices[device_id]["last_seen"].isoformat()
+            for device_id in unsent
+            if device_id in self._devices
+        })
     
-    async def create_device(self, device_data: DeviceCreate) -> DeviceResponse:
+    async def _send_seen_periodically(self):
+        while True:
+            await asyncio.sleep(settings.REDIS_SEEN_INTERVAL)
+            try:
+                await self.send_seen()
+            except Exception as e:
+                logger.error("Device last_seen not shared", error=str(e))
+    
+    async def _apply_seen(self, values: Dict[str, str]):
+        """Apply last_seen values sent by the leader"""
+        for device_id, seen in values.items():
+            device = self._devices.get(device_id)
+            if device is None:
+                continue
+            seen = datetime.fromisoformat(seen)
+            if device["last_seen"] is None or seen > device["last_seen"]:
+                self._set_seen(device, seen)
+    
+    async def create_device(self, device_data: DeviceCreate, publish: bool = True) -> DeviceResponse:
         """Create a new device"""
         device = {
             "id": device_data.id,
@@ -35,17 +250,28 @@ class DeviceService:
             "updated_at": datetime.utcnow(),
         }
         
-        self._devices[device_data.id] = device
+        self._insert(device)
+        device_write_behind.mark(device_data.id)
+        await self._share(device_data.id)
         
-        # Publish device discovery event
-        await self._publish_device_event("device.discovered", device)
+        # Publish device discovery event (discovery publishes its own in batches)
+        if publish:
+            await self._publish_device_event("device.discovered", device)
         
         logger.info("Device created", device_id=device_data.id)
         return DeviceResponse(**device)
     
+    def has_device(self, device_id: str) -> bool:
+        """Whether a device is registered"""
+        return device_id in self._devices
+    
     async def get_device(self, device_id: str) -> Optional[DeviceResponse]:
         """Get device by ID"""
         device = self._devices.get(device_id)
+        if device is None and shared_state.enabled:
+            # Read through to devices another worker registered moments ago
+            await self._reload_shared([device_id])
+            device = self._devices.get(device_id)
         if device:
             return DeviceResponse(**device)
         return None
@@ -57,13 +283,14 @@ class DeviceService:
             return None
         
         # Update fields
-        update_dict = update_data.model_dump(exclude_unset=True)
-        device.update(update_dict)
-        device["updated_at"] = datetime.utcnow()
+        changes = update_data.model_dump(exclude_unset=True)
+        changes["updated_at"] = datetime.utcnow()
         
         # Update last seen if status is online
         if update_data.status == DeviceStatus.online:
-            device["last_seen"] = datetime.utcnow()
+            changes["last_seen"] = changes["updated_at"]
+        self._update(device, changes)
+        await self._share(device_id)
         
         # Publish update event
         await self._publish_device_event("device.updated", device)
@@ -73,12 +300,94 @@ class DeviceService:
     
     async def list_devices(self, status: Optional[DeviceStatus] = None) -> List[DeviceResponse]:
         """List all devices"""
-        devices = list(self._devices.values())
-        
         if status:
-            devices = [d for d in devices if d["status"] == status]
+            ids: Iterable[str] = self._indexes["status"].get(status, _EMPTY)
+        else:
+            ids = self._devices
+        return [DeviceResponse(**self._devices[device_id]) for device_id in ids]
+    
+    def _candidates(
+        self,
+        status: Optional[DeviceStatus],
+        type: Optional[str],
+        claimed: Optional[bool],
+        capability: Optional[str],
+    ) -> Optional[Set[str]]:
+        """Intersect the indexes for the given filters; None means no filter"""
+        candidates: Optional[Set[str]] = None
+        for ids in (
+            None if status is None else self._indexes["status"].get(status, _EMPTY),
+            None if type is None else self._indexes["type"].get(type, _EMPTY),
+            None if claimed is None else self._indexes["claimed"].get(claimed, _EMPTY),
+            None if capability is None else self.capabilities.match(parse_requirement(capability)),
+        ):
+            if ids is None:
+                continue
+            if candidates is None:
+                candidates = ids
+            elif len(ids) < len(candidates):
+                candidates = ids & candidates
+            else:
+                candidates = candidates & ids
+        return candidates
+    
+    def _walk(
+        self,
+        order: List[SeenKey],
+        descending: bool,
+        after: Optional[SeenKey],
+    ) -> Iterator[SeenKey]:
+        if descending:
+            end = bisect_left(order, after) if after else len(order)
+            for position in range(end - 1, -1, -1):
+                yield order[position]
+        else:
+            start = bisect_right(order, after) if after else 0
+            for position in range(start, len(order)):
+                yield order[position]
+    
+    def query_devices(
+        self,
+        status: Optional[DeviceStatus] = None,
+        type: Optional[str] = None,
+        claimed: Optional[bool] = None,
+        capability: Optional[str] = None,
+        descending: bool = True,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Filtered page of devices ordered by ``last_seen``
+        
+        Returns serialized devices, the number of matches and the cursor for
+        the next page (None on the last page). Raises ValueError for a bad
+        cursor or capability.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        candidates = self._candidates(status, type, claimed, capability)
+        total = len(self._devices) if candidates is None else len(candidates)
+        
+        order = self._seen_order()
+        if candidates is not None and len(candidates) * 8 < len(order):
+            # Few matches: sorting them beats walking the whole fleet
+            order = sorted(self._seen_key(self._devices[device_id]) for device_id in candidates)
+            candidates = None
         
-        return [DeviceResponse(**d) for d in devices]
+        page: List[SeenKey] = []
+        has_more = False
+        for key in self._walk(order, descending, after):
+            if candidates is not None and key[1] not in candidates:
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(key)
+        
+        return {
+            "devices": [self.serialize(device_id, fields) for _, device_id in page],
+            "total": total,
+            "next_cursor": encode_cursor(page[-1]) if has_more else None,
+        }
     
     async def claim_device(self, device_id: str) -> Optional[DeviceResponse]:
         """Claim a device"""
@@ -86,9 +395,12 @@ class DeviceService:
         if not device:
             return None
         
-        device["claimed"] = True
-        device["status"] = DeviceStatus.claimed
-        device["updated_at"] = datetime.utcnow()
+        self._update(device, {
+            "claimed": True,
+            "status": DeviceStatus.claimed,
+            "updated_at": datetime.utcnow(),
+        })
+        await self._share(device_id)
         
         # Publish claim event
         await self._publish_device_event("device.claimed", device)
@@ -96,6 +408,77 @@ class DeviceService:
         logger.info("Device claimed", device_id=device_id)
         return DeviceResponse(**device)
     
+    async def record_seen(self, device_id: str, status: Optional[DeviceStatus] = None) -> bool:
+        """Record a status or heartbeat message from a device
+        
+        Only updates memory; the database write is coalesced with any other
+        changes to the device until the next flush.
+        """
+        device = self._devices.get(device_id)
+        if not device:
+            return False
+        
+        now = datetime.utcnow()
+        if status is not None and status != device["status"]:
+            self._update(device, {"last_seen": now, "status": status, "updated_at": now})
+            await self._share(device_id)
+            await self._publish_device_event("device.updated", device)
+        else:
+            self._set_seen(device, now)
+            device_write_behind.mark(device_id)
+            if shared_state.enabled:
+                self._unsent_seen.add(device_id)
+        return True
+    
+    async def set_online(self, device_id: str, online: bool) -> bool:
+        """Apply a liveness transition; returns True if the status changed
+        
+        Going online does not clear an ``error`` status reported by the device.
+        """
+        device = self._devices.get(device_id)
+        if not device:
+            return False
+        
+        current = device["status"]
+        if online:
+            if current in (DeviceStatus.online, DeviceStatus.error):
+                return False
+            status = DeviceStatus.online
+        else:
+            if current == DeviceStatus.offline:
+                return False
+            status = DeviceStatus.offline
+        
+        self._update(device, {"status": status, "updated_at": datetime.utcnow()})
+        await self._share(device_id)
+        await self._publish_device_event("device.updated", device)
+        
+        logger.info("Device liveness changed", device_id=device_id, status=device["status"].value)
+        return True
+    
+    def online_device_ids(self) -> List[str]:
+        """IDs of devices currently marked online"""
+        return list(self._indexes["status"].get(DeviceStatus.online, _EMPTY))
+    
+    def status_counts(self) -> Dict[str, int]:
+        """Number of devices per status"""
+        return {
+            DeviceStatus(status).value: len(ids) for status, ids in self._indexes["status"].items()
+        }
+    
+    def find_devices(
+        self,
+        requirements: Iterable[str],
+        status: Optional[DeviceStatus] = None,
+    ) -> List[str]:
+        """Ids of devices meeting every capability requirement
+        
+        Requirements look like ``motor.differential:v1.0`` or
+        ``sensor.range-tof``. Raises ValueError for a malformed requirement.
+        """
+        within = None if status is None else self._indexes["status"].get(status, _EMPTY)
+        return sorted(self.capabilities.query(requirements, within))
+    
     async def send_command(self, device_id: str, command: Dict[str, Any]) -> bool:
         """Send command to device"""
         device = self._devices.get(device_id)
@@ -109,15 +492,43 @@ class DeviceService:
         logger.info("Command sent to device", device_id=device_id, command=command.get("type"))
         return True
     
-    async def _publish_device_event(self, event_type: str, device: Dict[str, Any]):
-        """Publish device event to NATS"""
-        event = {
+    def apply_changes(self, device_id: str, changes: Dict[str, Any]) -> bool:
+        """Apply only the fields that differ; returns False if nothing changed"""
+        device = self._devices.get(device_id)
+        if not device:
+            return False
+        changes = {key: value for key, value in changes.items() if device.get(key) != value}
+        if not changes:
+            return False
+        changes["updated_at"] = datetime.utcnow()
+        self._update(device, changes)
+        return True
+    
+    def device_event(self, event_type: str, device_id: str) -> Dict[str, Any]:
+        """Build a ``hub.events.devices`` event for a device"""
+        return {
             "type": event_type,
-            "device_id": device["id"],
+            "device_id": device_id,
             "timestamp": datetime.utcnow().isoformat(),
-            "data": device,
+            "data": self.serialize(device_id),
         }
-        await nats_client.publish("hub.events.devices", event)
+    
+    async def publish_device_events(self, events: List[Dict[str, Any]]):
+        """Publish device events, several at once as one ``device.batch`` message"""
+        if not events:
+            return
+        if len(events) == 1:
+            await nats_client.publish("hub.events.devices", events[0])
+            return
+        await nats_client.publish("hub.events.devices", {
+            "type": "device.batch",
+            "timestamp": datetime.utcnow().isoformat(),
+            "events": events,
+        })
+    
+    async def _publish_device_event(self, event_type: str, device: Dict[str, Any]):
+        """Publish device event to NATS"""
+        await nats_client.publish("hub.events.devices", self.device_event(event_type, device["id"]))
 
 
 # Singleton instance
@@ -0,0 +1,177 @@
+"""
+Coalesced handling of mDNS device announcements
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import structlog
+
+from app.core.config import settings
+from app.schemas.device import DeviceCreate
+
+logger = structlog.get_logger()
+
+
+def parse_announcement(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an mDNS announcement's TXT records and address to device fields
+
+    The host name is left out: it only names a device on registration, so a
+    rename through the API sticks.
+    """
+    capabilities: List[str] = []
+    device_metadata: Dict[str, str] = {}
+    for txt in data.get("Text") or []:
+        if txt.startswith("caps="):
+            capabilities = [cap for cap in txt[5:].split(",") if cap]
+        elif "=" in txt:
+            key, value = txt.split("=", 1)
+            device_metadata[key] = value
+
+    addresses = data.get("AddrIPv4")
+    return {
+        "type": device_metadata.get("type", "unknown"),
+        "capabilities": capabilities,
+        "device_metadata": device_metadata,
+        "ip_address": addresses[0] if addresses else None,
+    }
+
+
+def fingerprint(data: Dict[str, Any]) -> Tuple:
+    """Identity of an announcement's content, insensitive to TXT record order"""
+    return (
+        data.get("HostName"),
+        frozenset(data.get("Text") or ()),
+        tuple(data.get("AddrIPv4") or ()),
+    )
+
+
+class DiscoveryCoalescer:
+    """Coalesces mDNS announcement storms into registry diffs
+
+    Announcements are collected per Instance for ``window`` seconds and only
+    the latest one is applied. Its TXT records and address are compared with
+    the registry, so re-announcements after a network blip or hub restart
+    change nothing and publish nothing. The events from one window go out
+    together as a single ``hub.events.devices`` message.
+    """
+
+    def __init__(self, window: Optional[float] = None):
+        self.window = settings.DISCOVERY_COALESCE_WINDOW if window is None else window
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Instance -> fingerprint of the last announcement applied
+        self._applied: Dict[str, Tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.received = 0
+        self.coalesced = 0
+        self.unchanged = 0
+        self.created = 0
+        self.updated = 0
+        self.invalid = 0
+        self.errors = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of instances waiting for the window to close"""
+        return len(self._pending)
+
+    def offer(self, data: Dict[str, Any]) -> bool:
+        """Queue an announcement; returns False if it has no Instance"""
+        instance = data.get("Instance")
+        if not instance:
+            self.invalid += 1
+            logger.error("Invalid device discovery data", data=data)
+            return False
+
+        self.received += 1
+        if instance in self._pending:
+            self.coalesced += 1
+        self._pending[instance] = data
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later(), name="discovery-coalescer")
+        return True
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Discovery flush failed", error=str(e))
+
+    async def stop(self):
+        """Apply anything still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Apply pending announcements; returns the number of events published"""
+        from app.services.device_service import device_service
+
+        pending, self._pending = self._pending, {}
+        events = []
+        for instance, data in pending.items():
+            try:
+                event = await self._apply(device_service, instance, data)
+            except Exception as e:
+                # One bad announcement must not cost the rest of the window
+                self.errors += 1
+                logger.error("Discovery announcement not applied", device_id=instance, error=str(e))
+                continue
+            if event is not None:
+                events.append(event)
+
+        await device_service.publish_device_events(events)
+        return len(events)
+
+    async def _apply(self, device_service: Any, instance: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply one announcement; returns the event to publish, if any"""
+        mark = fingerprint(data)
+        if self._applied.get(instance) == mark and device_service.has_device(instance):
+            self.unchanged += 1
+            return None
+
+        fields = parse_announcement(data)
+        event = None
+        if not device_service.has_device(instance):
+            await device_service.create_device(
+                DeviceCreate(id=instance, name=data.get("HostName") or instance, **fields),
+                publish=False,
+            )
+            self.created += 1
+            event = device_service.device_event("device.discovered", instance)
+            logger.info("Device registered from discovery", device_id=instance)
+        elif device_service.apply_changes(instance, fields):
+            await device_service.share(instance)
+            self.updated += 1
+            event = device_service.device_event("device.updated", instance)
+            logger.info("Device updated from discovery", device_id=instance)
+        else:
+            self.unchanged += 1
+        self._applied[instance] = mark
+        return event
+
+    def stats(self) -> Dict[str, Any]:
+        """Pending announcements and counters"""
+        return {
+            "window": self.window,
+            "pending": self.pending,
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "unchanged": self.unchanged,
+            "created": self.created,
+            "updated": self.updated,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+# Singleton instance
+discovery_coalescer = DiscoveryCoalescer()
@@ -0,0 +1,266 @@
+"""
+Flow persistence through the Flow and FlowVersion SQL models
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import structlog
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.flow import Flow, FlowElement, FlowVersion
+from app.services.device_persistence import dialect_insert, naive_utc
+from app.services.flow_store import Manifest, build_config
+
+logger = structlog.get_logger()
+
+# Everything but the config; listing flows only ever reads these
+SUMMARY_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "target_nodes",
+    "flow_metadata",
+    "deployed",
+    "deployed_at",
+    "version",
+    "created_at",
+    "updated_at",
+)
+
+# Hashes per IN (...) lookup of flow elements
+_HASH_BATCH = 500
+
+
+def row_to_summary(row: Flow) -> Dict[str, Any]:
+    """Convert a ``flows`` row to a flow dict without its config"""
+    summary = {column: getattr(row, column) for column in SUMMARY_COLUMNS}
+    for column in ("deployed_at", "created_at", "updated_at"):
+        summary[column] = naive_utc(summary[column])
+    summary["target_nodes"] = summary["target_nodes"] or []
+    summary["flow_metadata"] = summary["flow_metadata"] or {}
+    return summary
+
+
+class ConfigCache:
+    """LRU cache of flow configs keyed by (flow id, version)"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, flow_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Cached config, marking it most recently used"""
+        config = self._items.get((flow_id, version))
+        if config is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end((flow_id, version))
+        self.hits += 1
+        return config
+
+    def put(self, flow_id: str, version: int, config: Dict[str, Any]):
+        """Cache a config, evicting the least recently used beyond ``max_size``"""
+        self._items[(flow_id, version)] = config
+        self._items.move_to_end((flow_id, version))
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, flow_id: str):
+        """Drop every cached version of a flow"""
+        for key in [key for key in self._items if key[0] == flow_id]:
+            del self._items[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit counters"""
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class FlowRepository:
+    """Flows and their version history in SQL
+
+    ``flows.config`` is a deferred column: listing reads only the small
+    columns and a config is fetched by itself when a single flow is opened
+    or deployed. History is content-addressed like ``FlowStore``: a
+    ``flow_versions`` row holds only the version's manifest, and each node
+    or tab is stored once in ``flow_elements`` under its hash, so a new
+    version writes just the elements that changed. Writes go straight
+    through, since flows change at human speed. Without a database the
+    repository keeps everything in memory instead.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None):
+        self.session_factory = session_factory
+        self._resolved = session_factory is not None
+
+        # In-memory fallback when no database is configured
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._elements: Dict[str, Any] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a database is configured"""
+        self._resolve_session_factory()
+        return self.session_factory is not None
+
+    def _resolve_session_factory(self):
+        if not self._resolved:
+            from app.db.session import AsyncSessionLocal
+
+            self.session_factory = AsyncSessionLocal
+            self._resolved = True
+
+    async def list_flows(self) -> List[Dict[str, Any]]:
+        """Every flow without its config"""
+        if not self.enabled:
+            return []
+        async with self.session_factory() as session:
+            rows = await session.scalars(select(Flow).order_by(Flow.created_at))
+            flows = [row_to_summary(row) for row in rows]
+        logger.info("Flows loaded from database", count=len(flows))
+        return flows
+
+    async def get_config(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        """The current config of one flow"""
+        if not self.enabled:
+            return self._configs.get(flow_id)
+        async with self.session_factory() as session:
+            return await session.scalar(select(Flow.config).where(Flow.id == flow_id))
+
+    async def save(self, flow: Dict[str, Any], config: Optional[Dict[str, Any]] = None, created: bool = False):
+        """Insert or update a flow; ``config`` is only written when given"""
+        if not self.enabled:
+            if config is not None:
+                self._configs[flow["id"]] = config
+            return
+
+        values = {column: flow[column] for column in SUMMARY_COLUMNS}
+        if config is not None:
+            values["config"] = config
+        async with self.session_factory() as session:
+            async with session.begin():
+                if created:
+                    session.add(Flow(**values))
+                else:
+                    await session.execute(update(Flow).where(Flow.id == flow["id"]).values(**values))
+
+    async def add_version(
+        self,
+        flow_id: str,
+        version: int,
+        root: str,
+        manifest: Manifest,
+        elements: Dict[str, Any],
+    ):
+        """Record a version in the flow's history
+        
+        ``elements`` maps the hashes in ``manifest`` to their content; only
+        the ones not stored yet are written.
+        """
+        record = {"version": version, "root": root, "elements": len(manifest)}
+        if not self.enabled:
+            for digest, value in elements.items():
+                self._elements.setdefault(digest, value)
+            self._versions.setdefault(flow_id, {})[version] = {
+                **record,
+                "created_at": datetime.utcnow(),
+                "manifest": manifest,
+            }
+            return
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                stored = set()
+                digests = list(elements)
+                for start in range(0, len(digests), _HASH_BATCH):
+                    stored.update(await session.scalars(
+                        select(FlowElement.hash).where(FlowElement.hash.in_(digests[start:start + _HASH_BATCH]))
+                    ))
+                rows = [{"hash": digest, "value": value} for digest, value in elements.items() if digest not in stored]
+                if rows:
+                    insert = dialect_insert(session.get_bind().dialect.name)
+                    if insert is None:
+                        for row in rows:
+                            await session.merge(FlowElement(**row))
+                    else:
+                        # Another worker may store the same element meanwhile
+                        stmt = insert(FlowElement.__table__).on_conflict_do_nothing(
+                            index_elements=[FlowElement.__table__.c.hash]
+                        )
+                        await session.execute(stmt, rows)
+                session.add(FlowVersion(flow_id=flow_id, manifest=[list(entry) for entry in manifest], **record))
+
+    async def list_versions(self, flow_id: str) -> List[Dict[str, Any]]:
+        """Version history without configs, oldest first"""
+        if not self.enabled:
+            versions = self._versions.get(flow_id, {})
+            return [
+                {key: value for key, value in versions[version].items() if key != "manifest"}
+                for version in sorted(versions)
+            ]
+
+        async with self.session_factory() as session:
+            rows = await session.scalars(
+                select(FlowVersion).where(FlowVersion.flow_id == flow_id).order_by(FlowVersion.version)
+            )
+            return [
+                {
+                    "version": row.version,
+                    "root": row.root,
+                    "elements": row.elements,
+                    "created_at": naive_utc(row.created_at),
+                }
+                for row in rows
+            ]
+
+    async def get_version_config(self, flow_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Config of one version, rebuilt from its manifest"""
+        if not self.enabled:
+            record = self._versions.get(flow_id, {}).get(version)
+            return None if record is None else build_config(record["manifest"], self._elements)
+
+        async with self.session_factory() as session:
+            manifest = await session.scalar(
+                select(FlowVersion.manifest).where(
+                    FlowVersion.flow_id == flow_id,
+                    FlowVersion.version == version,
+                )
+            )
+            if manifest is None:
+                return None
+            elements = await self._load_elements(session, {digest for _, digest in manifest})
+        return build_config(manifest, elements)
+
+    @staticmethod
+    async def _load_elements(session: AsyncSession, digests: Sequence[str]) -> Dict[str, Any]:
+        digests = list(digests)
+        elements: Dict[str, Any] = {}
+        for start in range(0, len(digests), _HASH_BATCH):
+            rows = await session.execute(
+                select(FlowElement.hash, FlowElement.value).where(
+                    FlowElement.hash.in_(digests[start:start + _HASH_BATCH])
+                )
+            )
+            elements.update(rows.tuples().all())
+        return elements
+
+
+# Singleton instance
+flow_repository = FlowRepository()
@@ -2,22 +2,107 @@
 Flow management service for Node-RED flows
 """
 
-from typing import List, Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
+import asyncio
+import time
 import uuid
 import structlog
+from nats.errors import NoRespondersError, TimeoutError as NATSTimeoutError
 
-from app.schemas.flow import FlowCreate, FlowUpdate, FlowResponse
+from app.schemas.flow import FlowCreate, FlowUpdate, FlowResponse, FlowSummary, NodeDeployStatus
+from app.core import codec
+from app.core.config import settings
 from app.core.nats import nats_client
+from app.services.flow_repository import ConfigCache, flow_repository
+from app.services.flow_store import FlowStore
+from app.services.shared_state import shared_state
 
 logger = structlog.get_logger()
 
 
 class FlowService:
-    """Service for managing Node-RED flows"""
+    """Service for managing Node-RED flows
+    
+    Flows are persisted with their version history by the flow repository.
+    A version is a config: editing only the name, description, targets or
+    metadata of a flow keeps its version.
+    Only flow summaries stay in memory; configs are loaded when a flow is
+    opened or deployed and kept in an LRU cache. Versions that nodes have
+    acknowledged are kept in a content-addressed ``FlowStore``, so a deploy
+    to such a node sends only a delta against its version.
+    
+    With several workers, summaries changed through the API are shared
+    through ``shared_state``. Acknowledged versions stay per worker, so a
+    worker that did not run the last deploy sends full configs.
+    """
     
     def __init__(self):
+        # Flow summaries (everything but the config)
         self._flows: Dict[str, Dict[str, Any]] = {}
+        self._configs = ConfigCache(settings.FLOW_CONFIG_CACHE_SIZE)
+        self.store = FlowStore()
+        # Last deployment report per flow
+        self._deployments: Dict[str, Dict[str, Any]] = {}
+        # flow id -> node -> last version the node acknowledged
+        self._acked: Dict[str, Dict[str, int]] = {}
+        # flow id -> version -> number of deploys of it in flight
+        self._deploying: Dict[str, Dict[int, int]] = {}
+    
+    async def start(self):
+        """Load flow summaries from the database"""
+        for flow in await flow_repository.list_flows():
+            self._flows[flow["id"]] = flow
+        shared_state.on_invalidate("flows", self._reload_shared)
+    
+    async def _share(self, flow: Dict[str, Any], config: Optional[Dict[str, Any]] = None):
+        """Hand an API change to the other workers"""
+        if not shared_state.enabled:
+            return
+        record: Dict[str, Any] = {"flow": flow}
+        if config is not None and not flow_repository.enabled:
+            # Without a database the config only exists in this worker
+            record["config"] = config
+        await shared_state.put("flows", flow["id"], record)
+    
+    async def _reload_shared(self, flow_ids: List[str]):
+        """Re-read flows another worker changed"""
+        for flow_id in flow_ids:
+            record = await shared_state.get("flows", flow_id)
+            self._configs.discard(flow_id)
+            if record is None:
+                self._flows.pop(flow_id, None)
+                continue
+            flow = FlowSummary(**record["flow"]).model_dump()
+            if "config" in record:
+                await flow_repository.save(flow, record["config"])
+            self._flows[flow_id] = flow
+    
+    async def _config(self, flow: Dict[str, Any]) -> Dict[str, Any]:
+        """Current config of a flow, from the cache or the repository"""
+        version = flow["version"]
+        config = self._configs.get(flow["id"], version)
+        if config is None:
+            config = await flow_repository.get_config(flow["id"]) or {}
+            # Only cache it if no update landed while it loaded
+            if flow["version"] == version:
+                self._configs.put(flow["id"], version, config)
+        return config
+    
+    async def _commit_version(self, flow_id: str, version: int, config: Dict[str, Any]):
+        """Record a new version in the store, the repository and the cache"""
+        record = self.store.commit(flow_id, version, config)
+        self._prune(flow_id, version)
+        await flow_repository.add_version(
+            flow_id, version, record["root"], record["manifest"], self.store.elements(record["manifest"])
+        )
+        self._configs.put(flow_id, version, config)
+    
+    def _prune(self, flow_id: str, *keep: int):
+        """Forget stored versions except ``keep``, acknowledged ones and ones being deployed"""
+        self.store.prune(
+            flow_id, {*keep, *self._acked.get(flow_id, {}).values(), *self._deploying.get(flow_id, {})}
+        )
     
     async def create_flow(self, flow_data: FlowCreate) -> FlowResponse:
         """Create a new flow"""
@@ -26,7 +111,6 @@ class FlowService:
             "id": flow_id,
             "name": flow_data.name,
             "description": flow_data.description,
-            "config": flow_data.config,
             "target_nodes": flow_data.target_nodes,
             "flow_metadata": flow_data.flow_metadata,
             "deployed": False,
@@ -36,16 +120,19 @@ class FlowService:
             "updated_at": datetime.utcnow(),
         }
         
+        await flow_repository.save(flow, flow_data.config, created=True)
+        await self._commit_version(flow_id, flow["version"], flow_data.config)
         self._flows[flow_id] = flow
+        await self._share(flow, flow_data.config)
         
         logger.info("Flow created", flow_id=flow_id, name=flow_data.name)
-        return FlowResponse(**flow)
+        return FlowResponse(**flow, config=flow_data.config)
     
     async def get_flow(self, flow_id: str) -> Optional[FlowResponse]:
         """Get flow by ID"""
         flow = self._flows.get(flow_id)
         if flow:
-            return FlowResponse(**flow)
+            return FlowResponse(**flow, config=await self._config(flow))
         return None
     
     async def update_flow(self, flow_id: str, update_data: FlowUpdate) -> Optional[FlowResponse]:
@@ -54,61 +141,267 @@ class FlowService:
         if not flow:
             return None
         
-        # Update fields
+        # Update fields; only a new config makes a new version
         update_dict = update_data.model_dump(exclude_unset=True)
-        if update_dict:
+        new_config = update_dict.pop("config", None)
+        config = await self._config(flow)
+        config_changed = new_config is not None and new_config != config
+        if config_changed:
+            config = new_config
+        if update_dict or config_changed:
             flow.update(update_dict)
             flow["updated_at"] = datetime.utcnow()
-            flow["version"] += 1
             
-            # If config changed and flow is deployed, mark as needing redeploy
-            if "config" in update_dict and flow["deployed"]:
-                flow["deployed"] = False
-                flow["deployed_at"] = None
+            if config_changed:
+                flow["version"] += 1
+                # A deployed flow needs a redeploy
+                if flow["deployed"]:
+                    flow["deployed"] = False
+                    flow["deployed_at"] = None
+            
+            await flow_repository.save(flow, config if config_changed else None)
+            if config_changed:
+                await self._commit_version(flow_id, flow["version"], config)
+            await self._share(flow, config if config_changed else None)
         
         logger.info("Flow updated", flow_id=flow_id, version=flow["version"])
-        return FlowResponse(**flow)
+        return FlowResponse(**flow, config=config)
     
-    async def list_flows(self, deployed_only: bool = False) -> List[FlowResponse]:
-        """List all flows"""
+    async def list_flows(self, deployed_only: bool = False) -> List[FlowSummary]:
+        """List all flows, without their configs"""
         flows = list(self._flows.values())
         
         if deployed_only:
             flows = [f for f in flows if f["deployed"]]
         
-        return [FlowResponse(**f) for f in flows]
+        return [FlowSummary(**f) for f in flows]
     
-    async def deploy_flow(self, flow_id: str, target_nodes: Optional[List[str]] = None) -> Optional[FlowResponse]:
-        """Deploy flow to nodes"""
+    async def deploy_flow(self, flow_id: str, target_nodes: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Deploy flow to nodes and wait for each node to acknowledge
+        
+        Every node gets a ``node.{node}.flow.deploy`` request concurrently,
+        up to ``FLOW_DEPLOY_CONCURRENCY`` at a time, and has
+        ``FLOW_DEPLOY_TIMEOUT`` seconds to reply ``{"status": "ok"}``.
+        Returns the deployment report, or None if the flow does not exist or
+        has no targets.
+        """
         flow = self._flows.get(flow_id)
         if not flow:
             return None
         
         # Use specified nodes or flow's default targets
-        nodes = target_nodes or flow["target_nodes"]
+        nodes = list(dict.fromkeys(target_nodes or flow["target_nodes"]))
         if not nodes:
             logger.error("No target nodes specified for deployment", flow_id=flow_id)
             return None
         
-        # Publish deployment command
-        deployment = {
+        # Deploy the version current now; updates during the deploy bump
+        # flow["version"] and leave the flow needing a redeploy
+        while True:
+            version = flow["version"]
+            config = await self._config(flow)
+            if flow["version"] == version:
+                break
+        # Keep this version stored until the deploy ends, whatever is committed meanwhile
+        deploying = self._deploying.setdefault(flow_id, {})
+        deploying[version] = deploying.get(version, 0) + 1
+        try:
+            return await self._deploy(flow, nodes, version, config)
+        finally:
+            deploying[version] -= 1
+            if not deploying[version]:
+                del deploying[version]
+            self._prune(flow_id, flow["version"])
+    
+    async def _deploy(
+        self,
+        flow: Dict[str, Any],
+        nodes: List[str],
+        version: int,
+        config: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Deploy one version of a flow to every node and build the report"""
+        flow_id = flow["id"]
+        record = self.store.get(flow_id, version) or self.store.commit(flow_id, version, config)
+        acked = self._acked.setdefault(flow_id, {})
+        payloads: Dict[Optional[int], Tuple[str, bytes]] = {}
+        
+        def payload(base: Optional[int]) -> Tuple[str, bytes]:
+            """Encoded deploy message against a base version, built once per base"""
+            if base not in payloads:
+                payloads[base] = self._deploy_message(flow_id, version, record, config, base)
+            return payloads[base]
+        
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        results = {
+            node: {
+                "node": node,
+                "status": NodeDeployStatus.pending,
+                "mode": None,
+                "bytes_sent": 0,
+                "latency_ms": None,
+                "error": None,
+            }
+            for node in nodes
+        }
+        semaphore = asyncio.Semaphore(settings.FLOW_DEPLOY_CONCURRENCY)
+        await asyncio.gather(
+            *(self._deploy_to_node(results[node], acked.get(node), payload, semaphore) for node in nodes)
+        )
+        for node, result in results.items():
+            if result["status"] == NodeDeployStatus.ok:
+                acked[node] = version
+        
+
+        counts = {status: 0 for status in NodeDeployStatus}
+        for result in results.values():
+            counts[result["status"]] += 1
+        
+        # Update flow status, unless it was updated while deploying
+        current = flow["version"] == version
+        if counts[NodeDeployStatus.ok] and current:
+            flow["deployed"] = True
+            flow["deployed_at"] = datetime.utcnow()
+            flow["updated_at"] = flow["deployed_at"]
+            await flow_repository.save(flow)
+            await self._share(flow)
+        
+        report = {
+            "flow_id": flow_id,
+            "version": version,
+            "deployed": current and flow["deployed"],
+            "deployed_at": flow["deployed_at"] if current else None,
+            "started_at": started_at,
+            "duration_ms": (time.perf_counter() - start) * 1000,
+            "succeeded": counts[NodeDeployStatus.ok],
+            "failed": counts[NodeDeployStatus.failed],
+            "timed_out": counts[NodeDeployStatus.timed_out],
+            "bytes_sent": sum(result["bytes_sent"] for result in results.values()),
+            "nodes": list(results.values()),
+        }
+        self._deployments[flow_id] = report
+        
+        unconfirmed = [node for node, result in results.items() if result["status"] != NodeDeployStatus.ok]
+        if unconfirmed:
+            logger.warning("Flow deployment incomplete", flow_id=flow_id, unconfirmed=unconfirmed)
+        logger.info(
+            "Flow deployed",
+            flow_id=flow_id,
+            nodes=len(nodes),
+            succeeded=report["succeeded"],
+            duration_ms=round(report["duration_ms"], 1),
+        )
+        return report
+    
+    def _deploy_message(
+        self,
+        flow_id: str,
+        version: int,
+        record: Dict[str, Any],
+        config: Dict[str, Any],
+        base: Optional[int],
+    ) -> Tuple[str, bytes]:
+        """Deploy message of ``version`` for a node holding ``base``: a delta, or the full config
+        
+        Returns the mode ("delta" or "full") and the encoded message. The
+        delta is only used when it is smaller than the full config.
+        """
+        message = {
             "flow_id": flow_id,
-            "config": flow["config"],
-            "version": flow["version"],
+            "version": version,
+            "root": record["root"],
             "timestamp": datetime.utcnow().isoformat(),
         }
+        full = codec.dumps({**message, "config": config})
         
-        for node in nodes:
-            subject = f"node.{node}.flow.deploy"
-            await nats_client.publish(subject, deployment)
+        base_record = None if base is None else self.store.get(flow_id, base)
+        operations = None if base_record is None else self.store.diff(flow_id, base, version)
+        if operations is None:
+            return "full", full
+        delta = codec.dumps({
+            **message,
+            "base_version": base,
+            "base_root": base_record["root"],
+            "delta": operations,
+        })
+        return ("delta", delta) if len(delta) < len(full) else ("full", full)
+    
+    async def _deploy_to_node(
+        self,
+        result: Dict[str, Any],
+        base: Optional[int],
+        payload: Callable[[Optional[int]], Tuple[str, bytes]],
+        semaphore: asyncio.Semaphore,
+    ):
+        """Deploy to one node and record the outcome in ``result``
         
-        # Update flow status
-        flow["deployed"] = True
-        flow["deployed_at"] = datetime.utcnow()
-        flow["updated_at"] = datetime.utcnow()
+        A node that rejects a delta (e.g. it no longer holds the base
+        version) is sent the full config once.
+        """
+        async with semaphore:
+            result["mode"], message = payload(base)
+            await self._send_deploy(result, message)
+            if result["mode"] == "delta" and result["status"] == NodeDeployStatus.failed:
+                logger.info("Delta deploy rejected, sending full config", node=result["node"], error=result["error"])
+                result["mode"], message = payload(None)
+                result["error"] = None
+                await self._send_deploy(result, message)
+    
+    async def _send_deploy(self, result: Dict[str, Any], message: bytes):
+        """Send one deploy request and record its outcome in ``result``"""
+        subject = f"node.{result['node']}.flow.deploy"
+        result["bytes_sent"] += len(message)
+        start = time.perf_counter()
+        try:
+            reply = await nats_client.request(subject, message, timeout=settings.FLOW_DEPLOY_TIMEOUT)
+        except NATSTimeoutError:
+            result["status"] = NodeDeployStatus.timed_out
+            return
+        except NoRespondersError:
+            result["status"] = NodeDeployStatus.failed
+            result["error"] = "no responders"
+            return
+        except Exception as e:
+            result["status"] = NodeDeployStatus.failed
+            result["error"] = str(e)
+            return
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
         
-        logger.info("Flow deployed", flow_id=flow_id, nodes=nodes)
-        return FlowResponse(**flow)
+        if isinstance(reply, dict) and reply.get("status") == "ok":
+            result["status"] = NodeDeployStatus.ok
+        else:
+            result["status"] = NodeDeployStatus.failed
+            result["error"] = (reply.get("error") if isinstance(reply, dict) else None) or "deployment rejected"
+    
+    async def get_versions(self, flow_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Version history of a flow, oldest first"""
+        if flow_id not in self._flows:
+            return None
+        return await flow_repository.list_versions(flow_id)
+    
+    async def get_version_config(self, flow_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Config of one version of a flow"""
+        if flow_id not in self._flows:
+            return None
+        config = self._configs.get(flow_id, version)
+        if config is None:
+            config = await flow_repository.get_version_config(flow_id, version)
+            if config is not None:
+                self._configs.put(flow_id, version, config)
+        return config
+    
+    def stats(self) -> Dict[str, Any]:
+        """Registry size and config cache counters"""
+        return {
+            "flows": len(self._flows),
+            "deployed": sum(1 for flow in self._flows.values() if flow["deployed"]),
+            "config_cache": self._configs.stats(),
+        }
+    
+    def get_deployment(self, flow_id: str) -> Optional[Dict[str, Any]]:
+        """Report of the flow's most recent deployment"""
+        return self._deployments.get(flow_id)
     
     async def undeploy_flow(self, flow_id: str) -> Optional[FlowResponse]:
         """Undeploy flow from nodes"""
@@ -126,13 +419,17 @@ class FlowService:
             subject = f"node.{node}.flow.undeploy"
             await nats_client.publish(subject, undeploy_cmd)
         
-        # Update flow status
+        # Update flow status; the next deploy sends the full config
         flow["deployed"] = False
         flow["deployed_at"] = None
         flow["updated_at"] = datetime.utcnow()
+        self._acked.pop(flow_id, None)
+        self._prune(flow_id, flow["version"])
+        await flow_repository.save(flow)
+        await self._share(flow)
         
         logger.info("Flow undeployed", flow_id=flow_id)
-        return FlowResponse(**flow)
+        return FlowResponse(**flow, config=await self._config(flow))
 
 
 # Singleton instance
@@ -0,0 +1,205 @@
+"""
+Content-addressed flow configuration store with version history
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from datetime import datetime
+import copy
+import hashlib
+import json
+import structlog
+
+logger = structlog.get_logger()
+
+# (element path, content hash) in config order
+Manifest = List[Tuple[str, str]]
+
+
+def content_hash(value: Any) -> str:
+    """SHA-256 of a value's canonical JSON form"""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _is_keyed_list(value: Any) -> bool:
+    """Lists of Node-RED nodes, tabs or edges: dicts that all carry a unique id"""
+    if not isinstance(value, list) or not value:
+        return False
+    if not all(isinstance(item, dict) and "id" in item for item in value):
+        return False
+    return len({str(item["id"]) for item in value}) == len(value)
+
+
+def split_config(config: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """Split a flow config into addressable elements
+
+    Items of id-keyed lists become ``/<key>/<id>``; every other top-level
+    value is one element at ``/<key>``.
+    """
+    elements: List[Tuple[str, Any]] = []
+    for key, value in config.items():
+        if _is_keyed_list(value):
+            elements.extend((f"/{key}/{item['id']}", item) for item in value)
+        else:
+            elements.append((f"/{key}", value))
+    return elements
+
+
+def build_config(manifest: Sequence[Sequence[str]], elements: Mapping[str, Any]) -> Dict[str, Any]:
+    """Rebuild a config from its manifest and the elements it references"""
+    config: Dict[str, Any] = {}
+    for path, digest in manifest:
+        parts = path.split("/", 2)[1:]
+        value = copy.deepcopy(elements[digest])
+        if len(parts) == 1:
+            config[parts[0]] = value
+        else:
+            config.setdefault(parts[0], []).append(value)
+    return config
+
+
+def apply_delta(config: Dict[str, Any], delta: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply a delta from ``FlowStore.diff`` to a copy of a config
+
+    This is the reference for what nodes do with a delta deploy.
+    """
+    result = copy.deepcopy(config)
+    for op in delta:
+        parts = op["path"].split("/", 2)[1:]
+        key = parts[0]
+        if len(parts) == 1:
+            if op["op"] == "remove":
+                result.pop(key, None)
+            else:
+                result[key] = copy.deepcopy(op["value"])
+            continue
+
+        item_id = parts[1]
+        items = result.get(key)
+        if not isinstance(items, list):
+            items = result[key] = []
+        position = next((i for i, item in enumerate(items) if str(item.get("id")) == item_id), None)
+        if op["op"] == "remove":
+            if position is not None:
+                del items[position]
+        elif position is None:
+            items.append(copy.deepcopy(op["value"]))
+        else:
+            items[position] = copy.deepcopy(op["value"])
+    return result
+
+
+class FlowStore:
+    """Flow configs stored as content-addressed elements plus per-version manifests
+
+    Each node, tab or edge is stored once under the hash of its content and
+    shared by every version (and flow) that contains it, so a new version
+    costs one manifest plus the elements that actually changed. Diffs
+    between versions compare manifests hash by hash and never touch
+    unchanged content.
+    """
+
+    def __init__(self):
+        self._blobs: Dict[str, Any] = {}
+        self._refs: Dict[str, int] = {}
+        # flow id -> version -> manifest record
+        self._versions: Dict[str, Dict[int, Dict[str, Any]]] = {}
+
+    def commit(self, flow_id: str, version: int, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a config as ``version`` of a flow"""
+        manifest: Manifest = []
+        for path, value in split_config(config):
+            digest = content_hash(value)
+            if digest not in self._blobs:
+                self._blobs[digest] = copy.deepcopy(value)
+            self._refs[digest] = self._refs.get(digest, 0) + 1
+            manifest.append((path, digest))
+
+        record = {
+            "version": version,
+            "root": content_hash(manifest),
+            "manifest": manifest,
+            "created_at": datetime.utcnow(),
+        }
+        history = self._versions.setdefault(flow_id, {})
+        if version in history:
+            self._release(history[version]["manifest"])
+        history[version] = record
+        return record
+
+    def _release(self, manifest: Manifest):
+        for _, digest in manifest:
+            refs = self._refs.get(digest, 0) - 1
+            if refs > 0:
+                self._refs[digest] = refs
+            else:
+                self._refs.pop(digest, None)
+                self._blobs.pop(digest, None)
+
+    def delete(self, flow_id: str):
+        """Drop a flow's history and any content only it referenced"""
+        for record in self._versions.pop(flow_id, {}).values():
+            self._release(record["manifest"])
+
+    def prune(self, flow_id: str, keep: Iterable[int]):
+        """Forget every version of a flow except ``keep``"""
+        keep = set(keep)
+        history = self._versions.get(flow_id, {})
+        for version in [version for version in history if version not in keep]:
+            self._release(history.pop(version)["manifest"])
+
+    def get(self, flow_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Version record (version, root, manifest, created_at)"""
+        return self._versions.get(flow_id, {}).get(version)
+
+    def history(self, flow_id: str) -> List[Dict[str, Any]]:
+        """Version records, oldest first"""
+        history = self._versions.get(flow_id, {})
+        return [history[version] for version in sorted(history)]
+
+    def config(self, flow_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Rebuild the config of a version"""
+        record = self.get(flow_id, version)
+        if record is None:
+            return None
+        return build_config(record["manifest"], self._blobs)
+
+    def elements(self, manifest: Manifest) -> Dict[str, Any]:
+        """Stored content of every element a manifest references, by hash"""
+        return {digest: self._blobs[digest] for _, digest in manifest}
+
+    def diff(self, flow_id: str, base: int, target: int) -> Optional[List[Dict[str, Any]]]:
+        """JSON-patch-style operations turning ``base`` into ``target``
+
+        Operations are ``add``, ``replace`` and ``remove`` on element paths
+        (see ``split_config``). Returns None if either version is unknown.
+        """
+        old = self.get(flow_id, base)
+        new = self.get(flow_id, target)
+        if old is None or new is None:
+            return None
+
+        before = dict(old["manifest"])
+        after = dict(new["manifest"])
+        # Removals first, so a list that was a single element can become items
+        delta: List[Dict[str, Any]] = [
+            {"op": "remove", "path": path} for path, _ in old["manifest"] if path not in after
+        ]
+        for path, digest in new["manifest"]:
+            previous = before.get(path)
+            if previous == digest:
+                continue
+            delta.append({
+                "op": "add" if previous is None else "replace",
+                "path": path,
+                "value": self._blobs[digest],
+            })
+        return delta
+
+    def stats(self) -> Dict[str, Any]:
+        """Stored flows, versions and unique elements"""
+        return {
+            "flows": len(self._versions),
+            "versions": sum(len(history) for history in self._versions.values()),
+            "elements": len(self._blobs),
+        }
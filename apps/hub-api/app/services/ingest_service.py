@@ -0,0 +1,261 @@
+"""
+Batched ingest pipeline for high-rate NATS subjects
+"""
+
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from collections import deque
+from enum import Enum
+import asyncio
+import time
+import structlog
+from nats.aio.msg import Msg
+
+from app.core import codec
+from app.core.config import settings
+from app.core.metrics import NATS_HANDLER_DURATION
+from app.core.profiling import current_operation
+
+logger = structlog.get_logger()
+
+# A batch handler receives the decoded payloads together with their messages
+BatchHandler = Callable[[List[Tuple[Dict[str, Any], Msg]]], Awaitable[None]]
+
+
+class OverflowPolicy(str, Enum):
+    """What to do when an ingest queue is full"""
+    drop_oldest = "drop_oldest"
+    drop_newest = "drop_newest"
+    block = "block"
+
+
+class IngestQueue:
+    """Bounded queue that drains one subscription in micro-batches.
+
+    NATS callbacks only append the raw message; decoding and handling happen
+    in a single worker task per queue, one batch at a time. A batch is cut
+    when ``batch_size`` messages are waiting or ``batch_interval`` seconds
+    have passed since the first one arrived, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        subject: str,
+        handler: BatchHandler,
+        max_size: int,
+        batch_size: int,
+        batch_interval: float,
+        policy: OverflowPolicy,
+    ):
+        self.subject = subject
+        self.handler = handler
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.policy = OverflowPolicy(policy)
+
+        self._items: Deque[Msg] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._latency = NATS_HANDLER_DURATION.labels(subject)
+
+        # Counters
+        self.received = 0
+        self.bytes_received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.decode_errors = 0
+        self.handler_errors = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of messages waiting to be processed"""
+        return len(self._items)
+
+    def start(self):
+        """Start the worker task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"ingest:{self.subject}")
+
+    async def stop(self):
+        """Stop the worker task, discarding anything still queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def offer(self, msg: Msg) -> bool:
+        """Enqueue without waiting; returns False if the message was dropped"""
+        self.received += 1
+        self.bytes_received += len(msg.data)
+
+        if len(self._items) >= self.max_size:
+            if self.policy == OverflowPolicy.drop_newest:
+                self.dropped += 1
+                return False
+            # drop_oldest (and block callers that could not wait)
+            self._items.popleft()
+            self.dropped += 1
+
+        self._append(msg)
+        return True
+
+    async def put(self, msg: Msg):
+        """Enqueue a message, honouring the overflow policy"""
+        if self.policy != OverflowPolicy.block:
+            self.offer(msg)
+            return
+
+        self.received += 1
+        self.bytes_received += len(msg.data)
+        while len(self._items) >= self.max_size:
+            self._not_full.clear()
+            await self._not_full.wait()
+        self._append(msg)
+
+    def _append(self, msg: Msg):
+        self._items.append(msg)
+        self._not_empty.set()
+        if len(self._items) >= self.batch_size:
+            self._batch_ready.set()
+        if len(self._items) >= self.max_size:
+            self._not_full.clear()
+
+    def _take_batch(self) -> List[Msg]:
+        count = min(len(self._items), self.batch_size)
+        popleft = self._items.popleft
+        batch = [popleft() for _ in range(count)]
+
+        if not self._items:
+            self._not_empty.clear()
+        if len(self._items) < self.batch_size:
+            self._batch_ready.clear()
+        self._not_full.set()
+        return batch
+
+    def _decode(self, batch: List[Msg]) -> List[Tuple[Dict[str, Any], Msg]]:
+        decoded = []
+        for msg in batch:
+            try:
+                data = codec.loads(msg.data)
+            except codec.DecodeError:
+                self.decode_errors += 1
+                continue
+            # Handlers expect a JSON object; arrays and scalars count as bad messages
+            if isinstance(data, dict):
+                decoded.append((data, msg))
+            else:
+                self.decode_errors += 1
+        return decoded
+
+    async def _run(self):
+        current_operation.set(f"nats {self.subject}")
+        while True:
+            await self._not_empty.wait()
+
+            # Give the batch a chance to fill up before processing it
+            if len(self._items) < self.batch_size and self.batch_interval > 0:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.batch_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._take_batch()
+            if not batch:
+                continue
+
+            decoded = self._decode(batch)
+            self.batches += 1
+            if not decoded:
+                continue
+
+            start = time.perf_counter()
+            try:
+                await self.handler(decoded)
+                self.processed += len(decoded)
+            except Exception as e:
+                self.handler_errors += 1
+                logger.error("Ingest handler error", subject=self.subject, error=str(e))
+            self._latency.observe(time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and counters"""
+        return {
+            "subject": self.subject,
+            "policy": self.policy.value,
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "received": self.received,
+            "bytes_received": self.bytes_received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "decode_errors": self.decode_errors,
+            "handler_errors": self.handler_errors,
+        }
+
+
+class IngestPipeline:
+    """Collection of ingest queues, one per subscribed subject"""
+
+    def __init__(self):
+        self._queues: Dict[str, IngestQueue] = {}
+
+    def add_queue(
+        self,
+        subject: str,
+        handler: BatchHandler,
+        max_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        batch_interval: Optional[float] = None,
+        policy: Optional[OverflowPolicy] = None,
+    ) -> IngestQueue:
+        """Create and start the queue for a subject"""
+        if subject in self._queues:
+            logger.warning("Ingest queue already exists", subject=subject)
+            return self._queues[subject]
+
+        queue = IngestQueue(
+            subject=subject,
+            handler=handler,
+            max_size=max_size or settings.INGEST_QUEUE_SIZE,
+            batch_size=batch_size or settings.INGEST_BATCH_SIZE,
+            batch_interval=(
+                settings.INGEST_BATCH_INTERVAL if batch_interval is None else batch_interval
+            ),
+            policy=policy or settings.INGEST_OVERFLOW_POLICY,
+        )
+        queue.start()
+        self._queues[subject] = queue
+
+        logger.info("Ingest queue created", subject=subject, policy=queue.policy.value)
+        return queue
+
+    def get_queue(self, subject: str) -> Optional[IngestQueue]:
+        """Get the queue for a subject"""
+        return self._queues.get(subject)
+
+    async def remove_queue(self, subject: str):
+        """Stop and remove the queue for a subject"""
+        queue = self._queues.pop(subject, None)
+        if queue:
+            await queue.stop()
+
+    async def stop(self):
+        """Stop all queues"""
+        for subject in list(self._queues):
+            await self.remove_queue(subject)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Stats for every queue"""
+        return [queue.stats() for queue in self._queues.values()]
+
+
+# Singleton instance
+ingest_pipeline = IngestPipeline()
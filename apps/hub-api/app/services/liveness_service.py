@@ -0,0 +1,204 @@
+"""
+Heartbeat-driven liveness tracking for devices and nodes
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import time
+import structlog
+
+from app.core.config import settings
+from app.core.timing_wheel import TimingWheel
+
+logger = structlog.get_logger()
+
+# Called with the keys that changed state
+TransitionHandler = Callable[[List[str]], Awaitable[None]]
+
+
+class LivenessTracker:
+    """Last-heartbeat table with timing-wheel expiry
+
+    A heartbeat is a dict write. Each live key sits in the wheel once, at
+    its last known deadline; when that deadline passes, keys that have beaten
+    since are re-inserted at ``last_seen + ttl`` instead of being expired, so
+    a key is touched by the wheel about once per ``ttl`` however often it
+    beats. Nothing scans the whole table.
+    """
+
+    def __init__(self, name: str, ttl: float, tick: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.ttl = ttl
+        self._clock = clock
+        self._last_seen: Dict[str, float] = {}
+        self._wheel = TimingWheel(tick, slots=max(64, int(ttl / tick) + 1), start=clock())
+
+        # Counters
+        self.beats = 0
+        self.went_online = 0
+        self.went_offline = 0
+
+    @property
+    def tick(self) -> float:
+        return self._wheel.tick
+
+    def is_alive(self, key: str) -> bool:
+        """Whether a key has beaten within the last ``ttl`` seconds"""
+        return key in self._wheel
+
+    def last_seen(self, key: str) -> Optional[float]:
+        """Monotonic time of the last heartbeat"""
+        return self._last_seen.get(key)
+
+    def beat(self, key: str, now: Optional[float] = None) -> bool:
+        """Record a heartbeat; returns True if the key just came online"""
+        now = self._clock() if now is None else now
+        self.beats += 1
+        self._last_seen[key] = now
+        if key in self._wheel:
+            return False
+        self._wheel.schedule(key, now + self.ttl)
+        self.went_online += 1
+        return True
+
+    def watch(self, key: str, now: Optional[float] = None):
+        """Treat a key as alive without counting a transition (e.g. after a restart)"""
+        now = self._clock() if now is None else now
+        self._last_seen[key] = now
+        if key not in self._wheel:
+            self._wheel.schedule(key, now + self.ttl)
+
+    def forget(self, key: str):
+        """Stop tracking a key without reporting it offline"""
+        self._wheel.cancel(key)
+        self._last_seen.pop(key, None)
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """Advance the wheel; returns the keys that went offline"""
+        now = self._clock() if now is None else now
+        offline = []
+        for key in self._wheel.advance(now):
+            last_seen = self._last_seen.get(key)
+            if last_seen is None:
+                continue
+            deadline = last_seen + self.ttl
+            if deadline > now:
+                # Beat since it was scheduled: lazy re-insert
+                self._wheel.schedule(key, deadline)
+            else:
+                offline.append(key)
+        self.went_offline += len(offline)
+        return offline
+
+    def stats(self) -> Dict[str, Any]:
+        """Tracked and live key counts and transition counters"""
+        return {
+            "name": self.name,
+            "ttl": self.ttl,
+            "tracked": len(self._last_seen),
+            "alive": len(self._wheel),
+            "beats": self.beats,
+            "went_online": self.went_online,
+            "went_offline": self.went_offline,
+        }
+
+
+class LivenessService:
+    """Device and node liveness driving device online/offline status
+
+    One loop task advances both trackers every tick; there are no per-device
+    tasks or timers. Transitions update the device registry, which emits
+    ``device.updated`` events.
+    """
+
+    def __init__(self):
+        self.devices = LivenessTracker(
+            "devices", settings.LIVENESS_DEVICE_TIMEOUT, settings.LIVENESS_TICK
+        )
+        self.nodes = LivenessTracker(
+            "nodes", settings.LIVENESS_NODE_TIMEOUT, settings.LIVENESS_TICK
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, online_devices: Iterable[str] = ()):
+        """Start expiring; devices already marked online get a full timeout to report in"""
+        for device_id in online_devices:
+            self.devices.watch(device_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="liveness")
+
+    async def stop(self):
+        """Stop the expiry task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def device_beat(self, device_id: str):
+        """Record activity from a device"""
+        if self.devices.beat(device_id):
+            unknown, failed = await self._set_online([device_id], True)
+            if unknown or failed:
+                # Not registered yet (e.g. within the discovery window) or the
+                # update failed: untrack it so its next heartbeat tries again
+                self.devices.forget(device_id)
+
+    async def node_beat(self, node_id: str):
+        """Record a node heartbeat"""
+        if self.nodes.beat(node_id):
+            logger.info("Node online", node_id=node_id)
+            await self._set_online([node_id], True)
+
+    async def check(self, now: Optional[float] = None):
+        """Expire silent devices and nodes"""
+        offline_devices = self.devices.expire(now)
+        offline_nodes = self.nodes.expire(now)
+        for node_id in offline_nodes:
+            logger.warning("Node offline", node_id=node_id)
+        if offline_devices:
+            logger.info("Devices offline", count=len(offline_devices))
+            _, failed = await self._set_online(offline_devices, False)
+            # Retry after another timeout
+            for device_id in failed:
+                self.devices.watch(device_id)
+        if offline_nodes:
+            _, failed = await self._set_online(offline_nodes, False)
+            for node_id in failed:
+                self.nodes.watch(node_id)
+
+    async def _set_online(self, ids: List[str], online: bool) -> Tuple[List[str], List[str]]:
+        """Apply transitions to the registry; returns the unknown and the failed ids"""
+        from app.services.device_service import device_service
+
+        unknown = []
+        failed = []
+        for device_id in ids:
+            if not device_service.has_device(device_id):
+                unknown.append(device_id)
+                continue
+            try:
+                await device_service.set_online(device_id, online)
+            except Exception as e:
+                failed.append(device_id)
+                logger.error("Liveness transition failed", device_id=device_id, online=online, error=str(e))
+        return unknown, failed
+
+    async def _run(self):
+        tick = min(self.devices.tick, self.nodes.tick)
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Liveness check failed", error=str(e))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Stats for the device and node trackers"""
+        return [self.devices.stats(), self.nodes.stats()]
+
+
+# Singleton instance
+liveness_service = LivenessService()
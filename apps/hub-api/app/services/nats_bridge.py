@@ -0,0 +1,145 @@
+"""
+NATS to WebSocket bridge with shared subject subscriptions
+"""
+
+from typing import Any, Dict, Optional, Set
+import asyncio
+import structlog
+from nats.aio.msg import Msg
+
+from app.core import codec
+from app.core.config import settings
+from app.core.nats import nats_client
+from app.services.websocket_service import (
+    ClientConnection,
+    connection_manager,
+    subject_matches,
+)
+
+logger = structlog.get_logger()
+
+# First bytes of JSON objects and arrays, forwarded without parsing
+_CONTAINER_START = (b"{", b"[")
+
+
+class SubjectNotAllowedError(Exception):
+    """Raised when a client asks for a subject outside WS_NATS_ALLOWED_SUBJECTS"""
+
+
+class NATSWebSocketBridge:
+    """Forward NATS messages to WebSocket clients
+
+    There is one NATS subscription per distinct subject pattern, shared by
+    every client that asked for it and removed when the last one leaves.
+    Payloads are forwarded as received: the frame is assembled around the
+    raw message text, without parsing or re-encoding the JSON, and the same
+    string is queued for every client. Payloads starting with ``{`` or
+    ``[`` are taken to be JSON as they are; only other (short, scalar)
+    payloads are parsed, and anything that is not JSON (e.g. plain text) is
+    sent as a JSON string.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Any] = {}
+        # pattern -> client -> coalesce flag
+        self._clients: Dict[str, Dict[ClientConnection, Optional[bool]]] = {}
+        # client -> patterns, for cleanup on disconnect
+        self._by_client: Dict[ClientConnection, Set[str]] = {}
+        self._lock = asyncio.Lock()
+        self.forwarded = 0
+        self.dropped = 0
+        self.wrapped = 0
+
+    @staticmethod
+    def is_allowed(pattern: str) -> bool:
+        """Check a requested pattern against the allowed subject patterns"""
+        if not pattern or " " in pattern:
+            return False
+        return any(subject_matches(allowed, pattern) for allowed in settings.WS_NATS_ALLOWED_SUBJECTS)
+
+    @property
+    def subscription_count(self) -> int:
+        """Number of NATS subscriptions held by the bridge"""
+        return len(self._subscriptions)
+
+    async def add(self, client: ClientConnection, pattern: str, coalesce: Optional[bool] = None):
+        """Forward messages matching a pattern to a client"""
+        if not self.is_allowed(pattern):
+            raise SubjectNotAllowedError(pattern)
+
+        async with self._lock:
+            if pattern not in self._subscriptions:
+                self._subscriptions[pattern] = await nats_client.subscribe(
+                    pattern, self._make_callback(pattern)
+                )
+                self._clients[pattern] = {}
+                logger.info("Bridge subscribed to subject", subject=pattern)
+
+            self._clients[pattern][client] = coalesce
+            self._by_client.setdefault(client, set()).add(pattern)
+
+    async def remove(self, client: ClientConnection, pattern: str):
+        """Stop forwarding a pattern to a client"""
+        async with self._lock:
+            await self._release(client, pattern)
+
+    async def remove_client(self, client: ClientConnection):
+        """Release every pattern held by a client"""
+        async with self._lock:
+            for pattern in list(self._by_client.get(client, ())):
+                await self._release(client, pattern)
+
+    async def _release(self, client: ClientConnection, pattern: str):
+        clients = self._clients.get(pattern)
+        if clients is None or client not in clients:
+            return
+
+        del clients[client]
+        patterns = self._by_client.get(client)
+        if patterns is not None:
+            patterns.discard(pattern)
+            if not patterns:
+                del self._by_client[client]
+
+        if not clients:
+            del self._clients[pattern]
+            sub = self._subscriptions.pop(pattern)
+            try:
+                await sub.unsubscribe()
+            except Exception as e:
+                logger.warning("Bridge unsubscribe failed", subject=pattern, error=str(e))
+            logger.info("Bridge unsubscribed from subject", subject=pattern)
+
+    def _make_callback(self, pattern: str):
+        prefix = '{"type":"nats","pattern":' + codec.dumps_str(pattern) + ',"subject":'
+
+        async def forward(msg: Msg):
+            clients = self._clients.get(pattern)
+            if not clients:
+                return
+
+            # Text frames must be UTF-8, so this decode doubles as the check
+            try:
+                data = msg.data.decode() if msg.data else "null"
+            except UnicodeDecodeError:
+                self.dropped += 1
+                return
+            if msg.data and msg.data.lstrip()[:1] not in _CONTAINER_START:
+                try:
+                    codec.loads(msg.data)
+                except codec.DecodeError:
+                    data = codec.dumps_str(data)
+                    self.wrapped += 1
+
+            frame = prefix + codec.dumps_str(msg.subject) + ',"data":' + data + "}"
+            key = "nats:" + msg.subject
+            default_coalesce = connection_manager.default_coalesce(msg.subject)
+            for client, coalesce in clients.items():
+                client.enqueue(frame, key, default_coalesce if coalesce is None else coalesce)
+            self.forwarded += 1
+
+        return forward
+
+
+# Singleton instance
+nats_bridge = NATSWebSocketBridge()
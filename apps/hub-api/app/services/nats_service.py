@@ -2,46 +2,112 @@
 NATS messaging service for pub/sub operations
 """
 
-from typing import Dict, Any, Callable, Optional
-import json
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import asyncio
+import time
 import structlog
 from nats.aio.msg import Msg
+from nats.errors import TimeoutError as NATSTimeoutError
 
+from app.core import codec
+from app.core.config import settings
+from app.core.metrics import NATS_HANDLER_DURATION
+from app.core.profiling import current_operation
 from app.core.nats import nats_client
-from app.schemas.device import DeviceCreate, DeviceStatus
+from app.schemas.device import DeviceStatus
+from app.services.discovery_service import discovery_coalescer
+from app.services.ingest_service import BatchHandler, ingest_pipeline
+from app.services.liveness_service import liveness_service
+from app.services.schema_registry import schema_registry
+from app.services.shared_state import shared_state
+from app.services.telemetry_service import merge_series, telemetry_store
 
 logger = structlog.get_logger()
 
+# HAL envelope fields (common/envelope.json), never stored as telemetry series
+_ENVELOPE_KEYS = frozenset(
+    ("hal_major", "hal_minor", "schema", "device_id", "caps", "ts", "payload", "seq", "correlation_id")
+)
+
+# Telemetry queries answered by every worker with its share of the samples
+TELEMETRY_QUERY_SUBJECT = "hub.workers.telemetry"
+
 
 class NATSService:
-    """Service for NATS messaging operations"""
+    """Service for NATS messaging operations
+    
+    Telemetry subjects are subscribed in the ``NATS_QUEUE_GROUP`` queue
+    group, so with several workers each message is ingested by one of
+    them. Device and node state subjects are only subscribed by the leader
+    (see ``SharedState``), which also runs liveness tracking.
+    """
     
     def __init__(self):
         self._subscriptions: Dict[str, Any] = {}
         self._handlers: Dict[str, Callable] = {}
+        # subject -> [messages, bytes, decode errors] for unbatched subscriptions
+        self._traffic: Dict[str, List[int]] = {}
+        # Subscriptions held while this worker is the leader
+        self._leading: List[str] = []
     
-    async def subscribe(self, subject: str, handler: Callable) -> str:
-        """Subscribe to a NATS subject"""
+    async def subscribe(self, subject: str, handler: Callable, queue: str = "") -> str:
+        """Subscribe to a NATS subject, optionally as a member of a queue group"""
         sub_id = f"{subject}_{id(handler)}"
         
         if sub_id in self._subscriptions:
             logger.warning("Subscription already exists", subject=subject)
             return sub_id
         
+        traffic = self._traffic.setdefault(subject, [0, 0, 0])
+        latency = NATS_HANDLER_DURATION.labels(subject)
+        operation = f"nats {subject}"
+        
         async def wrapped_handler(msg: Msg):
+            current_operation.set(operation)
+            traffic[0] += 1
+            traffic[1] += len(msg.data)
+            start = time.perf_counter()
             try:
-                data = json.loads(msg.data.decode())
-                await handler(data, msg)
-            except json.JSONDecodeError:
+                data = codec.loads(msg.data)
+                if isinstance(data, dict):
+                    await handler(data, msg)
+                else:
+                    traffic[2] += 1
+                    logger.error("Message is not a JSON object", subject=subject)
+            except codec.DecodeError:
+                traffic[2] += 1
                 logger.error("Invalid JSON in message", subject=subject)
             except Exception as e:
                 logger.error("Handler error", subject=subject, error=str(e))
+            finally:
+                latency.observe(time.perf_counter() - start)
         
-        sub = await nats_client.nc.subscribe(subject, cb=wrapped_handler)
+        sub = await nats_client.nc.subscribe(subject, queue=queue, cb=wrapped_handler)
         self._subscriptions[sub_id] = sub
         self._handlers[sub_id] = handler
         
-        logger.info("Subscribed to subject", subject=subject)
+        logger.info("Subscribed to subject", subject=subject, queue=queue or None)
+        return sub_id
+    
+    async def subscribe_batched(self, subject: str, handler: BatchHandler, queue: str = "") -> str:
+        """Subscribe to a high-rate subject through the batched ingest pipeline
+        
+        The NATS callback only enqueues the raw message; decoding and the
+        handler run in micro-batches on the ingest queue's worker task.
+        """
+        sub_id = f"{subject}_{id(handler)}"
+        
+        if sub_id in self._subscriptions:
+            logger.warning("Subscription already exists", subject=subject)
+            return sub_id
+        
+        ingest_queue = ingest_pipeline.add_queue(subject, handler)
+        
+        sub = await nats_client.nc.subscribe(subject, queue=queue, cb=ingest_queue.put)
+        self._subscriptions[sub_id] = sub
+        self._handlers[sub_id] = handler
+        
+        logger.info("Subscribed to subject (batched)", subject=subject, queue=queue or None)
         return sub_id
     
     async def unsubscribe(self, sub_id: str):
@@ -49,10 +115,24 @@ class NATSService:
         sub = self._subscriptions.get(sub_id)
         if sub:
             await sub.unsubscribe()
+            await ingest_pipeline.remove_queue(sub.subject)
             del self._subscriptions[sub_id]
             del self._handlers[sub_id]
             logger.info("Unsubscribed", sub_id=sub_id)
     
+    async def close(self):
+        """Unsubscribe from everything and stop the ingest pipeline"""
+        for sub_id in list(self._subscriptions):
+            await self.unsubscribe(sub_id)
+        await ingest_pipeline.stop()
+    
+    def traffic(self) -> Dict[str, Dict[str, int]]:
+        """Messages, bytes and decode errors per unbatched subscription"""
+        return {
+            subject: {"messages": messages, "bytes": size, "decode_errors": errors}
+            for subject, (messages, size, errors) in self._traffic.items()
+        }
+    
     async def publish(self, subject: str, data: Dict[str, Any], reply: Optional[str] = None):
         """Publish message to a subject"""
         await nats_client.publish(subject, data, reply)
@@ -62,95 +142,183 @@ class NATSService:
         try:
             msg = await nats_client.nc.request(
                 subject,
-                json.dumps(data).encode(),
+                codec.dumps(data),
                 timeout=timeout
             )
-            return json.loads(msg.data.decode())
+            return codec.loads(msg.data)
         except Exception as e:
             logger.error("Request failed", subject=subject, error=str(e))
             return None
     
+    async def request_many(
+        self,
+        requests: Dict[str, Dict[str, Any]],
+        timeout: float = 5.0
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Send one request per subject concurrently and gather the replies
+        
+        nats-py multiplexes these over its single wildcard response inbox.
+        Subjects that fail or time out map to None.
+        """
+        subjects = list(requests)
+        results = await asyncio.gather(
+            *(self.request(subject, requests[subject], timeout) for subject in subjects)
+        )
+        return dict(zip(subjects, results))
+    
     async def setup_standard_subscriptions(self):
         """Set up standard Hub subscriptions"""
-        # Device discovery
-        await self.subscribe("device.discovered", self._handle_device_discovered)
+        queue = settings.NATS_QUEUE_GROUP
         
-        # Device events
-        await self.subscribe("device.*.status", self._handle_device_status)
-        await self.subscribe("device.*.telemetry", self._handle_device_telemetry)
+        # Device telemetry and HAL messages, split between the workers
+        await self.subscribe_batched("device.*.telemetry", self._handle_device_telemetry, queue)
+        await self.subscribe_batched("hal.v1.*.data", self._handle_hal_data, queue)
         
-        # HAL messages
-        await self.subscribe("hal.v1.*.data", self._handle_hal_data)
+        # Telemetry queries from the other workers
+        if shared_state.enabled:
+            await self.subscribe(TELEMETRY_QUERY_SUBJECT, self._handle_telemetry_query)
         
-        # Node events
-        await self.subscribe("node.*.heartbeat", self._handle_node_heartbeat)
+        # Device discovery, device and node events: the leader only
+        shared_state.on_leadership(self.lead)
+        if shared_state.is_leader:
+            await self.lead(True)
         
-        logger.info("Standard subscriptions set up")
+        logger.info("Standard subscriptions set up", leader=shared_state.is_leader)
     
-    async def _handle_device_discovered(self, data: Dict[str, Any], msg: Msg):
-        """Handle newly discovered devices from mDNS"""
+    async def lead(self, leader: bool):
+        """Take over or hand back the device state subjects and liveness tracking"""
         from app.services.device_service import device_service
         
-        # Extract device info from mDNS data
-        device_id = data.get("Instance", "")
-        if not device_id:
-            logger.error("Invalid device discovery data", data=data)
-            return
+        if leader and not self._leading:
+            self._leading = [
+                await self.subscribe("device.discovered", self._handle_device_discovered),
+                await self.subscribe("device.*.status", self._handle_device_status),
+                await self.subscribe_batched("device.*.heartbeat", self._handle_device_heartbeat),
+                await self.subscribe("node.*.heartbeat", self._handle_node_heartbeat),
+            ]
+            liveness_service.start(device_service.online_device_ids())
+        elif not leader and self._leading:
+            leading, self._leading = self._leading, []
+            for sub_id in leading:
+                await self.unsubscribe(sub_id)
+            await liveness_service.stop()
+            await discovery_coalescer.stop()
+    
+    async def query_telemetry(self, device_id: str, **query: Any) -> List[Dict[str, Any]]:
+        """Query telemetry from every worker's share of the queue group and merge it
         
-        # Check if device already exists
-        existing = await device_service.get_device(device_id)
-        if existing:
-            logger.info("Device already registered", device_id=device_id)
-            return
+        Takes the arguments of ``TelemetryStore.query``. Workers that do not
+        answer within ``TELEMETRY_GATHER_TIMEOUT`` are left out.
+        """
+        local = telemetry_store.query(device_id, **query)
+        if not shared_state.enabled:
+            return local
+        others = [worker for worker in await shared_state.workers() if worker != shared_state.worker_id]
+        if not others:
+            return local
         
-        # Parse capabilities from text records
-        capabilities = []
-        device_metadata = {}
-        for txt in data.get("Text", []):
-            if txt.startswith("caps="):
-                capabilities = txt[5:].split(",")
-            elif "=" in txt:
-                key, value = txt.split("=", 1)
-                device_metadata[key] = value
-        
-        # Create device
-        device_create = DeviceCreate(
-            id=device_id,
-            name=data.get("HostName", device_id),
-            type=device_metadata.get("type", "unknown"),
-            capabilities=capabilities,
-            device_metadata=device_metadata,
-            ip_address=data.get("AddrIPv4", [None])[0] if data.get("AddrIPv4") else None,
-            mac_address=None  # mDNS doesn't provide MAC
-        )
+        parts = [local]
+        inbox = nats_client.nc.new_inbox()
+        sub = await nats_client.nc.subscribe(inbox)
+        try:
+            await nats_client.publish(
+                TELEMETRY_QUERY_SUBJECT,
+                {"origin": shared_state.worker_id, "query": {"device_id": device_id, **query}},
+                reply=inbox,
+            )
+            deadline = time.monotonic() + settings.TELEMETRY_GATHER_TIMEOUT
+            while len(parts) <= len(others):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    msg = await sub.next_msg(timeout=remaining)
+                except NATSTimeoutError:
+                    break
+                parts.append(codec.loads(msg.data)["series"])
+        finally:
+            await sub.unsubscribe()
         
-        await device_service.create_device(device_create)
-        logger.info("Device registered from discovery", device_id=device_id)
+        if len(parts) <= len(others):
+            logger.warning("Telemetry missing from some workers", expected=len(others), received=len(parts) - 1)
+        return merge_series(parts, query.get("resolution", "raw"), query.get("limit"))
+    
+    async def _handle_device_discovered(self, data: Dict[str, Any], msg: Msg):
+        """Handle mDNS announcements; duplicates are coalesced before touching the registry"""
+        discovery_coalescer.offer(data)
     
     async def _handle_device_status(self, data: Dict[str, Any], msg: Msg):
         """Handle device status updates"""
+        from app.services.device_service import device_service
+        
         device_id = msg.subject.split(".")[1]
-        logger.info("Device status update", device_id=device_id, status=data.get("status"))
-        # TODO: Update device service with status
+        try:
+            status = DeviceStatus(data["status"]) if data.get("status") else None
+        except ValueError:
+            logger.warning("Unknown device status", device_id=device_id, status=data.get("status"))
+            status = None
+        await liveness_service.device_beat(device_id)
+        await device_service.record_seen(device_id, status)
+        logger.debug("Device status update", device_id=device_id, status=data.get("status"))
     
-    async def _handle_device_telemetry(self, data: Dict[str, Any], msg: Msg):
-        """Handle device telemetry"""
-        device_id = msg.subject.split(".")[1]
-        logger.debug("Device telemetry", device_id=device_id)
-        # TODO: Store telemetry data
+    async def _handle_device_heartbeat(self, batch: List[Tuple[Dict[str, Any], Msg]]):
+        """Handle a batch of device heartbeats"""
+        from app.services.device_service import device_service
+        
+        for data, msg in batch:
+            device_id = msg.subject.split(".")[1]
+            await liveness_service.device_beat(device_id)
+            await device_service.record_seen(device_id)
+        logger.debug("Device heartbeats", count=len(batch))
+    
+    async def _handle_device_telemetry(self, batch: List[Tuple[Dict[str, Any], Msg]]):
+        """Handle a batch of device telemetry messages"""
+        stored = 0
+        rejected = 0
+        sample_every = settings.SCHEMA_VALIDATION_SAMPLE_EVERY
+        for data, msg in batch:
+            device_id = msg.subject.split(".")[1]
+            # Telemetry may be a HAL envelope or a bare payload
+            if "payload" in data and isinstance(data["payload"], dict):
+                if not schema_registry.validate_message(data, sample_every):
+                    rejected += 1
+                    continue
+                stored += telemetry_store.record(
+                    device_id, data.get("schema", "telemetry"), data.get("ts"), data["payload"]
+                )
+            else:
+                payload = {key: value for key, value in data.items() if key not in _ENVELOPE_KEYS}
+                stored += telemetry_store.record(device_id, "telemetry", data.get("ts"), payload)
+        logger.debug("Device telemetry", count=len(batch), samples=stored, rejected=rejected)
     
-    async def _handle_hal_data(self, data: Dict[str, Any], msg: Msg):
-        """Handle HAL data messages"""
-        device_id = data.get("device_id")
-        schema = data.get("schema")
-        logger.debug("HAL data received", device_id=device_id, schema=schema)
-        # TODO: Process HAL data
+    async def _handle_hal_data(self, batch: List[Tuple[Dict[str, Any], Msg]]):
+        """Handle a batch of HAL data messages"""
+        stored = 0
+        rejected = 0
+        sample_every = settings.SCHEMA_VALIDATION_SAMPLE_EVERY
+        for data, msg in batch:
+            device_id = data.get("device_id")
+            payload = data.get("payload")
+            if not device_id or not isinstance(payload, dict):
+                continue
+            if not schema_registry.validate_message(data, sample_every):
+                rejected += 1
+                continue
+            stored += telemetry_store.record(device_id, data.get("schema", ""), data.get("ts"), payload)
+        logger.debug("HAL data received", count=len(batch), samples=stored, rejected=rejected)
+    
+    async def _handle_telemetry_query(self, data: Dict[str, Any], msg: Msg):
+        """Answer another worker's telemetry query with this worker's samples"""
+        if data.get("origin") == shared_state.worker_id or not msg.reply:
+            return
+        series = telemetry_store.query(**data["query"])
+        await nats_client.publish(msg.reply, {"series": series})
     
     async def _handle_node_heartbeat(self, data: Dict[str, Any], msg: Msg):
         """Handle node heartbeats"""
         node_id = msg.subject.split(".")[1]
         logger.debug("Node heartbeat", node_id=node_id)
-        # TODO: Update node status
+        await liveness_service.node_beat(node_id)
 
 
 # Singleton instance
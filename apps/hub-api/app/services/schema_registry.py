@@ -0,0 +1,209 @@
+"""
+HAL JSON Schema validator registry
+"""
+
+from typing import Any, Dict, Optional
+from pathlib import Path
+import json
+import time
+import fastjsonschema
+import structlog
+
+logger = structlog.get_logger()
+
+# Location of the schemas in a source checkout, relative to any parent directory
+_SCHEMAS_SUBDIR = Path("packages") / "hal-schemas" / "schemas"
+
+_ENVELOPE_KEY_PREFIX = "hal/common/envelope/"
+
+
+def schema_key(schema_id: str) -> str:
+    """Normalize a schema id to its ``hal/<category>/<name>/<version>`` suffix
+
+    Envelopes carry short ids such as ``tafylabs/hal/sensor/imu/1.0`` while
+    the schema files use full ``$id`` URLs; both map to the same key.
+    """
+    index = schema_id.find("hal/")
+    return schema_id[index:] if index >= 0 else schema_id
+
+
+def default_schemas_dir() -> Optional[Path]:
+    """Find the HAL schemas in the source tree, if present"""
+    for parent in Path(__file__).resolve().parents:
+        candidate = parent / _SCHEMAS_SUBDIR
+        if candidate.is_dir():
+            return candidate
+    return None
+
+
+class SchemaValidator:
+    """A compiled schema with its own sampling state and counters"""
+
+    def __init__(self, schema_id: str, validate):
+        self.schema_id = schema_id
+        self.validate = validate
+        self.seen = 0
+
+        # Counters
+        self.checked = 0
+        self.skipped = 0
+        self.failures = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_error: Optional[str] = None
+
+    def sampled_out(self, sample_every: int) -> bool:
+        """Whether this message falls outside the 1-in-N sample"""
+        self.seen += 1
+        if sample_every > 1 and self.seen % sample_every:
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, elapsed_ns: int, error: Optional[str]):
+        """Record the outcome of one validation"""
+        self.checked += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        if error is not None:
+            self.failures += 1
+            self.last_error = error
+
+    def stats(self) -> Dict[str, Any]:
+        """Validation counters and latency in microseconds"""
+        return {
+            "schema_id": self.schema_id,
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "avg_latency_us": self.total_ns / self.checked / 1000 if self.checked else 0.0,
+            "max_latency_us": self.max_ns / 1000,
+            "last_error": self.last_error,
+        }
+
+
+class SchemaRegistry:
+    """Validators for every HAL schema, compiled once and keyed by ``$id``
+
+    Schemas are compiled to Python functions with fastjsonschema at startup,
+    so validating a message is a dict lookup plus generated code, with no
+    schema interpretation on the hot path.
+    """
+
+    def __init__(self):
+        self._validators: Dict[str, SchemaValidator] = {}
+        self._envelope: Optional[SchemaValidator] = None
+        self.unknown = 0
+
+    @property
+    def loaded(self) -> int:
+        """Number of compiled schemas"""
+        return len(self._validators)
+
+    def register(self, schema: Dict[str, Any]) -> SchemaValidator:
+        """Compile a schema and register it under its ``$id``"""
+        schema_id = schema["$id"]
+        key = schema_key(schema_id)
+        is_envelope = key.startswith(_ENVELOPE_KEY_PREFIX)
+        if is_envelope:
+            # The payload schema id is checked by dispatch, which accepts both
+            # the short form in the envelope pattern and full $id URLs
+            properties = dict(schema.get("properties", {}))
+            properties["schema"] = {"type": "string"}
+            schema = {**schema, "properties": properties}
+
+        validator = SchemaValidator(schema_id, fastjsonschema.compile(schema, use_default=False))
+        self._validators[key] = validator
+        if is_envelope:
+            self._envelope = validator
+        return validator
+
+    def load(self, directory: Optional[str] = None) -> int:
+        """Compile every ``*.json`` schema under a directory"""
+        path = Path(directory) if directory else default_schemas_dir()
+        if path is None or not path.is_dir():
+            logger.warning("HAL schemas not found, validation disabled", path=str(path))
+            return 0
+
+        for schema_file in sorted(path.rglob("*.json")):
+            try:
+                with open(schema_file) as f:
+                    self.register(json.load(f))
+            except (OSError, ValueError, KeyError, fastjsonschema.JsonSchemaDefinitionException) as e:
+                logger.error("Failed to compile schema", file=str(schema_file), error=str(e))
+
+        logger.info("HAL schemas loaded", count=self.loaded, path=str(path))
+        return self.loaded
+
+    def get(self, schema_id: str) -> Optional[SchemaValidator]:
+        """Get the validator for a schema id (full ``$id`` or envelope short form)"""
+        return self._validators.get(schema_key(schema_id))
+
+    def clear(self):
+        """Drop all validators and counters"""
+        self._validators.clear()
+        self._envelope = None
+        self.unknown = 0
+
+    def validate(self, schema_id: str, data: Dict[str, Any], sample_every: int = 1) -> bool:
+        """Validate data against a schema
+
+        Returns False only for data that was checked and failed; unknown
+        schemas and messages skipped by sampling are let through.
+        """
+        validator = self.get(schema_id)
+        if validator is None:
+            self.unknown += 1
+            return True
+        if validator.sampled_out(sample_every):
+            return True
+        return self._check(validator, data)
+
+    def validate_message(self, message: Dict[str, Any], sample_every: int = 1) -> bool:
+        """Validate a HAL envelope and its payload, dispatching on ``schema``
+
+        With ``sample_every`` > 1 only one in N messages of each schema is
+        checked. Latency and failures are counted against the payload schema.
+        """
+        if not self._validators:
+            return True
+
+        schema_id = message.get("schema")
+        validator = self.get(schema_id) if isinstance(schema_id, str) else None
+        if validator is None:
+            self.unknown += 1
+            return True
+        if validator.sampled_out(sample_every):
+            return True
+
+        return self._check(validator, message.get("payload"), envelope=message)
+
+    def _check(
+        self,
+        validator: SchemaValidator,
+        data: Any,
+        envelope: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        start = time.perf_counter_ns()
+        error = None
+        try:
+            if envelope is not None and self._envelope is not None:
+                self._envelope.validate(envelope)
+            validator.validate(data)
+        except fastjsonschema.JsonSchemaException as e:
+            error = e.message
+        validator.record(time.perf_counter_ns() - start, error)
+        return error is None
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry size and per-schema counters"""
+        return {
+            "loaded": self.loaded,
+            "unknown": self.unknown,
+            "schemas": [validator.stats() for validator in self._validators.values()],
+        }
+
+
+# Singleton instance
+schema_registry = SchemaRegistry()
@@ -0,0 +1,442 @@
+"""
+State shared between hub-api workers through Redis
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import time
+import uuid
+import structlog
+
+from app.core import codec
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Handler for keys of a namespace changed by another worker
+InvalidationHandler = Callable[[List[str]], Awaitable[None]]
+# Handler for a serialized WebSocket event published by another worker
+BroadcastHandler = Callable[[str, str], Any]
+# Handler for values of a namespace sent directly by another worker
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+# Called with True when this worker becomes the leader and False when it steps down
+LeadershipHandler = Callable[[bool], Awaitable[None]]
+# Handler for a raw pub/sub message
+MessageHandler = Callable[[bytes], Awaitable[None]]
+
+# Take or renew a lease held by nobody or by ARGV[1]
+_LEASE_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner == false or owner == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Drop a lease only if ARGV[1] still holds it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """Hashes and pub/sub on a Redis server (requires the ``redis`` package)"""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._pubsub = None
+        self._handlers: Dict[str, MessageHandler] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _key(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}"
+
+    async def ping(self) -> bool:
+        return bool(await self._redis.ping())
+
+    async def hget(self, namespace: str, key: str) -> Optional[bytes]:
+        return await self._redis.hget(self._key(namespace), key)
+
+    async def hset(self, namespace: str, key: str, value: bytes):
+        await self._redis.hset(self._key(namespace), key, value)
+
+    async def hdel(self, namespace: str, key: str):
+        await self._redis.hdel(self._key(namespace), key)
+
+    async def hgetall(self, namespace: str) -> Dict[str, bytes]:
+        values = await self._redis.hgetall(self._key(namespace))
+        return {key.decode() if isinstance(key, bytes) else key: value for key, value in values.items()}
+
+    async def lease(self, name: str, owner: str, ttl: float) -> bool:
+        return bool(await self._redis.eval(_LEASE_SCRIPT, 1, self._key(name), owner, int(ttl * 1000)))
+
+    async def release(self, name: str, owner: str):
+        await self._redis.eval(_RELEASE_SCRIPT, 1, self._key(name), owner)
+
+    async def publish(self, channel: str, data: bytes):
+        await self._redis.publish(f"{self.prefix}:{channel}", data)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        if self._pubsub is None:
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        channel = f"{self.prefix}:{channel}"
+        self._handlers[channel] = handler
+        await self._pubsub.subscribe(channel)
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(), name="shared-state-listener")
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            handler = self._handlers.get(channel)
+            if handler is None:
+                continue
+            try:
+                await handler(message["data"])
+            except Exception as e:
+                logger.error("Shared state message failed", channel=channel, error=str(e))
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        await self._redis.aclose()
+
+
+class MemoryBackend:
+    """In-process stand-in for Redis
+
+    Several ``SharedState`` instances using one ``MemoryBackend`` behave
+    like workers sharing one Redis server.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._hashes: Dict[str, Dict[str, bytes]] = {}
+        # name -> (owner, monotonic expiry)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+
+    async def ping(self) -> bool:
+        return True
+
+    async def hget(self, namespace: str, key: str) -> Optional[bytes]:
+        return self._hashes.get(namespace, {}).get(key)
+
+    async def hset(self, namespace: str, key: str, value: bytes):
+        self._hashes.setdefault(namespace, {})[key] = value
+
+    async def hdel(self, namespace: str, key: str):
+        self._hashes.get(namespace, {}).pop(key, None)
+
+    async def hgetall(self, namespace: str) -> Dict[str, bytes]:
+        return dict(self._hashes.get(namespace, {}))
+
+    async def lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.monotonic()
+        holder = self._leases.get(name)
+        if holder is not None and holder[0] != owner and holder[1] > now:
+            return False
+        self._leases[name] = (owner, now + ttl)
+        return True
+
+    async def release(self, name: str, owner: str):
+        holder = self._leases.get(name)
+        if holder is not None and holder[0] == owner:
+            del self._leases[name]
+
+    async def publish(self, channel: str, data: bytes):
+        for handler in list(self._handlers.get(channel, ())):
+            await handler(data)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def close(self):
+        self._handlers.clear()
+
+
+class SharedState:
+    """Registry state, WebSocket fan-out and leadership shared by every worker
+
+    Each worker keeps its registries in memory as a local cache. A change
+    is written to a Redis hash and announced on an invalidation channel;
+    the other workers then read the changed keys back from Redis into their
+    own registries.
+
+    Every change has to happen on exactly one worker, or its database
+    write and ``hub.events`` message would be repeated by each of them.
+    API changes happen on the worker serving the request. Device state
+    driven by NATS (discovery, status, heartbeats, liveness) is handled
+    only by the leader: the worker holding a lease in Redis, renewed every
+    third of ``REDIS_LEADER_TTL``. Heartbeats are too frequent to share
+    one by one, so the leader sends the latest ``last_seen`` values to the
+    others now and then through ``update``. Telemetry is split between the
+    workers by a NATS queue group instead.
+
+    WebSocket events are published once on a broadcast channel and each
+    worker forwards them only to the clients connected to it.
+
+    Without ``REDIS_URL`` there is no backend: the worker is always the
+    leader and every other method is a no-op, which is correct for a single
+    worker.
+    """
+
+    INVALIDATE = "invalidate"
+    BROADCAST = "broadcast"
+    UPDATE = "update"
+    LEADER = "leader"
+    WORKERS = "workers"
+
+    def __init__(self, backend: Optional[Any] = None):
+        self.backend = backend
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._invalidation_handlers: Dict[str, InvalidationHandler] = {}
+        self._update_handlers: Dict[str, UpdateHandler] = {}
+        self._broadcast_handler: Optional[BroadcastHandler] = None
+        self._leadership_handlers: List[LeadershipHandler] = []
+        self._subscribed = False
+        self._leader = False
+        self._renewed = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.writes = 0
+        self.reads = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+        self.broadcasts_sent = 0
+        self.broadcasts_received = 0
+        self.updates_sent = 0
+        self.updates_received = 0
+        self.leader_changes = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether state is shared with other workers"""
+        return self.backend is not None
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this worker handles the NATS-driven device state"""
+        return self.backend is None or self._leader
+
+    def on_invalidate(self, namespace: str, handler: InvalidationHandler):
+        """Call ``handler`` with the keys of ``namespace`` other workers change"""
+        self._invalidation_handlers[namespace] = handler
+
+    def on_update(self, namespace: str, handler: UpdateHandler):
+        """Call ``handler`` with the values of ``namespace`` other workers send"""
+        self._update_handlers[namespace] = handler
+
+    def on_broadcast(self, handler: BroadcastHandler):
+        """Call ``handler(topic, payload)`` for WebSocket events from other workers"""
+        self._broadcast_handler = handler
+
+    def on_leadership(self, handler: LeadershipHandler):
+        """Call ``handler(is_leader)`` whenever this worker gains or loses the lead"""
+        self._leadership_handlers.append(handler)
+
+    async def start(self):
+        """Connect to Redis (when configured) and listen for other workers"""
+        if self.backend is None and settings.REDIS_URL:
+            try:
+                backend = RedisBackend(settings.REDIS_URL, settings.REDIS_STATE_PREFIX)
+                await backend.ping()
+            except Exception as e:
+                logger.error("Shared state unavailable, running as a single worker", error=str(e))
+                return
+            self.backend = backend
+        if self.backend is None or self._subscribed:
+            return
+
+        await self.backend.subscribe(self.INVALIDATE, self._handle_invalidation)
+        await self.backend.subscribe(self.UPDATE, self._handle_update)
+        await self.backend.subscribe(self.BROADCAST, self._handle_broadcast)
+        self._subscribed = True
+        await self.renew()
+        self._task = asyncio.create_task(self._keep_lease(), name="shared-state-lease")
+        logger.info(
+            "Shared state enabled", backend=self.backend.name, worker_id=self.worker_id, leader=self._leader
+        )
+
+    async def stop(self):
+        """Give up the lead, stop listening and close the backend"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.backend is not None:
+            try:
+                if self._leader:
+                    await self.backend.release(self.LEADER, self.worker_id)
+                await self.backend.hdel(self.WORKERS, self.worker_id)
+            except Exception as e:
+                logger.warning("Leader lease not released", error=str(e))
+            self._leader = False
+            await self.backend.close()
+            self._subscribed = False
+
+    async def _keep_lease(self):
+        while True:
+            await asyncio.sleep(settings.REDIS_LEADER_TTL / 3)
+            await self.renew()
+
+    async def renew(self):
+        """Renew this worker's membership and take or renew the leader lease"""
+        ttl = settings.REDIS_LEADER_TTL
+        try:
+            leader = await self.backend.lease(self.LEADER, self.worker_id, ttl)
+            await self.backend.hset(self.WORKERS, self.worker_id, codec.dumps(time.time()))
+            self._renewed = time.monotonic()
+        except Exception as e:
+            logger.error("Leader lease not renewed", error=str(e))
+            # Step down before another worker can take the expired lease
+            leader = self._leader and time.monotonic() - self._renewed < ttl / 2
+        if leader == self._leader:
+            return
+
+        self._leader = leader
+        self.leader_changes += 1
+        logger.info("Leadership changed", worker_id=self.worker_id, leader=leader)
+        for handler in self._leadership_handlers:
+            try:
+                await handler(leader)
+            except Exception as e:
+                logger.error("Leadership handler failed", leader=leader, error=str(e))
+
+    async def workers(self) -> List[str]:
+        """Ids of the workers that renewed their membership within the lease ttl"""
+        if self.backend is None:
+            return [self.worker_id]
+        cutoff = time.time() - settings.REDIS_LEADER_TTL
+        members = await self.backend.hgetall(self.WORKERS)
+        return [worker for worker, renewed in members.items() if codec.loads(renewed) >= cutoff]
+
+    async def ping(self) -> bool:
+        """Whether the backend answers"""
+        if self.backend is None:
+            return False
+        try:
+            return await self.backend.ping()
+        except Exception:
+            return False
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Read a value written by any worker"""
+        if self.backend is None:
+            return None
+        self.reads += 1
+        data = await self.backend.hget(namespace, key)
+        return None if data is None else codec.loads(data)
+
+    async def put(self, namespace: str, key: str, value: Any):
+        """Write a value and invalidate it on every other worker"""
+        if self.backend is None:
+            return
+        await self.backend.hset(namespace, key, codec.dumps(value))
+        self.writes += 1
+        await self.invalidate(namespace, [key])
+
+    async def delete(self, namespace: str, key: str):
+        """Delete a value and invalidate it on every other worker"""
+        if self.backend is None:
+            return
+        await self.backend.hdel(namespace, key)
+        self.writes += 1
+        await self.invalidate(namespace, [key])
+
+    async def invalidate(self, namespace: str, keys: Iterable[str]):
+        """Tell the other workers to reload ``keys``"""
+        if self.backend is None:
+            return
+        message = {"origin": self.worker_id, "namespace": namespace, "keys": list(keys)}
+        await self.backend.publish(self.INVALIDATE, codec.dumps(message))
+        self.invalidations_sent += 1
+
+    async def update(self, namespace: str, values: Dict[str, Any]):
+        """Send values straight to the other workers without storing them"""
+        if self.backend is None or not values:
+            return
+        message = {"origin": self.worker_id, "namespace": namespace, "values": values}
+        await self.backend.publish(self.UPDATE, codec.dumps(message))
+        self.updates_sent += 1
+
+    async def broadcast(self, topic: str, payload: str):
+        """Hand a serialized WebSocket event to the other workers"""
+        if self.backend is None:
+            return
+        message = {"origin": self.worker_id, "topic": topic, "payload": payload}
+        await self.backend.publish(self.BROADCAST, codec.dumps(message))
+        self.broadcasts_sent += 1
+
+    async def _handle_invalidation(self, data: bytes):
+        message = codec.loads(data)
+        if message.get("origin") == self.worker_id:
+            return
+        self.invalidations_received += 1
+        handler = self._invalidation_handlers.get(message.get("namespace"))
+        if handler is not None:
+            await handler(message.get("keys") or [])
+
+    async def _handle_update(self, data: bytes):
+        message = codec.loads(data)
+        if message.get("origin") == self.worker_id:
+            return
+        self.updates_received += 1
+        handler = self._update_handlers.get(message.get("namespace"))
+        if handler is not None:
+            await handler(message.get("values") or {})
+
+    async def _handle_broadcast(self, data: bytes):
+        message = codec.loads(data)
+        if message.get("origin") == self.worker_id:
+            return
+        self.broadcasts_received += 1
+        if self._broadcast_handler is not None:
+            self._broadcast_handler(message["topic"], message["payload"])
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend, worker id and counters"""
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.backend is not None else None,
+            "worker_id": self.worker_id,
+            "leader": self.is_leader,
+            "leader_changes": self.leader_changes,
+            "writes": self.writes,
+            "reads": self.reads,
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            "broadcasts_sent": self.broadcasts_sent,
+            "broadcasts_received": self.broadcasts_received,
+            "updates_sent": self.updates_sent,
+            "updates_received": self.updates_received,
+        }
+
+
+# Singleton instance
+shared_state = SharedState()
@@ -0,0 +1,185 @@
+"""
+Background sampling of system stats and dependency health
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+from datetime import datetime
+import asyncio
+import platform
+import time
+import psutil
+import structlog
+
+from app.core.config import settings
+from app.core.nats import nats_client
+from app.db import session as db_session
+from app.services.shared_state import shared_state
+
+logger = structlog.get_logger()
+
+
+class SystemMonitor:
+    """Keeps ``/system/info`` and ``/system/health`` snapshots off the request path
+
+    One task probes event-loop lag (how late a short sleep wakes up) and,
+    every ``interval``, samples host and process stats and pings NATS, the
+    database and Redis concurrently, each bounded by ``timeout``. Endpoints
+    return the last snapshot. CPU usage is measured between samples rather
+    than over a blocking interval, so the first sample reads 0.
+    """
+
+    def __init__(self, interval: float, lag_interval: float, timeout: float):
+        self.interval = interval
+        self.lag_interval = lag_interval
+        self.timeout = timeout
+        self.started = time.time()
+        self._process = psutil.Process()
+        self._host = {
+            "hostname": platform.node(),
+            "platform": f"{platform.system()} {platform.release()}",
+            "python_version": platform.python_version(),
+        }
+        self._info: Optional[Dict[str, Any]] = None
+        self._health: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Event-loop lag in seconds: last probe, and worst since the previous sample
+        self.loop_lag = 0.0
+        self._loop_lag_max = 0.0
+
+        # Counters
+        self.samples = 0
+        self.health_checks = 0
+
+    def start(self):
+        """Take a first sample and keep refreshing in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="system-monitor")
+
+    async def stop(self):
+        """Stop the sampling task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_sample = loop.time()
+        while True:
+            now = loop.time()
+            if now >= next_sample:
+                next_sample = now + self.interval
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error("System sample failed", error=str(e))
+
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.record_lag(max(0.0, loop.time() - expected))
+
+    def record_lag(self, lag: float):
+        """Record one event-loop lag probe"""
+        self.loop_lag = lag
+        if lag > self._loop_lag_max:
+            self._loop_lag_max = lag
+
+    async def refresh(self):
+        """Sample system stats and run the health checks now"""
+        self.sample()
+        await self.check_health()
+
+    def sample(self):
+        """Sample host and process stats"""
+        memory = psutil.virtual_memory()
+        with self._process.oneshot():
+            rss = self._process.memory_info().rss
+            open_fds = self._process.num_fds() if hasattr(self._process, "num_fds") else None
+            threads = self._process.num_threads()
+            process_cpu = self._process.cpu_percent(interval=None)
+
+        self._info = {
+            **self._host,
+            "memory_usage_mb": memory.used / 1024 / 1024,
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "process_rss_mb": rss / 1024 / 1024,
+            "process_cpu_percent": process_cpu,
+            "open_fds": open_fds,
+            "threads": threads,
+            "loop_lag_ms": self.loop_lag * 1000,
+            "loop_lag_max_ms": self._loop_lag_max * 1000,
+            "sampled_at": datetime.utcnow(),
+        }
+        self._loop_lag_max = self.loop_lag
+        self.samples += 1
+
+    async def check_health(self):
+        """Ping every configured dependency concurrently"""
+        probes: Dict[str, Callable[[], Awaitable[Any]]] = {"nats": lambda: nats_client.rtt(self.timeout)}
+        if db_session.async_engine is not None:
+            probes["database"] = db_session.ping_database
+        if shared_state.enabled:
+            probes["redis"] = shared_state.ping
+
+        results = await asyncio.gather(*(self._probe(probe) for probe in probes.values()))
+        checks = {"api": True}
+        latency_ms = {}
+        for name, elapsed in zip(probes, results):
+            checks[name] = elapsed is not None
+            if elapsed is not None:
+                latency_ms[name] = elapsed * 1000
+
+        if all(checks.values()):
+            status = "healthy"
+        elif any(checks.values()):
+            status = "degraded"
+        else:
+            status = "unhealthy"
+
+        self._health = {
+            "status": status,
+            "version": settings.VERSION,
+            "checks": checks,
+            "latency_ms": latency_ms,
+            "timestamp": datetime.utcnow(),
+        }
+        self.health_checks += 1
+
+    async def _probe(self, probe: Callable[[], Awaitable[Any]]) -> Optional[float]:
+        """Seconds a check took, or None if it failed or timed out"""
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(probe(), self.timeout)
+        except Exception:
+            return None
+        return None if ok is False else time.perf_counter() - start
+
+    async def info(self) -> Dict[str, Any]:
+        """Last system stats sample (sampled now if there is none yet)"""
+        if self._info is None:
+            self.sample()
+        health = await self.health()
+        return {
+            **self._info,
+            "version": settings.VERSION,
+            "uptime_seconds": time.time() - self.started,
+            "nats_connected": nats_client.is_connected,
+            "redis_connected": health["checks"].get("redis", False),
+            "database_connected": health["checks"].get("database", False),
+        }
+
+    async def health(self) -> Dict[str, Any]:
+        """Last health check (checked now if there is none yet)"""
+        if self._health is None:
+            await self.check_health()
+        return self._health
+
+
+# Singleton instance
+system_monitor = SystemMonitor(
+    settings.SYSTEM_SAMPLE_INTERVAL, settings.SYSTEM_LOOP_LAG_INTERVAL, settings.SYSTEM_HEALTH_TIMEOUT
+)
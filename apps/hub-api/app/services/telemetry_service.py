@@ -0,0 +1,401 @@
+"""
+In-memory columnar time-series store for device telemetry
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from array import array
+from datetime import datetime
+import bisect
+import math
+import time
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Rollup resolutions and their bucket width in seconds
+RESOLUTIONS: Dict[str, float] = {
+    "1s": 1.0,
+    "10s": 10.0,
+    "1m": 60.0,
+}
+
+# Arrays start small and double until they reach their configured capacity
+_INITIAL_CAPACITY = 64
+
+
+def _zeros(typecode: str, size: int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * size))
+
+
+class _RingView:
+    """Sequence view over a ring buffer column in logical (oldest-first) order"""
+
+    __slots__ = ("_column", "_head", "_size")
+
+    def __init__(self, column: array, head: int, size: int):
+        self._column = column
+        self._head = head
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> float:
+        return self._column[(self._head + index) % len(self._column)]
+
+
+def _ring_slice(column: array, head: int, lo: int, hi: int) -> List[float]:
+    """Copy logical range [lo, hi) of a ring buffer column into a list"""
+    if hi <= lo:
+        return []
+    capacity = len(column)
+    start = (head + lo) % capacity
+    end = start + (hi - lo)
+    if end <= capacity:
+        return column[start:end].tolist()
+    return column[start:].tolist() + column[:end - capacity].tolist()
+
+
+class _Ring:
+    """Growable fixed-capacity ring of parallel array columns"""
+
+    # Column name -> array typecode; overridden by subclasses
+    columns: Dict[str, str] = {}
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        size = min(_INITIAL_CAPACITY, self.capacity)
+        for name, typecode in self.columns.items():
+            setattr(self, name, _zeros(typecode, size))
+        self.head = 0
+        self.size = 0
+
+    @property
+    def allocated(self) -> int:
+        return len(getattr(self, next(iter(self.columns))))
+
+    def _grow(self):
+        new_size = min(self.allocated * 2, self.capacity)
+        for name, typecode in self.columns.items():
+            column = getattr(self, name)
+            ordered = array(typecode, _ring_slice(column, self.head, 0, self.size))
+            ordered.extend(_zeros(typecode, new_size - self.size))
+            setattr(self, name, ordered)
+        self.head = 0
+
+    def _next_slot(self) -> int:
+        """Index of the slot for a new newest entry, evicting the oldest if full"""
+        if self.size == self.allocated and self.allocated < self.capacity:
+            self._grow()
+        if self.size < self.allocated:
+            index = (self.head + self.size) % self.allocated
+            self.size += 1
+        else:
+            index = self.head
+            self.head = (self.head + 1) % self.allocated
+        return index
+
+    def _newest(self) -> int:
+        return (self.head + self.size - 1) % self.allocated
+
+    def _range(self, key: array, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        view = _RingView(key, self.head, self.size)
+        lo = 0 if start is None else bisect.bisect_left(view, start)
+        hi = self.size if end is None else bisect.bisect_right(view, end)
+        return lo, hi
+
+
+class _Rollup(_Ring):
+    """Fixed-width min/max/sum/count/last buckets"""
+
+    columns = {
+        "start": "d",
+        "min": "d",
+        "max": "d",
+        "sum": "d",
+        "count": "L",
+        "last": "d",
+    }
+
+    def __init__(self, width: float, capacity: int):
+        self.width = width
+        super().__init__(capacity)
+
+    def add(self, ts: float, value: float):
+        bucket = ts - math.fmod(ts, self.width)
+        if self.size:
+            index = self._newest()
+            current = self.start[index]
+            if bucket == current:
+                if value < self.min[index]:
+                    self.min[index] = value
+                if value > self.max[index]:
+                    self.max[index] = value
+                self.sum[index] += value
+                self.count[index] += 1
+                self.last[index] = value
+                return
+            if bucket < current:
+                return
+
+        index = self._next_slot()
+        self.start[index] = bucket
+        self.min[index] = value
+        self.max[index] = value
+        self.sum[index] = value
+        self.count[index] = 1
+        self.last[index] = value
+
+    def query(self, start: Optional[float], end: Optional[float], limit: Optional[int]) -> Dict[str, List[float]]:
+        # Include the bucket that contains ``start``
+        lo, hi = self._range(self.start, None if start is None else start - self.width, end)
+        if start is not None and lo < hi and _RingView(self.start, self.head, self.size)[lo] + self.width <= start:
+            lo += 1
+        if limit is not None:
+            lo = max(lo, hi - limit)
+
+        sums = _ring_slice(self.sum, self.head, lo, hi)
+        counts = _ring_slice(self.count, self.head, lo, hi)
+        return {
+            "timestamps": _ring_slice(self.start, self.head, lo, hi),
+            "min": _ring_slice(self.min, self.head, lo, hi),
+            "max": _ring_slice(self.max, self.head, lo, hi),
+            "mean": [s / c for s, c in zip(sums, counts)],
+            "last": _ring_slice(self.last, self.head, lo, hi),
+            "count": counts,
+        }
+
+
+class TelemetrySeries(_Ring):
+    """Raw samples for one (device, schema, field) plus its rollups"""
+
+    columns = {
+        "ts": "d",
+        "values": "d",
+    }
+
+    def __init__(self, window: float, capacity: int, rollup_capacity: Dict[str, int]):
+        self.window = window
+        self.rollups = {
+            name: _Rollup(width, rollup_capacity[name])
+            for name, width in RESOLUTIONS.items()
+        }
+        super().__init__(capacity)
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return self.ts[self._newest()] if self.size else None
+
+    def append(self, ts: float, value: float) -> bool:
+        """Append a sample; samples older than the newest one are rejected"""
+        if self.size and ts < self.ts[self._newest()]:
+            return False
+
+        # Evict raw samples that fell out of the window
+        cutoff = ts - self.window
+        while self.size and self.ts[self.head] < cutoff:
+            self.head = (self.head + 1) % self.allocated
+            self.size -= 1
+
+        index = self._next_slot()
+        self.ts[index] = ts
+        self.values[index] = value
+
+        for rollup in self.rollups.values():
+            rollup.add(ts, value)
+        return True
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: str = "raw",
+        limit: Optional[int] = None,
+    ) -> Dict[str, List[float]]:
+        """Columns for samples (or rollup buckets) within [start, end]"""
+        if resolution != "raw":
+            return self.rollups[resolution].query(start, end, limit)
+
+        lo, hi = self._range(self.ts, start, end)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return {
+            "timestamps": _ring_slice(self.ts, self.head, lo, hi),
+            "values": _ring_slice(self.values, self.head, lo, hi),
+        }
+
+
+def _flatten(payload: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield dotted field paths and numeric values from a (nested) payload"""
+    for key, value in payload.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + key, float(value)
+        elif isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+
+
+def _parse_ts(value: Any) -> float:
+    """Convert a message timestamp (ISO 8601 or epoch seconds) to epoch seconds"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+def merge_series(
+    parts: Sequence[List[Dict[str, Any]]],
+    resolution: str = "raw",
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Merge ``TelemetryStore.query`` results for one device from several workers
+
+    Each worker holds the samples the NATS queue group handed it. Raw
+    samples are interleaved by timestamp; rollup buckets with the same
+    start are combined, with ``last`` taken from the part listed last.
+    """
+    if len(parts) == 1:
+        return parts[0]
+
+    grouped: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for part in parts:
+        for series in part:
+            grouped.setdefault((series["schema"], series["field"]), []).append(series)
+
+    merged = []
+    for (schema, field), pieces in grouped.items():
+        if resolution == "raw":
+            points = sorted(
+                point for piece in pieces for point in zip(piece["timestamps"], piece["values"])
+            )
+            if limit is not None:
+                points = points[-limit:]
+            columns = {
+                "timestamps": [ts for ts, _ in points],
+                "values": [value for _, value in points],
+            }
+        else:
+            # bucket start -> [min, max, sum, count, last]
+            buckets: Dict[float, List[float]] = {}
+            for piece in pieces:
+                for start, low, high, mean, last, count in zip(
+                    piece["timestamps"], piece["min"], piece["max"], piece["mean"], piece["last"], piece["count"]
+                ):
+                    bucket = buckets.get(start)
+                    if bucket is None:
+                        buckets[start] = [low, high, mean * count, count, last]
+                    else:
+                        bucket[0] = min(bucket[0], low)
+                        bucket[1] = max(bucket[1], high)
+                        bucket[2] += mean * count
+                        bucket[3] += count
+                        bucket[4] = last
+            starts = sorted(buckets)
+            if limit is not None:
+                starts = starts[-limit:]
+            rows = [buckets[start] for start in starts]
+            columns = {
+                "timestamps": starts,
+                "min": [row[0] for row in rows],
+                "max": [row[1] for row in rows],
+                "mean": [row[2] / row[3] for row in rows],
+                "last": [row[4] for row in rows],
+                "count": [row[3] for row in rows],
+            }
+        merged.append({"schema": schema, "field": field, **columns})
+    return merged
+
+
+class TelemetryStore:
+    """Ring buffers of telemetry keyed by (device_id, schema, field)"""
+
+    def __init__(self):
+        self._series: Dict[str, Dict[Tuple[str, str], TelemetrySeries]] = {}
+        self._series_count = 0
+        self.samples = 0
+        self.rejected = 0
+
+    def _get_series(self, device_id: str, schema: str, field: str) -> Optional[TelemetrySeries]:
+        device_series = self._series.get(device_id)
+        if device_series is None:
+            device_series = self._series[device_id] = {}
+
+        series = device_series.get((schema, field))
+        if series is None:
+            if self._series_count >= settings.TELEMETRY_MAX_SERIES:
+                return None
+            series = TelemetrySeries(
+                window=settings.TELEMETRY_RAW_WINDOW,
+                capacity=settings.TELEMETRY_RAW_CAPACITY,
+                rollup_capacity={
+                    "1s": settings.TELEMETRY_RETENTION_1S,
+                    "10s": settings.TELEMETRY_RETENTION_10S,
+                    "1m": settings.TELEMETRY_RETENTION_1M,
+                },
+            )
+            device_series[(schema, field)] = series
+            self._series_count += 1
+        return series
+
+    def record(self, device_id: str, schema: str, ts: Any, payload: Dict[str, Any]) -> int:
+        """Record every numeric field of a payload; returns the number stored"""
+        timestamp = _parse_ts(ts)
+        stored = 0
+        for field, value in _flatten(payload):
+            series = self._get_series(device_id, schema, field)
+            if series is not None and series.append(timestamp, value):
+                stored += 1
+            else:
+                self.rejected += 1
+        self.samples += stored
+        return stored
+
+    def has_device(self, device_id: str) -> bool:
+        """Check whether any telemetry was recorded for a device"""
+        return device_id in self._series
+
+    def query(
+        self,
+        device_id: str,
+        schema: Optional[str] = None,
+        field: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: str = "raw",
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Range query over every matching series of a device"""
+        results = []
+        for (series_schema, series_field), series in self._series.get(device_id, {}).items():
+            if schema is not None and series_schema != schema:
+                continue
+            if field is not None and series_field != field:
+                continue
+            results.append({
+                "schema": series_schema,
+                "field": series_field,
+                **series.query(start, end, resolution, limit),
+            })
+        return results
+
+    def remove_device(self, device_id: str):
+        """Drop all telemetry for a device"""
+        self._series_count -= len(self._series.pop(device_id, {}))
+
+    def stats(self) -> Dict[str, int]:
+        """Store size and counters"""
+        return {
+            "devices": len(self._series),
+            "series": self._series_count,
+            "samples": self.samples,
+            "rejected": self.rejected,
+        }
+
+
+# Singleton instance
+telemetry_store = TelemetryStore()
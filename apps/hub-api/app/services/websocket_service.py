@@ -0,0 +1,221 @@
+"""
+WebSocket connection management with topic subscriptions
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import itertools
+import structlog
+from fastapi import WebSocket
+
+from app.core import codec
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Upper bound on cached topic routes before the cache is reset
+_MAX_ROUTES = 10000
+
+
+def subject_matches(pattern: str, subject: str) -> bool:
+    """Match a subject against a NATS-style pattern (``*`` token, ``>`` tail)"""
+    if pattern == subject:
+        return True
+
+    pattern_tokens = pattern.split(".")
+    subject_tokens = subject.split(".")
+    for i, token in enumerate(pattern_tokens):
+        if token == ">":
+            return len(subject_tokens) > i
+        if i >= len(subject_tokens):
+            return False
+        if token != "*" and token != subject_tokens[i]:
+            return False
+    return len(pattern_tokens) == len(subject_tokens)
+
+
+class ClientConnection:
+    """A WebSocket client with its own bounded outbound queue and writer task
+
+    Events on coalesced topics replace any still-queued event for the same
+    topic, so a slow client only ever sees the latest value. When the queue
+    is full the oldest event is dropped.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        # pattern -> coalesce flag (None uses the server default for the topic)
+        self.topics: Dict[str, Optional[bool]] = {}
+
+        self._queue: "OrderedDict[Any, str]" = OrderedDict()
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Counters
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of events waiting to be sent"""
+        return len(self._queue)
+
+    def start(self):
+        """Start the writer task"""
+        self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        """Stop the writer task"""
+        self.closed = True
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def enqueue(self, payload: str, topic: Optional[str] = None, coalesce: bool = False):
+        """Queue an already serialized event for sending"""
+        if self.closed:
+            return
+
+        if coalesce and topic is not None:
+            key: Any = topic
+            if key in self._queue:
+                self._queue[key] = payload
+                self.coalesced += 1
+                return
+        else:
+            key = next(self._seq)
+
+        if len(self._queue) >= self.max_queue:
+            self._queue.popitem(last=False)
+            self.dropped += 1
+
+        self._queue[key] = payload
+        self._ready.set()
+
+    def send_json(self, message: Dict[str, Any]):
+        """Queue a message for this client only"""
+        self.enqueue(codec.dumps_str(message))
+
+    def match(self, topic: str) -> Optional[str]:
+        """Return the first subscribed pattern matching a topic, or None"""
+        for pattern in self.topics:
+            if subject_matches(pattern, topic):
+                return pattern
+        return None
+
+    async def _writer(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    _, payload = self._queue.popitem(last=False)
+                    await self.websocket.send_text(payload)
+                    self.sent += 1
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.closed = True
+            logger.info("WebSocket writer stopped", error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counters"""
+        return {
+            "topics": list(self.topics),
+            "queue_depth": self.queue_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+
+class ConnectionManager:
+    """Fan-out of hub events to subscribed WebSocket clients"""
+
+    def __init__(self):
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        # topic -> matching clients, rebuilt after any subscription change
+        self._routes: Dict[str, List[Tuple[ClientConnection, bool]]] = {}
+
+    def default_coalesce(self, topic: str) -> bool:
+        """Whether a topic is coalesced unless a subscription says otherwise"""
+        return any(
+            subject_matches(pattern, topic) for pattern in settings.WS_COALESCE_TOPICS
+        )
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        """Register an accepted WebSocket"""
+        client = ClientConnection(websocket, settings.WS_CLIENT_QUEUE_SIZE)
+        client.start()
+        self.clients[websocket] = client
+        return client
+
+    async def disconnect(self, websocket: WebSocket):
+        """Unregister a WebSocket and stop its writer"""
+        client = self.clients.pop(websocket, None)
+        if client:
+            self._routes.clear()
+            await client.stop()
+
+    def subscribe(self, client: ClientConnection, pattern: str, coalesce: Optional[bool] = None):
+        """Subscribe a client to a topic pattern
+
+        ``coalesce`` forces latest-value-only delivery on or off; by default
+        topics matching ``WS_COALESCE_TOPICS`` are coalesced.
+        """
+        client.topics[pattern] = coalesce
+        self._routes.clear()
+
+    def unsubscribe(self, client: ClientConnection, pattern: str):
+        """Remove a client's subscription"""
+        if pattern in client.topics:
+            del client.topics[pattern]
+            self._routes.clear()
+
+    def _route(self, topic: str) -> List[Tuple[ClientConnection, bool]]:
+        route = self._routes.get(topic)
+        if route is None:
+            route = []
+            default_coalesce = self.default_coalesce(topic)
+            for client in self.clients.values():
+                pattern = client.match(topic)
+                if pattern is not None:
+                    coalesce = client.topics[pattern]
+                    route.append((client, default_coalesce if coalesce is None else coalesce))
+            if len(self._routes) >= _MAX_ROUTES:
+                self._routes.clear()
+            self._routes[topic] = route
+        return route
+
+    def publish(self, topic: str, payload: str) -> int:
+        """Queue a serialized event for every subscribed client"""
+        route = self._route(topic)
+        for client, coalesce in route:
+            client.enqueue(payload, topic, coalesce)
+        return len(route)
+
+    def broadcast(self, topic: str, event: Dict[str, Any]) -> int:
+        """Serialize an event once and fan it out to subscribed clients"""
+        route = self._route(topic)
+        if not route:
+            return 0
+        payload = codec.dumps_str(event)
+        for client, coalesce in route:
+            client.enqueue(payload, topic, coalesce)
+        return len(route)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-client queue stats"""
+        return [client.stats() for client in self.clients.values()]
+
+
+# Singleton instance
+connection_manager = ConnectionManager()
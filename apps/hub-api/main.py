@@ -9,13 +9,26 @@ from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from contextlib import asynccontextmanager
 import structlog
+import threading
 
 from app.core.config import settings
+from app.core.log_buffer import log_buffer
+from app.core.profiling import loop_profiler
 from app.api.v1.api import api_router
 from app.core.nats import nats_client
 from app.core.logging import configure_logging
+from app.core.responses import CodecJSONResponse
 from app.middleware.logging import LoggingMiddleware
+from app.db.init_db import init_db
+from app.services.device_service import device_service
+from app.services.discovery_service import discovery_coalescer
+from app.services.flow_service import flow_service
+from app.services.liveness_service import liveness_service
 from app.services.nats_service import nats_service
+from app.services.schema_registry import schema_registry
+from app.services.shared_state import shared_state
+from app.services.system_monitor import system_monitor
+from app.services.websocket_service import connection_manager
 from app.core.exceptions import (
     TafyException,
     tafy_exception_handler,
@@ -35,18 +48,48 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Tafy Hub API", version=settings.VERSION)
     
+    # Tail logs logged on the event loop to log.* WebSocket subscribers
+    log_buffer.stream_from(threading.get_ident())
+    
+    # Compile HAL schemas before any messages arrive
+    if settings.SCHEMA_VALIDATION_ENABLED:
+        schema_registry.load(settings.HAL_SCHEMAS_DIR)
+    
+    # Share registries and WebSocket events with other workers (when Redis is configured)
+    await shared_state.start()
+    shared_state.on_broadcast(connection_manager.publish)
+    
+    # Load the device registry (when a database is configured)
+    await init_db()
+    await device_service.start()
+    await flow_service.start()
+    
     # Connect to NATS
     await nats_client.connect()
     logger.info("Connected to NATS", url=settings.NATS_URL)
     
-    # Set up NATS subscriptions
+    # Set up NATS subscriptions (the leader also starts liveness tracking)
     await nats_service.setup_standard_subscriptions()
     
+    # Sample system stats and dependency health in the background
+    system_monitor.start()
+    
+    # Time every event-loop callback and record the slow ones (opt-in)
+    if settings.LOOP_PROFILING_ENABLED:
+        loop_profiler.install()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Tafy Hub API")
+    await system_monitor.stop()
+    loop_profiler.uninstall()
+    await nats_service.close()
+    await discovery_coalescer.stop()
     await nats_client.close()
+    await liveness_service.stop()
+    await device_service.stop()
+    await shared_state.stop()
 
 
 app = FastAPI(
@@ -54,6 +97,7 @@ app = FastAPI(
     description="Backend API for the Robot Distributed Operation System",
     version=settings.VERSION,
     lifespan=lifespan,
+    default_response_class=CodecJSONResponse,
 )
 
 # Add middleware
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Benchmark per-request overhead of the request logging middleware.
+
+Runs entirely in-process: requests are driven straight through the ASGI
+app, so the numbers measure middleware cost, not HTTP parsing or sockets.
+Compares no middleware, the previous ``BaseHTTPMiddleware`` implementation
+and the current pure ASGI ``LoggingMiddleware``. Log output is discarded
+unless ``--log`` is given.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import structlog  # noqa: E402
+from fastapi import APIRouter, FastAPI, Request  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.core.timing import TimedRoute  # noqa: E402
+from app.middleware.logging import LoggingMiddleware  # noqa: E402
+
+logger = structlog.get_logger()
+
+
+class BaseHTTPLoggingMiddleware(BaseHTTPMiddleware):
+    """The previous implementation, kept here as the baseline"""
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = str(uuid.uuid4())
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+        logger.info("Request started", method=request.method, path=request.url.path,
+                    client=request.client.host if request.client else None)
+        start_time = time.time()
+        response = await call_next(request)
+        duration = time.time() - start_time
+        logger.info("Request completed", method=request.method, path=request.url.path,
+                    status_code=response.status_code, duration_ms=round(duration * 1000, 2))
+        response.headers["X-Request-ID"] = request_id
+        structlog.contextvars.clear_contextvars()
+        return response
+
+
+def make_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/devices/{device_id}")
+    async def get_device(device_id: str):
+        return {"id": device_id, "status": "online"}
+
+    app.include_router(router)
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> float:
+    """Seconds per request for sequential GETs"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/devices/bot-1",
+        "raw_path": b"/devices/bot-1",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # Warm up route matching and caches
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5, help="interleaved rounds; the best round counts")
+    parser.add_argument("--log", action="store_true", help="render logs to stderr instead of discarding them")
+    args = parser.parse_args()
+
+    if not args.log:
+        logging.disable(logging.CRITICAL)
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.JSONRenderer(),
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    variants = [
+        ("no middleware", None),
+        ("BaseHTTPMiddleware (before)", BaseHTTPLoggingMiddleware),
+        ("pure ASGI (after)", LoggingMiddleware),
+    ]
+    apps = [make_app(middleware) for _, middleware in variants]
+    best = [float("inf")] * len(variants)
+    for _ in range(args.rounds):
+        for i, app in enumerate(apps):
+            best[i] = min(best[i], await drive(app, args.requests) * 1e6)
+
+    print(f"{'variant':<30} {'us/request':>12} {'overhead us':>12}")
+    for (name, _), per_request in zip(variants, best):
+        print(f"{name:<30} {per_request:>12.1f} {per_request - best[0]:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,13 +2,14 @@
 Pytest configuration and fixtures for hub-api tests
 """
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock, PropertyMock
+import asyncio
 import sys
 import os
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
 
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -17,17 +18,7 @@ from app.main import app
 from app.core.config import settings
 from app.core.nats import NATSClient
 from app.db.base import Base
-from app.db.session import get_db
-
-# Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from app.db.session import get_async_db
 
 
 @pytest.fixture(autouse=True)
@@ -39,6 +30,9 @@ def mock_nats_client(monkeypatch):
     mock_client.close = AsyncMock()
     mock_client.publish = AsyncMock()
     mock_client.subscribe = AsyncMock()
+    mock_client.request = AsyncMock(return_value={"status": "ok"})
+    mock_client.sent_messages = {}
+    mock_client.sent_bytes = {}
     
     # Mock the is_connected property to always return True
     type(mock_client).is_connected = PropertyMock(return_value=True)
@@ -64,27 +58,43 @@ def anyio_backend():
 
 
 @pytest.fixture
-def db():
-    """Create a fresh database for each test."""
-    Base.metadata.create_all(bind=engine)
-    session = TestingSessionLocal()
+def db(tmp_path):
+    """Create a fresh database for each test.
+    
+    A file database without pooling, so sessions can be opened on the test
+    client's event loop as well as the test's.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+    
+    async def create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    
+    asyncio.run(create_all())
     try:
-        yield session
+        yield async_sessionmaker(engine, expire_on_commit=False)
     finally:
-        session.close()
-        Base.metadata.drop_all(bind=engine)
+        asyncio.run(engine.dispose())
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """In-memory database on the test's event loop, for repository tests"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
 
 
 @pytest.fixture
-def client(db: Session):
+def client(db: async_sessionmaker):
     """Create a test client with database override."""
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            pass
+    async def override_get_async_db():
+        async with db() as session:
+            yield session
     
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     with TestClient(app) as test_client:
         yield test_client
@@ -0,0 +1,101 @@
+"""
+Test the capability index and query endpoint
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.schemas.device import DeviceCreate, DeviceStatus
+from app.services.capability_index import CapabilityIndex, parse_capabilities, parse_requirement
+from app.services.device_service import DeviceService
+
+
+def test_parse_capabilities_accepts_both_forms():
+    """TXT-record lists carry versions; registration dicts do not"""
+    assert parse_capabilities(["motor.differential:v1.2", "sensor.range-tof", "bad cap"]) == {
+        "motor.differential": (1, 2),
+        "sensor.range-tof": None,
+    }
+    assert parse_capabilities({"motor": ["differential"], "led": True}) == {
+        "motor.differential": None,
+        "led": None,
+    }
+    assert parse_capabilities(None) == {}
+
+
+def test_parse_requirement():
+    """Requirements default to minor version 0"""
+    requirement = parse_requirement("motor.differential:v2")
+    assert (requirement.name, requirement.domain, requirement.major, requirement.minor) == (
+        "motor.differential", "motor", 2, 0
+    )
+    for bad in ("Motor", "motor:v1.0", "motor.differential:1.0", ""):
+        with pytest.raises(ValueError):
+            parse_requirement(bad)
+
+
+def test_versions_match_same_major_and_newer_minor():
+    """A requirement is met by the same major and an equal or newer minor"""
+    index = CapabilityIndex()
+    index.add("a", ["motor.differential:v1.0"])
+    index.add("b", ["motor.differential:v1.3"])
+    index.add("c", ["motor.differential:v2.0"])
+    index.add("d", {"motor": ["differential"]})
+
+    assert index.query(["motor.differential:v1.0"]) == {"a", "b"}
+    assert index.query(["motor.differential:v1.2"]) == {"b"}
+    assert index.query(["motor.differential:v2.0"]) == {"c"}
+    assert index.query(["motor.differential"]) == {"a", "b", "c", "d"}
+    assert index.query(["motor"]) == {"a", "b", "c", "d"}
+    assert index.query(["motor.servo"]) == set()
+
+
+def test_readding_replaces_capabilities():
+    """Re-indexing a device drops what it declared before"""
+    index = CapabilityIndex()
+    index.add("a", ["motor.differential:v1.0", "sensor.imu:v1.0"])
+    generation = index.generation
+    index.add("a", ["sensor.imu:v1.1"])
+
+    assert index.generation > generation
+    assert index.query(["motor"]) == set()
+    assert index.query(["sensor.imu:v1.1"]) == {"a"}
+    index.remove("a")
+    assert len(index) == 0
+    assert index.summary() == {}
+
+
+@pytest.mark.asyncio
+async def test_find_devices_filters_by_status():
+    """find_devices intersects capabilities with the status index"""
+    service = DeviceService()
+    for i in range(6):
+        caps = ["motor.differential:v1.0"] + (["sensor.range-tof:v1.0"] if i % 2 else [])
+        await service.create_device(DeviceCreate(id=f"bot-{i}", name=f"bot-{i}", type="esp32", capabilities=caps))
+    await service.set_online("bot-1", True)
+    await service.set_online("bot-2", True)
+
+    requirements = ["motor.differential:v1.0", "sensor.range-tof"]
+    assert service.find_devices(requirements) == ["bot-1", "bot-3", "bot-5"]
+    assert service.find_devices(requirements, status=DeviceStatus.online) == ["bot-1"]
+
+
+def test_capability_query_endpoint(client: TestClient):
+    """Discovery-style capability lists are accepted and queryable"""
+    client.post("/api/v1/devices/", json={
+        "id": "cap-bot-1",
+        "name": "Cap Bot",
+        "type": "esp32",
+        "capabilities": ["motor.differential:v1.0", "sensor.range-tof:v1.0"],
+    })
+
+    response = client.get(
+        "/api/v1/devices/capabilities",
+        params=[("require", "motor.differential:v1.0"), ("require", "sensor.range-tof")],
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert "cap-bot-1" in data["devices"]
+    assert data["total"] == len(data["devices"])
+
+    assert client.get("/api/v1/devices/capabilities", params={"require": "Not Valid"}).status_code == 400
@@ -0,0 +1,52 @@
+"""
+Test the shared JSON codec
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.core import codec
+from app.schemas.device import DeviceStatus
+from app.schemas.flow import FlowDeploy
+
+BACKENDS = ["json"]
+for name in ("orjson", "msgspec"):
+    try:
+        __import__(name)
+        BACKENDS.append(name)
+    except ImportError:
+        pass
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_codec_backends_agree(backend):
+    """Every backend encodes hub types the same way and round-trips"""
+    name, dumps, loads, decode_error = codec._load_backend(backend)
+    assert name == backend
+
+    value = {
+        "ts": datetime(2025, 1, 1, 12, 0, 0),
+        "status": DeviceStatus.online,
+        "deploy": FlowDeploy(target_nodes=["node-1"]),
+        "n": 1.5,
+    }
+    encoded = dumps(value)
+    assert isinstance(encoded, bytes)
+    assert loads(encoded) == {
+        "ts": "2025-01-01T12:00:00",
+        "status": "online",
+        "deploy": {"target_nodes": ["node-1"], "force": False},
+        "n": 1.5,
+    }
+
+    with pytest.raises(decode_error):
+        loads(b"{not json")
+
+
+def test_codec_module_api():
+    """The module-level helpers use the selected backend"""
+    assert codec.BACKEND in BACKENDS
+    assert codec.loads(codec.dumps({"a": [1, 2]})) == {"a": [1, 2]}
+    assert codec.dumps_str({"a": 1}) == '{"a":1}'
+    assert codec.loads('{"a": 1}') == {"a": 1}
@@ -0,0 +1,54 @@
+"""
+Test async database engine configuration
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.session import InstrumentedAsyncQueuePool, async_database_url, pool_metrics
+
+
+def test_async_database_url():
+    """Database URLs are mapped to their async drivers"""
+    assert async_database_url("postgresql://u:p@db/tafy") == "postgresql+asyncpg://u:p@db/tafy"
+    assert async_database_url("postgres://db/tafy") == "postgresql+asyncpg://db/tafy"
+    assert async_database_url("sqlite:///./tafy.db") == "sqlite+aiosqlite:///./tafy.db"
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_waits(tmp_path):
+    """Checkouts through the instrumented pool record wait time and timeouts"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    waits = pool_metrics.waits
+    timeouts = pool_metrics.timeouts
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert engine.pool.checkedout() == 1
+        # The only connection is taken, so a second checkout times out
+        with pytest.raises(Exception):
+            async with engine.connect():
+                pass
+
+    assert pool_metrics.waits == waits + 2
+    assert pool_metrics.timeouts == timeouts + 1
+    assert pool_metrics.max_wait >= 0.05
+    await engine.dispose()
+
+
+def test_database_stats_endpoint(client: TestClient):
+    """Pool stats are served even without a configured database"""
+    response = client.get("/api/v1/system/database")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["configured"] is False
+    assert data["waits"] >= 0
@@ -0,0 +1,132 @@
+"""
+Test device indexes, pagination and projection
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.schemas.device import DeviceCreate, DeviceResponse, DeviceStatus, DeviceUpdate
+from app.services.device_service import DeviceService, decode_cursor
+
+
+async def populated_service(count=30):
+    service = DeviceService()
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        await service.create_device(DeviceCreate(
+            id=f"dev-{i:02d}",
+            name=f"Device {i}",
+            type="esp32" if i % 2 else "pi",
+            capabilities={"motor": ["differential"]} if i % 3 == 0 else {"sensor": ["imu"]},
+        ))
+        service._update(service._devices[f"dev-{i:02d}"], {"last_seen": base + timedelta(seconds=i)})
+    return service
+
+
+@pytest.mark.asyncio
+async def test_filters_use_indexes():
+    """Filters intersect the secondary indexes"""
+    service = await populated_service()
+
+    page = service.query_devices(type="esp32", capability="motor", limit=100)
+    ids = [device["id"] for device in page["devices"]]
+    assert ids == [f"dev-{i:02d}" for i in range(29, -1, -1) if i % 2 and i % 3 == 0]
+    assert page["total"] == len(ids)
+    assert page["next_cursor"] is None
+
+    await service.claim_device("dev-03")
+    assert service.query_devices(claimed=True)["total"] == 1
+    assert service.query_devices(status=DeviceStatus.claimed)["devices"][0]["id"] == "dev-03"
+    assert service.query_devices(status=DeviceStatus.discovered)["total"] == 29
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_every_device_once():
+    """Walking the cursor visits each device exactly once in last_seen order"""
+    service = await populated_service()
+
+    for descending in (True, False):
+        seen, cursor = [], None
+        while True:
+            page = service.query_devices(descending=descending, cursor=cursor, limit=7)
+            seen.extend(device["id"] for device in page["devices"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        expected = [f"dev-{i:02d}" for i in range(30)]
+        assert seen == (expected[::-1] if descending else expected)
+
+
+@pytest.mark.asyncio
+async def test_updates_move_devices_between_indexes():
+    """Changing a device re-indexes it and drops its cached serialization"""
+    service = await populated_service(5)
+    assert service.serialize("dev-01")["status"] == "discovered"
+
+    await service.update_device("dev-01", DeviceUpdate(status=DeviceStatus.online))
+    await service.update_device("dev-01", DeviceUpdate(capabilities={"motor": ["servo"]}))
+
+    assert service.serialize("dev-01")["status"] == "online"
+    assert service.query_devices(status=DeviceStatus.online)["devices"][0]["id"] == "dev-01"
+    assert service.query_devices(capability="motor.servo")["total"] == 1
+    assert "dev-01" not in {d["id"] for d in service.query_devices(capability="sensor")["devices"]}
+    # Going online bumps last_seen to the front of the default order
+    assert service.query_devices(limit=1)["devices"][0]["id"] == "dev-01"
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_cache_and_reorders_on_read():
+    """Heartbeats patch the cached response; the order catches up on the next listing"""
+    service = await populated_service(5)
+    cached = service.serialize("dev-01")
+
+    await service.record_seen("dev-01")
+    await service.record_seen("dev-03")
+    await service.record_seen("dev-01")
+    assert service.serialize("dev-01") is cached
+    assert cached == DeviceResponse(**service._devices["dev-01"]).model_dump(mode="json")
+
+    ids = [device["id"] for device in service.query_devices()["devices"]]
+    assert ids == ["dev-01", "dev-03", "dev-04", "dev-02", "dev-00"]
+    assert len(service._by_last_seen) == 5
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected():
+    """Malformed cursors raise ValueError"""
+    service = await populated_service(2)
+    with pytest.raises(ValueError):
+        service.query_devices(cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_cursor("")
+    with pytest.raises(ValueError):
+        service.query_devices(capability="Motor!")
+
+
+def test_list_devices_projection_and_paging(client: TestClient):
+    """The list endpoint paginates and projects fields"""
+    for i in range(3):
+        client.post("/api/v1/devices/", json={"id": f"page-{i}", "name": f"Page {i}", "type": "page-test"})
+
+    response = client.get("/api/v1/devices/", params={"type": "page-test", "limit": 2, "fields": "id,status"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert len(data["devices"]) == 2
+    assert set(data["devices"][0]) == {"id", "status"}
+    assert data["next_cursor"]
+
+    response = client.get(
+        "/api/v1/devices/",
+        params={"type": "page-test", "limit": 2, "cursor": data["next_cursor"]},
+    )
+    assert len(response.json()["devices"]) == 1
+    assert response.json()["next_cursor"] is None
+
+
+def test_list_devices_rejects_bad_parameters(client: TestClient):
+    """Unknown fields and malformed cursors are client errors"""
+    assert client.get("/api/v1/devices/", params={"fields": "id,secret"}).status_code == 400
+    assert client.get("/api/v1/devices/", params={"cursor": "bogus"}).status_code == 400
@@ -0,0 +1,106 @@
+"""
+Test write-behind persistence of the device registry
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+
+from app.models.device import Device, DeviceStatus as ModelDeviceStatus
+from app.schemas.device import DeviceCreate, DeviceStatus
+from app.services.device_persistence import DeviceWriteBehind
+from app.services.device_service import DeviceService
+import app.services.device_service as device_service_module
+
+
+@pytest.fixture
+def persisted_service(session_factory, monkeypatch):
+    """A DeviceService backed by its own write-behind instance"""
+    write_behind = DeviceWriteBehind(session_factory, flush_interval=60, batch_size=100)
+    monkeypatch.setattr(device_service_module, "device_write_behind", write_behind)
+    return DeviceService(), write_behind
+
+
+def make_device(device_id):
+    return DeviceCreate(id=device_id, name=device_id, type="esp32")
+
+
+@pytest.mark.asyncio
+async def test_updates_are_coalesced_into_one_flush(persisted_service, session_factory):
+    """Many updates to many devices cost one transaction per flush"""
+    service, write_behind = persisted_service
+    await service.start()
+
+    for i in range(20):
+        await service.create_device(make_device(f"dev-{i}"))
+    for _ in range(50):
+        for i in range(20):
+            await service.record_seen(f"dev-{i}", DeviceStatus.online)
+    assert write_behind.pending == 20
+
+    transactions = []
+    engine = session_factory.kw["bind"]
+    event.listen(engine.sync_engine, "commit", lambda conn: transactions.append(1))
+    assert await write_behind.flush() == 20
+    assert len(transactions) == 1
+    assert write_behind.pending == 0
+
+    async with session_factory() as session:
+        rows = (await session.scalars(select(Device))).all()
+    assert len(rows) == 20
+    assert {row.status for row in rows} == {ModelDeviceStatus.ONLINE}
+
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_registry_reloads_after_restart(persisted_service, session_factory):
+    """Devices written by one service instance are loaded by the next"""
+    service, write_behind = persisted_service
+    await service.start()
+    await service.create_device(make_device("dev-1"))
+    await service.claim_device("dev-1")
+    await service.stop()
+
+    restarted = DeviceService()
+    await restarted.start()
+    device = await restarted.get_device("dev-1")
+    assert device is not None
+    assert device.claimed is True
+    assert device.status == DeviceStatus.claimed
+    await restarted.stop()
+
+
+@pytest.mark.asyncio
+async def test_size_threshold_triggers_flush(session_factory, monkeypatch):
+    """Reaching the batch size wakes the flusher before the interval"""
+    write_behind = DeviceWriteBehind(session_factory, flush_interval=60, batch_size=5)
+    monkeypatch.setattr(device_service_module, "device_write_behind", write_behind)
+    service = DeviceService()
+    await service.start()
+
+    for i in range(5):
+        await service.create_device(make_device(f"dev-{i}"))
+    await asyncio.sleep(0.1)
+
+    assert write_behind.flushes == 1
+    assert write_behind.rows_written == 5
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_without_database_nothing_is_queued(monkeypatch):
+    """Without a database the registry is memory-only"""
+    import app.db.session
+
+    monkeypatch.setattr(app.db.session, "AsyncSessionLocal", None)
+    write_behind = DeviceWriteBehind()
+    monkeypatch.setattr(device_service_module, "device_write_behind", write_behind)
+    service = DeviceService()
+    await service.start()
+    await service.create_device(make_device("dev-1"))
+
+    assert not write_behind.enabled
+    assert write_behind.pending == 0
+    await service.stop()
@@ -0,0 +1,121 @@
+"""
+Test coalesced mDNS discovery handling
+"""
+
+import pytest
+
+from app.core import codec
+from app.services.device_service import DeviceService
+from app.services.discovery_service import DiscoveryCoalescer, parse_announcement
+import app.services.device_service as device_service_module
+
+
+def announcement(instance, caps="motor.differential:v1.0", ip="192.168.1.50", extra=()):
+    return {
+        "Instance": instance,
+        "HostName": f"{instance}.local",
+        "Text": [f"caps={caps}", "type=esp32", *extra],
+        "AddrIPv4": [ip],
+    }
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    service = DeviceService()
+    monkeypatch.setattr(device_service_module, "device_service", service)
+    return service
+
+
+def published(mock_nats_client):
+    return [
+        codec.loads(call.args[1]) if isinstance(call.args[1], bytes) else call.args[1]
+        for call in mock_nats_client.publish.call_args_list
+        if call.args[0] == "hub.events.devices"
+    ]
+
+
+def test_parse_announcement():
+    """TXT records become capabilities and metadata"""
+    fields = parse_announcement(announcement("bot-1", extra=["fw=1.2"]))
+    assert fields == {
+        "type": "esp32",
+        "capabilities": ["motor.differential:v1.0"],
+        "device_metadata": {"type": "esp32", "fw": "1.2"},
+        "ip_address": "192.168.1.50",
+    }
+
+
+@pytest.mark.asyncio
+async def test_storm_is_coalesced_into_one_batch(registry, mock_nats_client):
+    """Repeated announcements within a window register each device once"""
+    coalescer = DiscoveryCoalescer(window=60)
+    for _ in range(20):
+        for i in range(5):
+            coalescer.offer(announcement(f"bot-{i}"))
+    assert coalescer.pending == 5
+
+    assert await coalescer.flush() == 5
+    assert coalescer.created == 5
+    assert coalescer.coalesced == 95
+    assert registry.find_devices(["motor.differential:v1.0"]) == [f"bot-{i}" for i in range(5)]
+
+    events = published(mock_nats_client)
+    assert len(events) == 1
+    assert events[0]["type"] == "device.batch"
+    assert {event["type"] for event in events[0]["events"]} == {"device.discovered"}
+    await coalescer.stop()
+
+
+@pytest.mark.asyncio
+async def test_only_real_changes_publish(registry, mock_nats_client):
+    """Re-announcements that match the registry publish nothing"""
+    coalescer = DiscoveryCoalescer(window=60)
+    coalescer.offer(announcement("bot-1"))
+    await coalescer.flush()
+    mock_nats_client.publish.reset_mock()
+
+    # Same content, TXT records reordered
+    repeat = announcement("bot-1")
+    repeat["Text"].reverse()
+    coalescer.offer(repeat)
+    assert await coalescer.flush() == 0
+    assert coalescer.unchanged == 1
+
+    # A renamed device keeps its name across re-announcements
+    registry.apply_changes("bot-1", {"name": "Left rover"})
+    coalescer.offer(announcement("bot-1", ip="192.168.1.51"))
+    assert await coalescer.flush() == 1
+    device = await registry.get_device("bot-1")
+    assert device.ip_address == "192.168.1.51"
+    assert device.name == "Left rover"
+
+    events = published(mock_nats_client)
+    assert [event["type"] for event in events] == ["device.updated"]
+    await coalescer.stop()
+
+
+@pytest.mark.asyncio
+async def test_announcement_without_instance_is_rejected(registry):
+    """Announcements without an Instance are counted and dropped"""
+    coalescer = DiscoveryCoalescer(window=60)
+    assert coalescer.offer({"HostName": "x.local"}) is False
+    assert coalescer.stats()["invalid"] == 1
+    assert coalescer.pending == 0
+
+
+
+@pytest.mark.asyncio
+async def test_bad_announcement_does_not_abort_the_window(registry, mock_nats_client):
+    """An announcement that fails validation is counted; the rest are still applied"""
+    coalescer = DiscoveryCoalescer(window=60)
+    coalescer.offer(announcement("bot-1"))
+    coalescer.offer(announcement("bot-2", extra=["type="]))
+    coalescer.offer({**announcement("bot-3"), "HostName": "x" * 500})
+    coalescer.offer(announcement("bot-4"))
+
+    assert await coalescer.flush() == 2
+    assert coalescer.errors == 2
+    assert registry.has_device("bot-1") and registry.has_device("bot-4")
+    assert not registry.has_device("bot-2")
+    events = published(mock_nats_client)[0]["events"]
+    assert [event["device_id"] for event in events] == ["bot-1", "bot-4"]
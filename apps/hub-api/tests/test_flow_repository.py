@@ -0,0 +1,110 @@
+"""
+Test the SQL flow repository and config cache
+"""
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.flow import FlowElement, FlowVersion
+from app.schemas.flow import FlowCreate, FlowUpdate
+from app.services.flow_repository import ConfigCache, FlowRepository
+from app.services.flow_service import FlowService
+import app.services.flow_service as flow_service_module
+
+
+@pytest.fixture
+def repository(session_factory, monkeypatch):
+    repository = FlowRepository(session_factory)
+    monkeypatch.setattr(flow_service_module, "flow_repository", repository)
+    return repository
+
+
+def big_config(tag):
+    return {"nodes": [{"id": f"n{i}", "type": "function", "func": f"// {tag} {i}"} for i in range(100)]}
+
+
+def test_config_cache_evicts_least_recently_used():
+    """The cache keeps the most recently used configs"""
+    cache = ConfigCache(max_size=2)
+    cache.put("a", 1, {"a": 1})
+    cache.put("b", 1, {"b": 1})
+    assert cache.get("a", 1) == {"a": 1}
+    cache.put("c", 1, {"c": 1})
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == {"a": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flows_and_history_survive_restart(repository):
+    """Flows, configs and versions are read back by a new service"""
+    service = FlowService()
+    flow = await service.create_flow(FlowCreate(name="Patrol", config=big_config("v1"), target_nodes=["a"]))
+    await service.update_flow(flow.id, FlowUpdate(config=big_config("v2")))
+    await service.update_flow(flow.id, FlowUpdate(name="Night patrol"))
+    await service.deploy_flow(flow.id)
+
+    restarted = FlowService()
+    await restarted.start()
+    summaries = await restarted.list_flows()
+    assert [(s.name, s.version, s.deployed) for s in summaries] == [("Night patrol", 2, True)]
+
+    loaded = await restarted.get_flow(flow.id)
+    assert loaded.config == big_config("v2")
+    assert [v["version"] for v in await restarted.get_versions(flow.id)] == [1, 2]
+    assert await restarted.get_version_config(flow.id, 1) == big_config("v1")
+    assert await restarted.get_version_config(flow.id, 3) is None
+
+
+@pytest.mark.asyncio
+async def test_versions_store_each_element_once(repository, session_factory):
+    """Metadata edits add no version; a new version writes only changed elements"""
+    service = FlowService()
+    flow = await service.create_flow(FlowCreate(name="Patrol", config=big_config("v1")))
+    for i in range(5):
+        await service.update_flow(flow.id, FlowUpdate(name=f"Patrol {i}"))
+    await service.update_flow(flow.id, FlowUpdate(config=big_config("v1")))
+    assert (await service.get_flow(flow.id)).version == 1
+
+    changed = big_config("v1")
+    changed["nodes"][3]["func"] = "// changed"
+    await service.update_flow(flow.id, FlowUpdate(config=changed))
+
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count()).select_from(FlowElement)) == 101
+        assert await session.scalar(select(func.count()).select_from(FlowVersion)) == 2
+
+    restarted = FlowService()
+    await restarted.start()
+    assert await restarted.get_version_config(flow.id, 1) == big_config("v1")
+    assert await restarted.get_version_config(flow.id, 2) == changed
+
+
+@pytest.mark.asyncio
+async def test_listing_does_not_load_configs(repository, session_factory):
+    """Listing reads only the small columns; configs come from the cache"""
+    service = FlowService()
+    for i in range(5):
+        await service.create_flow(FlowCreate(name=f"Flow {i}", config=big_config(i)))
+
+    statements = []
+    engine = session_factory.kw["bind"]
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    restarted = FlowService()
+    await restarted.start()
+    assert len(await restarted.list_flows()) == 5
+    assert len(statements) == 1
+    assert "flows.config" not in statements[0]
+
+    flow_id = (await restarted.list_flows())[0].id
+    await restarted.get_flow(flow_id)
+    await restarted.get_flow(flow_id)
+    # One query for the config, then served from the cache
+    assert len(statements) == 2
+    assert restarted._configs.stats()["hits"] == 1
@@ -0,0 +1,179 @@
+"""
+Test content-addressed flow storage and delta deploys
+"""
+
+import pytest
+
+from app.core import codec
+from app.core.config import settings
+from app.schemas.flow import FlowCreate, FlowUpdate
+from app.services.flow_service import FlowService
+from app.services.flow_store import FlowStore, apply_delta, split_config
+
+
+def make_config(count=50, changed=(), removed=(), added=()):
+    nodes = [
+        {"id": f"n{i}", "type": "function", "z": "tab1", "func": f"return msg; // {i}{'!' if i in changed else ''}"}
+        for i in range(count) if i not in removed
+    ]
+    nodes += [{"id": f"x{i}", "type": "debug", "z": "tab1"} for i in added]
+    return {"tabs": [{"id": "tab1", "label": "Main"}], "nodes": nodes, "settings": {"debug": False}}
+
+
+def test_split_config_addresses_items_by_id():
+    """Id-keyed lists are split per item; other values stay whole"""
+    paths = [path for path, _ in split_config(make_config(2))]
+    assert paths == ["/tabs/tab1", "/nodes/n0", "/nodes/n1", "/settings"]
+    # Duplicate ids cannot be addressed, so the list is kept whole
+    assert [path for path, _ in split_config({"nodes": [{"id": 1}, {"id": 1}]})] == ["/nodes"]
+
+
+def test_versions_share_unchanged_content():
+    """A new version only stores the elements that changed"""
+    store = FlowStore()
+    store.commit("flow", 1, make_config())
+    elements = store.stats()["elements"]
+    store.commit("flow", 2, make_config(changed={3}))
+
+    assert store.stats()["elements"] == elements + 1
+    assert store.config("flow", 2) == make_config(changed={3})
+    assert store.get("flow", 1)["root"] != store.get("flow", 2)["root"]
+
+    store.delete("flow")
+    assert store.stats() == {"flows": 0, "versions": 0, "elements": 0}
+
+
+def test_diff_round_trips():
+    """Applying a diff to the base config yields the target config"""
+    store = FlowStore()
+    base = make_config()
+    target = make_config(changed={1, 2}, removed={10}, added={1})
+    target["settings"] = {"debug": True}
+    store.commit("flow", 1, base)
+    store.commit("flow", 2, target)
+
+    delta = store.diff("flow", 1, 2)
+    assert sorted((op["op"], op["path"]) for op in delta) == [
+        ("add", "/nodes/x1"),
+        ("remove", "/nodes/n10"),
+        ("replace", "/nodes/n1"),
+        ("replace", "/nodes/n2"),
+        ("replace", "/settings"),
+    ]
+    assert apply_delta(base, delta) == target
+    assert store.diff("flow", 1, 3) is None
+
+
+def test_diff_between_list_shapes():
+    """A list that empties or fills up still round-trips"""
+    store = FlowStore()
+    store.commit("flow", 1, {"nodes": []})
+    store.commit("flow", 2, {"nodes": [{"id": "a"}]})
+    assert apply_delta({"nodes": []}, store.diff("flow", 1, 2)) == {"nodes": [{"id": "a"}]}
+    assert apply_delta({"nodes": [{"id": "a"}]}, store.diff("flow", 2, 1)) == {"nodes": []}
+
+
+@pytest.mark.asyncio
+async def test_redeploy_sends_delta_against_acknowledged_version(mock_nats_client):
+    """Nodes that acknowledged a version receive only what changed"""
+    service = FlowService()
+    flow = await service.create_flow(FlowCreate(name="Big", config=make_config(200), target_nodes=["a", "b"]))
+
+    first = await service.deploy_flow(flow.id)
+    assert {result["mode"] for result in first["nodes"]} == {"full"}
+
+    await service.update_flow(flow.id, FlowUpdate(config=make_config(200, changed={7})))
+    second = await service.deploy_flow(flow.id, ["a", "b", "c"])
+    modes = {result["node"]: result["mode"] for result in second["nodes"]}
+    assert modes == {"a": "delta", "b": "delta", "c": "full"}
+    sizes = {result["node"]: result["bytes_sent"] for result in second["nodes"]}
+    assert sizes["a"] * 10 < sizes["c"]
+
+    message = codec.loads(mock_nats_client.request.call_args_list[-3].args[1])
+    assert message["base_version"] == 1
+    assert message["delta"] == [{"op": "replace", "path": "/nodes/n7", "value": make_config(200, changed={7})["nodes"][7]}]
+
+
+@pytest.mark.asyncio
+async def test_rejected_delta_falls_back_to_full_config(mock_nats_client):
+    """A node that cannot apply a delta gets the full config"""
+    service = FlowService()
+    flow = await service.create_flow(FlowCreate(name="Big", config=make_config(), target_nodes=["a"]))
+    await service.deploy_flow(flow.id)
+    await service.update_flow(flow.id, FlowUpdate(config=make_config(changed={1})))
+
+    async def reply(subject, data, timeout):
+        message = codec.loads(data)
+        if "delta" in message:
+            return {"status": "error", "error": "base version not held"}
+        return {"status": "ok"}
+
+    mock_nats_client.request.side_effect = reply
+    report = await service.deploy_flow(flow.id)
+    result = report["nodes"][0]
+    assert (result["status"], result["mode"], result["error"]) == ("ok", "full", None)
+    assert [version["version"] for version in (await service.get_versions(flow.id))] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_update_during_deploy_leaves_flow_needing_redeploy(mock_nats_client):
+    """A deploy reports the version it sent, not one committed while it ran"""
+    service = FlowService()
+    flow = await service.create_flow(FlowCreate(name="Racy", config=make_config(5), target_nodes=["a", "b"]))
+    await service.deploy_flow(flow.id)
+    await service.update_flow(flow.id, FlowUpdate(config=make_config(5, changed={1})))
+    sent = []
+
+    async def reply(subject, data, timeout):
+        sent.append(codec.loads(data)["version"])
+        if len(sent) == 1:
+            await service.update_flow(flow.id, FlowUpdate(config=make_config(5, changed={2})))
+        return {"status": "ok"}
+
+    mock_nats_client.request.side_effect = reply
+    report = await service.deploy_flow(flow.id)
+
+    assert sent == [2, 2]
+    assert report["version"] == 2
+    assert report["deployed"] is False
+    current = await service.get_flow(flow.id)
+    assert current.version == 3
+    assert current.deployed is False
+    assert service.store.get(flow.id, 3) is not None
+
+
+@pytest.mark.asyncio
+async def test_update_does_not_prune_the_version_being_deployed(mock_nats_client, monkeypatch):
+    """Nodes reached after an update still get a usable delta of the deployed version"""
+    monkeypatch.setattr(settings, "FLOW_DEPLOY_CONCURRENCY", 1)
+    service = FlowService()
+    flow = await service.create_flow(FlowCreate(name="Racy", config=make_config(5), target_nodes=["a", "b"]))
+    await service.deploy_flow(flow.id)
+    await service.update_flow(flow.id, FlowUpdate(config=make_config(5, changed={1})))
+    sent = []
+
+    async def reply(subject, data, timeout):
+        sent.append(codec.loads(data))
+        if len(sent) == 1:
+            await service.update_flow(flow.id, FlowUpdate(config=make_config(5, changed={2})))
+        return {"status": "ok"}
+
+    mock_nats_client.request.side_effect = reply
+    await service.deploy_flow(flow.id)
+
+    assert [message["version"] for message in sent] == [2, 2]
+    for message in sent:
+        assert apply_delta(make_config(5), message["delta"]) == make_config(5, changed={1})
+    # Nothing in flight any more: only the current and acknowledged versions are kept
+    assert [record["version"] for record in service.store.history(flow.id)] == [2, 3]
+
+
+def test_missing_diff_falls_back_to_full_config():
+    """A base whose diff cannot be computed gets the full config"""
+    service = FlowService()
+    record = service.store.commit("flow", 2, make_config(5))
+    service.store.commit("flow", 1, make_config(4))
+    service.store.diff = lambda flow_id, base, target: None
+    mode, message = service._deploy_message("flow", 2, record, make_config(5), 1)
+    assert mode == "full"
+    assert codec.loads(message)["config"] == make_config(5)
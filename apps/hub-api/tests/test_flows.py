@@ -119,6 +119,13 @@ def test_deploy_flow(client: TestClient):
     data = response.json()
     assert data["deployed"] is True
     assert data["deployed_at"] is not None
+    assert data["succeeded"] == 1
+    assert data["nodes"][0]["node"] == "node-001"
+    assert data["nodes"][0]["status"] == "ok"
+    
+    response = client.get(f"/api/v1/flows/{flow_id}/deployment")
+    assert response.status_code == 200
+    assert response.json()["flow_id"] == flow_id
 
 
 
@@ -142,4 +149,63 @@ def test_undeploy_flow(client: TestClient):
     
     data = response.json()
     assert data["deployed"] is False
-    assert data["deployed_at"] is None
\ No newline at end of file
+    assert data["deployed_at"] is None
+
+
+@pytest.mark.asyncio
+async def test_deploy_is_concurrent_and_reports_each_node(mock_nats_client):
+    """Nodes are deployed in parallel and each outcome is recorded"""
+    import asyncio
+    from nats.errors import NoRespondersError, TimeoutError as NATSTimeoutError
+
+    from app.schemas.flow import FlowCreate
+    from app.services.flow_service import FlowService
+
+    async def reply(subject, data, timeout):
+        node = subject.split(".")[1]
+        await asyncio.sleep(0.05)
+        if node == "node-late":
+            raise NATSTimeoutError
+        if node == "node-gone":
+            raise NoRespondersError
+        if node == "node-bad":
+            return {"status": "error", "error": "unknown node type"}
+        return {"status": "ok"}
+
+    mock_nats_client.request.side_effect = reply
+    service = FlowService()
+    nodes = [f"node-{i}" for i in range(200)] + ["node-late", "node-gone", "node-bad"]
+    flow = await service.create_flow(FlowCreate(name="Fleet", target_nodes=nodes))
+
+    report = await service.deploy_flow(flow.id)
+
+    # One round-trip, not 203 sequential ones
+    assert report["duration_ms"] < 2000
+    assert report["deployed"] is True
+    assert (report["succeeded"], report["failed"], report["timed_out"]) == (200, 2, 1)
+    by_node = {result["node"]: result for result in report["nodes"]}
+    assert by_node["node-late"]["status"] == "timed_out"
+    assert by_node["node-gone"]["error"] == "no responders"
+    assert by_node["node-bad"]["error"] == "unknown node type"
+    assert by_node["node-0"]["latency_ms"] >= 50
+    assert service.get_deployment(flow.id) is report
+
+
+
+@pytest.mark.asyncio
+async def test_deploy_without_confirmation_is_not_deployed(mock_nats_client):
+    """A flow no node confirmed stays undeployed"""
+    from nats.errors import TimeoutError as NATSTimeoutError
+
+    from app.schemas.flow import FlowCreate
+    from app.services.flow_service import FlowService
+
+    mock_nats_client.request.side_effect = NATSTimeoutError
+    service = FlowService()
+    flow = await service.create_flow(FlowCreate(name="Lonely", target_nodes=["node-001"]))
+
+    report = await service.deploy_flow(flow.id)
+    assert report["deployed"] is False
+    assert report["deployed_at"] is None
+    assert report["timed_out"] == 1
+    assert (await service.get_flow(flow.id)).deployed is False
@@ -0,0 +1,125 @@
+"""
+Test batched telemetry ingest
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.ingest_service import IngestQueue, OverflowPolicy
+
+
+def make_msg(data, subject="device.test.telemetry"):
+    """Build a minimal stand-in for a NATS message"""
+    payload = data if isinstance(data, bytes) else json.dumps(data).encode()
+    return SimpleNamespace(subject=subject, data=payload)
+
+
+@pytest.mark.asyncio
+async def test_ingest_processes_in_batches():
+    """Messages are decoded and handed over in size-triggered batches"""
+    batches = []
+
+    async def handler(batch):
+        batches.append([data["n"] for data, _ in batch])
+
+    queue = IngestQueue("device.*.telemetry", handler, max_size=100, batch_size=4,
+                        batch_interval=1.0, policy=OverflowPolicy.drop_oldest)
+    queue.start()
+    for n in range(8):
+        await queue.put(make_msg({"n": n}))
+    await asyncio.sleep(0.05)
+    await queue.stop()
+
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert queue.stats()["processed"] == 8
+    assert queue.stats()["batches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_flushes_partial_batch_on_interval():
+    """A partial batch is processed once the batch interval elapses"""
+    batches = []
+
+    async def handler(batch):
+        batches.append(len(batch))
+
+    queue = IngestQueue("hal.v1.*.data", handler, max_size=100, batch_size=50,
+                        batch_interval=0.01, policy=OverflowPolicy.drop_oldest)
+    queue.start()
+    await queue.put(make_msg({"n": 1}))
+    await asyncio.sleep(0.05)
+    await queue.stop()
+
+    assert batches == [1]
+
+
+@pytest.mark.asyncio
+async def test_ingest_drop_policies():
+    """Full queues drop the oldest or newest message and count it"""
+    async def handler(batch):
+        pass
+
+    oldest = IngestQueue("a", handler, max_size=2, batch_size=10,
+                         batch_interval=0, policy=OverflowPolicy.drop_oldest)
+    newest = IngestQueue("b", handler, max_size=2, batch_size=10,
+                         batch_interval=0, policy=OverflowPolicy.drop_newest)
+    for n in range(3):
+        oldest.offer(make_msg({"n": n}))
+        newest.offer(make_msg({"n": n}))
+
+    assert [json.loads(m.data)["n"] for m in oldest._items] == [1, 2]
+    assert [json.loads(m.data)["n"] for m in newest._items] == [0, 1]
+    assert oldest.stats()["dropped"] == 1
+    assert newest.stats()["dropped"] == 1
+    assert oldest.stats()["depth"] == 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_counts_decode_errors():
+    """Invalid JSON is skipped and counted"""
+    seen = []
+
+    async def handler(batch):
+        seen.extend(data for data, _ in batch)
+
+    queue = IngestQueue("device.*.telemetry", handler, max_size=10, batch_size=2,
+                        batch_interval=0, policy=OverflowPolicy.block)
+    queue.start()
+    await queue.put(make_msg(b"not json"))
+    await queue.put(make_msg({"ok": True}))
+    await asyncio.sleep(0.05)
+    await queue.stop()
+
+    assert seen == [{"ok": True}]
+    assert queue.stats()["decode_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ingest_skips_non_object_messages():
+    """Valid JSON that is not an object is counted per message; the rest of the batch is handled"""
+    seen = []
+
+    async def handler(batch):
+        seen.extend(data.get("n") for data, _ in batch)
+
+    queue = IngestQueue("device.*.telemetry", handler, max_size=10, batch_size=6,
+                        batch_interval=0.05, policy=OverflowPolicy.block)
+    queue.start()
+    for data in ({"n": 1}, [], 1, "x", None, {"n": 2}):
+        await queue.put(make_msg(data))
+    await asyncio.sleep(0.1)
+    await queue.stop()
+
+    assert seen == [1, 2]
+    assert queue.stats()["decode_errors"] == 4
+    assert queue.stats()["handler_errors"] == 0
+
+
+def test_ingest_stats_endpoint(client):
+    """Ingest stats are exposed through the system API"""
+    response = client.get("/api/v1/system/ingest")
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
@@ -0,0 +1,142 @@
+"""
+Test heartbeat liveness tracking
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.timing_wheel import TimingWheel
+from app.schemas.device import DeviceCreate, DeviceStatus
+from app.services.device_service import DeviceService
+from app.services.liveness_service import LivenessService, LivenessTracker
+import app.services.device_service as device_service_module
+
+
+def test_timing_wheel_expires_on_time():
+    """Keys expire at their deadline, including past one rotation"""
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.schedule("a", 3.0)
+    wheel.schedule("b", 20.0)
+    wheel.schedule("c", 5.0)
+    assert wheel.cancel("c")
+
+    assert wheel.advance(2.0) == []
+    assert wheel.advance(3.0) == ["a"]
+    assert wheel.advance(19.5) == []
+    assert wheel.advance(20.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_timing_wheel_catches_up_after_pause():
+    """A long gap between advances still expires everything due"""
+    wheel = TimingWheel(tick=1.0, slots=4)
+    for i in range(10):
+        wheel.schedule(i, float(i + 1))
+    assert sorted(wheel.advance(100.0)) == list(range(10))
+
+
+def test_tracker_lazy_reinsert():
+    """Keys that keep beating are re-inserted instead of expired"""
+    tracker = LivenessTracker("devices", ttl=5.0, tick=0.5, clock=lambda: 0.0)
+    assert tracker.beat("dev-1", now=0.0) is True
+    assert tracker.beat("dev-1", now=1.0) is False
+
+    # The original deadline passes, but the later beat keeps it alive
+    assert tracker.expire(now=5.5) == []
+    assert tracker.is_alive("dev-1")
+    assert tracker.expire(now=6.5) == ["dev-1"]
+    assert not tracker.is_alive("dev-1")
+    assert tracker.beat("dev-1", now=7.0) is True
+
+
+def test_tracker_scales_without_scanning():
+    """10k keys at 1 Hz only touch the wheel once per timeout"""
+    tracker = LivenessTracker("devices", ttl=5.0, tick=0.5, clock=lambda: 0.0)
+    devices = [f"dev-{i}" for i in range(10000)]
+    for second in range(12):
+        for device_id in devices[:9000] if second >= 6 else devices:
+            tracker.beat(device_id, now=float(second))
+        tracker.expire(now=second + 0.9)
+
+    assert tracker.stats()["alive"] == 9000
+    assert tracker.went_offline == 1000
+
+
+@pytest.mark.asyncio
+async def test_transitions_update_device_status(monkeypatch, mock_nats_client):
+    """Going silent marks a device offline and a heartbeat brings it back"""
+    service = DeviceService()
+    monkeypatch.setattr(device_service_module, "device_service", service)
+    await service.create_device(DeviceCreate(id="dev-1", name="Dev 1", type="esp32"))
+
+    clock = [0.0]
+    liveness = LivenessService()
+    liveness.devices = LivenessTracker("devices", ttl=5.0, tick=0.5, clock=lambda: clock[0])
+
+    await liveness.device_beat("dev-1")
+    assert (await service.get_device("dev-1")).status == DeviceStatus.online
+
+    clock[0] = 10.0
+    await liveness.check()
+    assert (await service.get_device("dev-1")).status == DeviceStatus.offline
+
+    events = [call.args[1]["type"] for call in mock_nats_client.publish.call_args_list]
+    assert events.count("device.updated") == 2
+
+
+@pytest.mark.asyncio
+async def test_device_registered_after_beating_goes_online(monkeypatch, mock_nats_client):
+    """Beats from a device that is not registered yet bring it online once it is"""
+    service = DeviceService()
+    monkeypatch.setattr(device_service_module, "device_service", service)
+    liveness = LivenessService()
+
+    await liveness.device_beat("dev-1")
+    assert not liveness.devices.is_alive("dev-1")
+
+    await service.create_device(DeviceCreate(id="dev-1", name="Dev 1", type="esp32"))
+    await liveness.device_beat("dev-1")
+    assert (await service.get_device("dev-1")).status == DeviceStatus.online
+    assert liveness.devices.is_alive("dev-1")
+
+
+@pytest.mark.asyncio
+async def test_failed_transition_does_not_drop_the_others(monkeypatch, mock_nats_client):
+    """One failing offline update is retried later; the rest still go offline"""
+    service = DeviceService()
+    monkeypatch.setattr(device_service_module, "device_service", service)
+    for device_id in ("dev-1", "dev-2", "dev-3"):
+        await service.create_device(DeviceCreate(id=device_id, name=device_id, type="esp32"))
+
+    clock = [0.0]
+    liveness = LivenessService()
+    liveness.devices = LivenessTracker("devices", ttl=5.0, tick=0.5, clock=lambda: clock[0])
+    for device_id in ("dev-1", "dev-2", "dev-3"):
+        await liveness.device_beat(device_id)
+
+    set_online = service.set_online
+
+    async def flaky_set_online(device_id, online):
+        if device_id == "dev-1":
+            raise RuntimeError("NATS not connected")
+        return await set_online(device_id, online)
+
+    monkeypatch.setattr(service, "set_online", flaky_set_online)
+    clock[0] = 10.0
+    await liveness.check()
+
+    assert (await service.get_device("dev-2")).status == DeviceStatus.offline
+    assert (await service.get_device("dev-3")).status == DeviceStatus.offline
+    assert liveness.devices.is_alive("dev-1")
+
+    monkeypatch.setattr(service, "set_online", set_online)
+    clock[0] = 20.0
+    await liveness.check()
+    assert (await service.get_device("dev-1")).status == DeviceStatus.offline
+
+
+def test_liveness_stats_endpoint(client: TestClient):
+    """Tracker counters are exposed under /system/liveness"""
+    response = client.get("/api/v1/system/liveness")
+    assert response.status_code == 200
+    assert [t["name"] for t in response.json()] == ["devices", "nodes"]
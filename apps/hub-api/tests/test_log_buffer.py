@@ -0,0 +1,96 @@
+"""
+Test the log ring buffer behind /system/logs
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app.core.log_buffer import LogBuffer, log_buffer
+
+
+def fill(buffer, events):
+    for timestamp, level, module, event in events:
+        buffer.append(timestamp, level, module, event, {"n": event})
+
+
+def test_ring_keeps_newest_entries():
+    """Old entries are overwritten once the buffer is full"""
+    buffer = LogBuffer(capacity=4)
+    fill(buffer, [(float(i), "info", "app.main", f"event {i}") for i in range(10)])
+
+    assert len(buffer) == 4
+    assert [entry["message"] for entry in buffer.query()] == ["event 9", "event 8", "event 7", "event 6"]
+    assert buffer.query(limit=2)[1]["metadata"] == {"n": "event 8"}
+
+
+def test_filters_by_level_and_module():
+    """Level and module filters use the indexes; modules include submodules"""
+    buffer = LogBuffer(capacity=100)
+    fill(buffer, [
+        (1.0, "info", "app.services.device_service", "created"),
+        (2.0, "error", "app.services.flow_service", "deploy failed"),
+        (3.0, "error", "app.core.nats", "disconnected"),
+        (4.0, "info", "app.services.flow_service", "deployed"),
+        (5.0, "error", "app.services.device_service", "bad status"),
+    ])
+
+    assert [e["message"] for e in buffer.query(level="error")] == ["bad status", "disconnected", "deploy failed"]
+    assert [e["message"] for e in buffer.query(module="app.services")] == [
+        "bad status", "deployed", "deploy failed", "created",
+    ]
+    assert [e["message"] for e in buffer.query(level="error", module="app.services")] == [
+        "bad status", "deploy failed",
+    ]
+    assert buffer.query(level="critical") == []
+    assert buffer.query(module="app.api") == []
+
+
+def test_filters_by_time_range():
+    """start_time is inclusive, end_time exclusive"""
+    buffer = LogBuffer(capacity=100)
+    fill(buffer, [(float(i), "info", "app.main", f"event {i}") for i in range(10)])
+    epoch = datetime(1970, 1, 1)
+
+    entries = buffer.query(start_time=epoch + timedelta(seconds=3), end_time=epoch + timedelta(seconds=6))
+    assert [entry["message"] for entry in entries] == ["event 5", "event 4", "event 3"]
+
+    aware = datetime(1970, 1, 1, 1, tzinfo=timezone(timedelta(hours=1)))
+    assert [entry["message"] for entry in buffer.query(end_time=aware, limit=1)] == []
+
+
+def test_processor_stores_and_passes_event_through():
+    """The processor records the event and leaves it for the renderer"""
+    buffer = LogBuffer(capacity=10)
+    event_dict = {"event": "Device created", "level": "info", "logger": "app.services.device_service",
+                  "device_id": "bot-1", "error": ValueError("x")}
+
+    assert buffer(None, "info", event_dict) is event_dict
+    entry = buffer.query()[0]
+    assert entry["message"] == "Device created"
+    assert entry["module"] == "app.services.device_service"
+    assert entry["metadata"] == {"device_id": "bot-1", "error": "x"}
+
+
+def test_logs_endpoint(client: TestClient):
+    """The endpoint serves buffered entries with filters"""
+    log_buffer.append(datetime.now(timezone.utc).timestamp(), "critical", "tests.endpoint", "disk full", {"free": 0})
+
+    response = client.get("/api/v1/system/logs?level=critical&module=tests.endpoint")
+    assert response.status_code == 200
+    data = response.json()
+    assert data[0]["message"] == "disk full"
+    assert data[0]["metadata"] == {"free": 0}
+    assert all(log["level"] == "critical" for log in data)
+
+
+def test_logs_stream_over_websocket(client: TestClient):
+    """Subscribers to log.* topics receive new events as they are logged"""
+    with client.websocket_connect("/api/v1/ws/events") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "subscribe", "topic": "log.info.app.api.>"})
+
+        frames = [websocket.receive_json(), websocket.receive_json()]
+        logs = [frame for frame in frames if frame.get("type") == "log"]
+        assert logs and logs[0]["message"] == "Client subscribed to topic"
+        assert logs[0]["metadata"]["topic"] == "log.info.app.api.>"
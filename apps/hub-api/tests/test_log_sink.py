@@ -0,0 +1,84 @@
+"""
+Test the queued log sink and call-site rate limiting
+"""
+
+import io
+import json
+
+import pytest
+import structlog
+
+from app.core.log_sink import CallsiteRateLimiter, QueueLogSink
+import app.core.log_sink as log_sink_module
+
+
+def event(message, **values):
+    return {"event": message, "level": "info", "logger": "app.test", **values}
+
+
+def test_sink_drops_when_full_and_reports_drops():
+    """A full queue drops new events and the writer reports how many"""
+    stream = io.StringIO()
+    sink = QueueLogSink(max_size=2, batch_size=10, stream=stream)
+    for i in range(5):
+        with pytest.raises(structlog.DropEvent):
+            sink(None, "info", event(f"event {i}"))
+    assert sink.stats()["enqueued"] == 2
+    assert sink.dropped == 3
+
+    sink.start()
+    sink.stop()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["event"] for line in lines] == ["event 0", "event 1", "Log events dropped"]
+    assert lines[-1]["dropped"] == 3
+    assert sink.written == 2
+    assert sink.batches == 1
+
+
+def test_sink_writes_in_batches():
+    """Queued events are rendered and written in batches of batch_size"""
+    stream = io.StringIO()
+    sink = QueueLogSink(max_size=100, batch_size=4, stream=stream)
+    for i in range(10):
+        with pytest.raises(structlog.DropEvent):
+            sink(None, "info", event(f"event {i}", i=i))
+    sink.start()
+    sink.stop()
+
+    assert [json.loads(line)["i"] for line in stream.getvalue().splitlines()] == list(range(10))
+    assert sink.batches == 3
+    assert sink.depth == 0
+
+
+def test_rate_limiter_caps_each_call_site(monkeypatch):
+    """Each call site gets `rate` events per second; the next window reports the rest"""
+    now = [100.0]
+    monkeypatch.setattr(log_sink_module.time, "monotonic", lambda: now[0])
+    limiter = CallsiteRateLimiter(rate=2, levels=["debug"])
+
+    passed = 0
+    for _ in range(5):
+        try:
+            limiter(None, "debug", event("Device telemetry"))
+            passed += 1
+        except structlog.DropEvent:
+            pass
+    assert passed == 2
+    assert limiter.suppressed == 3
+
+    # Another call site and other levels are not affected
+    limiter(None, "debug", event("Device heartbeats"))
+    for _ in range(5):
+        limiter(None, "info", event("Device telemetry"))
+
+    now[0] += 1.0
+    assert limiter(None, "debug", event("Device telemetry"))["suppressed"] == 3
+
+
+def test_rate_limiter_disabled_by_default():
+    """A zero rate lets everything through"""
+    limiter = CallsiteRateLimiter(rate=0, levels=["debug"])
+    for _ in range(100):
+        limiter(None, "debug", event("Device telemetry"))
+    assert limiter.suppressed == 0
@@ -0,0 +1,61 @@
+"""
+Test the ASGI request logging middleware
+"""
+
+from fastapi.testclient import TestClient
+
+from app.core.log_buffer import log_buffer
+from app.middleware.logging import log_sample_rate, next_request_id
+
+
+def phases(response):
+    return {
+        part.split(";")[0].strip(): float(part.split("dur=")[1])
+        for part in response.headers["server-timing"].split(",")
+    }
+
+
+def test_request_ids_are_unique():
+    """Generated ids share a process prefix and never repeat"""
+    ids = {next_request_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert len({request_id.split("-")[0] for request_id in ids}) == 1
+
+
+def test_server_timing_phases(client: TestClient):
+    """Routed requests report routing, handler, serialization and middleware time"""
+    response = client.get("/api/v1/flows/")
+    assert response.status_code == 200
+    assert response.headers["x-request-id"]
+
+    timing = phases(response)
+    assert set(timing) == {"routing", "handler", "serialization", "middleware", "total"}
+    assert all(duration >= 0 for duration in timing.values())
+    assert abs(sum(timing[name] for name in ("routing", "handler", "serialization", "middleware")) - timing["total"]) < 0.01
+
+
+def test_unmatched_request_has_total_only(client: TestClient):
+    """Requests that reach no endpoint only report middleware and total time"""
+    response = client.get("/no/such/path")
+    assert response.status_code == 404
+    assert set(phases(response)) == {"middleware", "total"}
+
+
+def test_incoming_request_id_is_kept(client: TestClient):
+    """A caller's X-Request-ID is echoed back"""
+    response = client.get("/api/v1/flows/", headers={"X-Request-ID": "trace-123"})
+    assert response.headers["x-request-id"] == "trace-123"
+
+
+def test_health_checks_are_not_logged(client: TestClient):
+    """Sampled-out paths are served and measured but not logged"""
+    assert log_sample_rate("/api/v1/system/health") == 0.0
+    assert log_sample_rate("/api/v1/devices/") == 1.0
+
+    request_id = "health-probe-1"
+    assert client.get("/api/v1/system/health", headers={"X-Request-ID": request_id}).status_code == 200
+    client.get("/api/v1/flows/", headers={"X-Request-ID": "flows-1"})
+
+    logged = {entry["metadata"].get("request_id") for entry in log_buffer.query(module="app.middleware", limit=1000)}
+    assert "flows-1" in logged
+    assert request_id not in logged
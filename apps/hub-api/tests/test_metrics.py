@@ -0,0 +1,41 @@
+"""
+Test the Prometheus metrics endpoint
+"""
+
+from fastapi.testclient import TestClient
+
+from app.core.nats import subject_pattern
+
+
+def test_subject_pattern():
+    """Device and node ids collapse to a wildcard"""
+    assert subject_pattern("node.pi-1.flow.deploy") == "node.*.flow.deploy"
+    assert subject_pattern("device.bot-1.command") == "device.*.command"
+    assert subject_pattern("hub.events.devices") == "hub.events.devices"
+    assert subject_pattern("device.discovered") == "device.discovered"
+
+
+def test_metrics_endpoint(client: TestClient):
+    """Metrics are exposed in the Prometheus text format"""
+    client.get("/api/v1/devices/missing-device")
+
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    body = response.text
+    assert 'hub_http_request_duration_seconds_count{method="GET",route="/api/v1/devices/{device_id}"}' in body
+    assert 'hub_http_requests_total{method="GET",route="/api/v1/devices/{device_id}",status="404"}' in body
+    assert "hub_websocket_clients" in body
+    assert "hub_flows " in body
+    assert "process_resident_memory_bytes" in body
+
+
+def test_outbound_nats_traffic_is_labelled_by_pattern(client: TestClient, mock_nats_client):
+    """Outbound counters are exported per subject pattern"""
+    mock_nats_client.sent_messages["node.*.flow.deploy"] = 3
+    mock_nats_client.sent_bytes["node.*.flow.deploy"] = 1200
+
+    body = client.get("/api/v1/metrics").text
+    assert 'hub_nats_messages_total{direction="out",pattern="node.*.flow.deploy"} 3.0' in body
+    assert 'hub_nats_bytes_total{direction="out",pattern="node.*.flow.deploy"} 1200.0' in body
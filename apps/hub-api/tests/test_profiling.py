@@ -0,0 +1,120 @@
+"""
+Test the event-loop profiler and the profile endpoint
+"""
+
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiling import LoopProfiler, collapse, current_operation, sample_stacks
+
+
+@pytest.fixture
+def profiler():
+    profiler = LoopProfiler(threshold=0.02, history=10)
+    yield profiler
+    profiler.uninstall()
+
+
+@pytest.mark.asyncio
+async def test_slow_callback_is_named_by_operation(profiler):
+    """A task that blocks the loop is recorded under its current operation"""
+    async def handler():
+        current_operation.set("nats device.*.status")
+        await asyncio.sleep(0)
+        time.sleep(0.03)
+
+    async def fast():
+        await asyncio.sleep(0)
+
+    profiler.install()
+    await asyncio.gather(asyncio.create_task(handler()), asyncio.create_task(fast()))
+    profiler.uninstall()
+
+    stats = profiler.stats()
+    assert stats["slow_callbacks"] == 1
+    assert stats["operations"][0]["operation"] == "nats device.*.status"
+    assert stats["operations"][0]["max_ms"] >= 30
+    assert stats["recent"][0]["callback"].endswith("handler")
+
+
+@pytest.mark.asyncio
+async def test_slow_callback_without_operation_is_named_by_coroutine(profiler):
+    """Tasks that set no operation fall back to the coroutine name"""
+    async def blocking():
+        time.sleep(0.03)
+
+    profiler.install()
+    await asyncio.create_task(blocking())
+    profiler.uninstall()
+
+    operation = profiler.stats()["operations"][0]["operation"]
+    assert operation.startswith("task ") and operation.endswith("blocking")
+
+
+@pytest.mark.asyncio
+async def test_uninstall_restores_handle_run(profiler):
+    """Nothing is timed after uninstall"""
+    original = asyncio.Handle._run
+    profiler.install()
+    assert asyncio.Handle._run is not original
+    profiler.uninstall()
+    assert asyncio.Handle._run is original
+
+    await asyncio.create_task(asyncio.to_thread(time.sleep, 0.03))
+    time.sleep(0.03)
+    await asyncio.sleep(0)
+    assert profiler.slow_callbacks == 0
+
+
+@pytest.mark.asyncio
+async def test_profile_samples_the_loop_thread(profiler):
+    """The stack sampler sees what the loop is running"""
+    async def busy():
+        await asyncio.sleep(0.01)
+        deadline = time.monotonic() + 0.1
+        while time.monotonic() < deadline:
+            pass
+
+    task = asyncio.create_task(busy())
+    stacks = await profiler.profile(0.15, 0.002)
+    await task
+
+    assert profiler.profiles == 1
+    assert any("busy" in stack for stack in stacks)
+    lines = collapse(stacks).splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_one_profile_at_a_time(profiler):
+    """A second profile is refused while one runs"""
+    first = asyncio.create_task(profiler.profile(0.1, 0.01))
+    await asyncio.sleep(0.02)
+    assert profiler.profiling
+    with pytest.raises(RuntimeError):
+        await profiler.profile(0.1, 0.01)
+    await first
+    assert not profiler.profiling
+
+
+def test_sample_stacks_unknown_thread():
+    """Sampling a thread that does not exist returns nothing"""
+    assert not sample_stacks(-1, 0.05, 0.01)
+
+
+def test_profile_endpoint(client: TestClient, monkeypatch):
+    """The endpoint is off by default and returns collapsed stacks when enabled"""
+    assert client.get("/api/v1/system/profile?duration=0.05").status_code == 404
+
+    monkeypatch.setattr(settings, "LOOP_PROFILING_ENABLED", True)
+    response = client.get("/api/v1/system/profile?duration=0.05&interval=0.005")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text.strip()
+
+    stats = client.get("/api/v1/system/loop").json()
+    assert stats["profiles"] >= 1
+    assert "loop_lag_ms" in stats
@@ -0,0 +1,95 @@
+"""
+Test HAL schema validation
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.schema_registry import SchemaRegistry, default_schemas_dir
+
+
+def make_message(schema="tafylabs/hal/sensor/range-tof/1.0", **payload):
+    return {
+        "hal_major": 1,
+        "hal_minor": 0,
+        "schema": schema,
+        "device_id": "tof-1",
+        "caps": ["sensor.range-tof:v1.0"],
+        "ts": "2025-01-01T00:00:00Z",
+        "payload": {"sensor_id": "front", "range_meters": 1.5, "quality": 90, **payload},
+    }
+
+
+@pytest.fixture
+def registry():
+    registry = SchemaRegistry()
+    assert registry.load(str(default_schemas_dir())) >= 10
+    return registry
+
+
+def test_registry_dispatches_on_schema_id(registry):
+    """Short envelope ids and full $id URLs resolve to the same validator"""
+    assert registry.validate_message(make_message())
+    assert registry.validate_message(
+        make_message(schema="https://tafy.studio/schemas/hal/sensor/range-tof/1.0")
+    )
+    assert not registry.validate_message(make_message(range_meters=-1))
+
+    stats = {s["schema_id"]: s for s in registry.stats()["schemas"]}
+    tof = stats["https://tafy.studio/schemas/hal/sensor/range-tof/1.0"]
+    assert tof["checked"] == 3
+    assert tof["failures"] == 1
+    assert tof["last_error"]
+    assert tof["max_latency_us"] > 0
+
+
+def test_registry_does_not_fill_defaults(registry):
+    """Validation leaves the message untouched"""
+    message = make_message()
+    assert registry.validate_message(message)
+    assert "min_range_meters" not in message["payload"]
+
+
+def test_registry_validates_envelope(registry):
+    """Envelope fields are checked along with the payload"""
+    message = make_message()
+    message["device_id"] = ""
+    assert not registry.validate_message(message)
+
+    message = make_message()
+    message["extra"] = True
+    assert not registry.validate_message(message)
+
+
+def test_registry_unknown_schema_passes(registry):
+    """Messages for unregistered schemas are counted and let through"""
+    assert registry.validate_message(make_message(schema="tafylabs/hal/sensor/lidar/1.0"))
+    assert registry.validate_message({"payload": {}})
+    assert registry.stats()["unknown"] == 2
+
+
+def test_registry_sampling(registry):
+    """With sampling only one in N messages per schema is checked"""
+    bad = make_message(range_meters=-1)
+    results = [registry.validate_message(bad, sample_every=4) for _ in range(8)]
+
+    assert results.count(False) == 2
+    validator = registry.get("tafylabs/hal/sensor/range-tof/1.0")
+    assert validator.checked == 2
+    assert validator.skipped == 6
+
+
+def test_empty_registry_allows_everything():
+    """Without loaded schemas validation is a no-op"""
+    registry = SchemaRegistry()
+    assert registry.validate_message(make_message(range_meters=-1))
+    assert registry.stats() == {"loaded": 0, "unknown": 0, "schemas": []}
+
+
+def test_schema_stats_endpoint(client: TestClient):
+    """Validation counters are exposed under /system/schemas"""
+    response = client.get("/api/v1/system/schemas")
+    assert response.status_code == 200
+    data = response.json()
+    assert "loaded" in data
+    assert isinstance(data["schemas"], list)
@@ -0,0 +1,227 @@
+"""
+Test registry sharing and WebSocket fan-out between workers
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+
+from app.schemas.device import DeviceCreate, DeviceStatus, DeviceUpdate
+from app.schemas.flow import FlowCreate, FlowUpdate
+from app.services.device_service import DeviceService
+from app.services.flow_service import FlowService
+from app.services.nats_service import NATSService
+from app.services.shared_state import MemoryBackend, SharedState
+import app.services.device_service as device_service_module
+import app.services.flow_service as flow_service_module
+import app.services.nats_service as nats_service_module
+
+
+@pytest.fixture
+def backend():
+    return MemoryBackend()
+
+
+@pytest_asyncio.fixture
+async def workers(backend):
+    """Two workers sharing one backend"""
+    a, b = SharedState(backend), SharedState(backend)
+    await a.start()
+    await b.start()
+    yield a, b
+    await a.stop()
+    await b.stop()
+
+
+@pytest.mark.asyncio
+async def test_disabled_without_backend():
+    """A single worker shares nothing"""
+    state = SharedState()
+    await state.put("devices", "bot-1", {"id": "bot-1"})
+    assert not state.enabled
+    assert await state.get("devices", "bot-1") is None
+    assert await state.ping() is False
+    assert state.stats()["writes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_put_invalidates_other_workers_only(workers):
+    """Writes reach the other workers as invalidations, never the writer"""
+    a, b = workers
+    seen = {"a": [], "b": []}
+
+    async def on_a(keys):
+        seen["a"].extend(keys)
+
+    async def on_b(keys):
+        seen["b"].extend(keys)
+
+    a.on_invalidate("devices", on_a)
+    b.on_invalidate("devices", on_b)
+
+    await a.put("devices", "bot-1", {"id": "bot-1", "name": "Bot"})
+    assert seen == {"a": [], "b": ["bot-1"]}
+    assert await b.get("devices", "bot-1") == {"id": "bot-1", "name": "Bot"}
+
+    await a.delete("devices", "bot-1")
+    assert seen["b"] == ["bot-1", "bot-1"]
+    assert await b.get("devices", "bot-1") is None
+    assert b.stats()["invalidations_received"] == 2
+
+
+@pytest.mark.asyncio
+async def test_broadcast_is_forwarded_by_other_workers(workers):
+    """Each worker forwards broadcasts from the others to its own clients"""
+    a, b = workers
+    received = {"a": [], "b": []}
+    a.on_broadcast(lambda topic, payload: received["a"].append((topic, payload)))
+    b.on_broadcast(lambda topic, payload: received["b"].append((topic, payload)))
+
+    await a.broadcast("device.updated", '{"type":"device.updated"}')
+    assert received == {"a": [], "b": [("device.updated", '{"type":"device.updated"}')]}
+
+
+@pytest.mark.asyncio
+async def test_device_changes_reach_other_workers(workers, monkeypatch, mock_nats_client):
+    """An API change on one worker updates the registry and indexes of another"""
+    a, b = workers
+    monkeypatch.setattr(device_service_module, "shared_state", a)
+    worker_a, worker_b = DeviceService(), DeviceService()
+    b.on_invalidate("devices", worker_b._reload_shared)
+
+    await worker_a.create_device(DeviceCreate(id="bot-1", name="Bot", type="esp32"))
+    assert worker_b.has_device("bot-1")
+
+    await worker_a.update_device("bot-1", DeviceUpdate(status=DeviceStatus.online))
+    page = worker_b.query_devices(status=DeviceStatus.online)
+    assert [device["id"] for device in page["devices"]] == ["bot-1"]
+    assert worker_b.query_devices(status=DeviceStatus.discovered)["total"] == 0
+
+    await worker_a.claim_device("bot-1")
+    assert (await worker_b.get_device("bot-1")).claimed
+
+
+@pytest.mark.asyncio
+async def test_get_device_reads_through(backend, monkeypatch, mock_nats_client):
+    """A worker that missed the invalidation still finds the device"""
+    writer, reader = SharedState(backend), SharedState(backend)
+    await writer.start()
+    monkeypatch.setattr(device_service_module, "shared_state", writer)
+    await DeviceService().create_device(DeviceCreate(id="bot-1", name="Bot", type="esp32"))
+
+    monkeypatch.setattr(device_service_module, "shared_state", reader)
+    late = DeviceService()
+    device = await late.get_device("bot-1")
+    assert device is not None and device.name == "Bot"
+    assert late.has_device("bot-1")
+    assert await late.get_device("bot-2") is None
+
+
+@pytest.mark.asyncio
+async def test_flow_changes_reach_other_workers(workers, monkeypatch):
+    """Flow summaries changed on one worker are replaced on another"""
+    a, b = workers
+    monkeypatch.setattr(flow_service_module, "shared_state", a)
+    worker_a, worker_b = FlowService(), FlowService()
+    b.on_invalidate("flows", worker_b._reload_shared)
+
+    flow = await worker_a.create_flow(FlowCreate(name="Patrol", config={"nodes": []}))
+    await worker_a.update_flow(flow.id, FlowUpdate(name="Night patrol"))
+
+    summaries = await worker_b.list_flows()
+    assert [(summary.name, summary.version) for summary in summaries] == [("Night patrol", 1)]
+    assert (await worker_b.get_flow(flow.id)).config == {"nodes": []}
+
+
+@pytest.mark.asyncio
+async def test_one_leader_at_a_time(workers):
+    """The first worker holds the lease; another takes over when it stops"""
+    a, b = workers
+    assert a.is_leader and not b.is_leader
+    assert sorted(await a.workers()) == sorted([a.worker_id, b.worker_id])
+
+    changes = []
+
+    async def on_leadership(leader):
+        changes.append(leader)
+
+    b.on_leadership(on_leadership)
+    await b.renew()
+    assert changes == []
+
+    await a.stop()
+    await b.renew()
+    assert b.is_leader and changes == [True]
+    assert await b.workers() == [b.worker_id]
+    assert b.stats()["leader_changes"] == 1
+
+
+def test_single_worker_always_leads():
+    """Without a backend the only worker is the leader"""
+    assert SharedState().is_leader
+
+
+@pytest.mark.asyncio
+async def test_leader_shares_nats_driven_changes(workers, monkeypatch, mock_nats_client):
+    """Status transitions are shared; heartbeat last_seen values follow in batches"""
+    a, b = workers
+    monkeypatch.setattr(device_service_module, "shared_state", a)
+    leader, follower = DeviceService(), DeviceService()
+    b.on_invalidate("devices", follower._reload_shared)
+    b.on_update("devices", follower._apply_seen)
+
+    await leader.create_device(DeviceCreate(id="bot-1", name="Bot", type="esp32"), publish=False)
+    assert follower.has_device("bot-1")
+
+    await leader.set_online("bot-1", True)
+    assert follower.serialize("bot-1")["status"] == "online"
+
+    await leader.record_seen("bot-1")
+    seen = leader.serialize("bot-1")["last_seen"]
+    assert follower.serialize("bot-1")["last_seen"] != seen
+    await leader.send_seen()
+    assert follower.serialize("bot-1")["last_seen"] == seen
+    assert b.stats()["updates_received"] == 1
+
+    # Nothing new to send
+    await leader.send_seen()
+    assert a.stats()["updates_sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_only_the_leader_subscribes_to_device_state(monkeypatch):
+    """Telemetry goes through the queue group; device state only to the leader"""
+    subscribed = []
+    nc = MagicMock()
+
+    async def subscribe(subject, queue="", cb=None):
+        subscribed.append((subject, queue))
+        sub = MagicMock(subject=subject)
+        sub.unsubscribe = AsyncMock()
+        return sub
+
+    nc.subscribe = subscribe
+    monkeypatch.setattr(nats_service_module.nats_client, "nc", nc, raising=False)
+    liveness = MagicMock(stop=AsyncMock())
+    monkeypatch.setattr(nats_service_module, "liveness_service", liveness)
+    monkeypatch.setattr(nats_service_module, "discovery_coalescer", MagicMock(stop=AsyncMock()))
+    state = SharedState(MemoryBackend())
+    state._leader = False
+    monkeypatch.setattr(nats_service_module, "shared_state", state)
+
+    service = NATSService()
+    await service.setup_standard_subscriptions()
+    assert ("device.*.telemetry", "hub-api") in subscribed
+    assert ("hal.v1.*.data", "hub-api") in subscribed
+    assert not any(subject == "device.*.heartbeat" for subject, _ in subscribed)
+    liveness.start.assert_not_called()
+
+    await service.lead(True)
+    assert ("device.*.heartbeat", "") in subscribed and ("device.discovered", "") in subscribed
+    liveness.start.assert_called_once()
+
+    await service.lead(False)
+    assert len(service._subscriptions) == 3
+    liveness.stop.assert_awaited_once()
+    await service.close()
@@ -0,0 +1,93 @@
+"""
+Test background system sampling and cached health checks
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+
+from app.services.system_monitor import SystemMonitor
+import app.services.system_monitor as system_monitor_module
+
+
+@pytest.fixture
+def monitor(mock_nats_client, monkeypatch):
+    mock_nats_client.rtt = AsyncMock(return_value=0.001)
+    monkeypatch.setattr(system_monitor_module, "nats_client", mock_nats_client)
+    return SystemMonitor(interval=60.0, lag_interval=0.01, timeout=0.1)
+
+
+@pytest.mark.asyncio
+async def test_info_is_served_from_the_last_sample(monitor):
+    """Info only changes when the monitor samples again"""
+    first = await monitor.info()
+    second = await monitor.info()
+    assert first["sampled_at"] == second["sampled_at"]
+    assert monitor.samples == 1
+    assert monitor.health_checks == 1
+    assert first["process_rss_mb"] > 0
+    assert first["threads"] >= 1
+
+    monitor.sample()
+    assert (await monitor.info())["sampled_at"] >= first["sampled_at"]
+    assert monitor.samples == 2
+
+
+@pytest.mark.asyncio
+async def test_health_checks_configured_dependencies(monitor):
+    """Unconfigured database and Redis are left out; passing checks report latency"""
+    health = await monitor.health()
+    assert health["status"] == "healthy"
+    assert health["checks"] == {"api": True, "nats": True}
+    assert health["latency_ms"]["nats"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_failing_or_slow_check_degrades_health(monitor, mock_nats_client):
+    """A check that raises or outlives the timeout fails without blocking the others"""
+    mock_nats_client.rtt.side_effect = RuntimeError("NATS not connected")
+    await monitor.check_health()
+    health = await monitor.health()
+    assert health["status"] == "degraded"
+    assert health["checks"]["nats"] is False
+    assert "nats" not in health["latency_ms"]
+
+    async def slow(timeout):
+        await asyncio.sleep(1)
+
+    mock_nats_client.rtt.side_effect = slow
+    start = time.perf_counter()
+    await monitor.check_health()
+    assert time.perf_counter() - start < 0.5
+    assert (await monitor.health())["checks"]["nats"] is False
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_is_measured(monitor):
+    """Blocking the event loop shows up as lag in the next sample"""
+    monitor.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.05)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    monitor.sample()
+    info = await monitor.info()
+    assert info["loop_lag_max_ms"] >= 40
+    monitor.sample()
+    assert (await monitor.info())["loop_lag_max_ms"] < 40
+
+
+def test_system_endpoints_are_cached(client: TestClient):
+    """Repeated polls return the same sample"""
+    first = client.get("/api/v1/system/info").json()
+    second = client.get("/api/v1/system/info").json()
+    assert first["sampled_at"] == second["sampled_at"]
+    assert "loop_lag_ms" in first
+
+    first = client.get("/api/v1/system/health").json()
+    second = client.get("/api/v1/system/health").json()
+    assert first["timestamp"] == second["timestamp"]
+    assert first["checks"]["api"] is True
@@ -0,0 +1,151 @@
+"""
+Test telemetry storage and queries
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.telemetry_service import TelemetrySeries, TelemetryStore, merge_series, telemetry_store
+
+
+def make_series(window=60.0, capacity=1000):
+    return TelemetrySeries(window=window, capacity=capacity,
+                           rollup_capacity={"1s": 100, "10s": 100, "1m": 100})
+
+
+def test_series_range_query():
+    """Raw queries return columns for the requested time range"""
+    series = make_series()
+    for i in range(100):
+        series.append(1000.0 + i * 0.1, float(i))
+
+    result = series.query(start=1001.0, end=1002.0)
+    assert result["timestamps"][0] == pytest.approx(1001.0)
+    assert result["values"] == [float(i) for i in range(10, 21)]
+
+    latest = series.query(limit=3)
+    assert latest["values"] == [97.0, 98.0, 99.0]
+
+
+def test_series_ring_buffer_is_bounded():
+    """Old samples are evicted by capacity and by the raw window"""
+    series = make_series(window=5.0, capacity=200)
+    for i in range(1000):
+        series.append(float(i), float(i))
+
+    result = series.query()
+    assert result["timestamps"] == [994.0, 995.0, 996.0, 997.0, 998.0, 999.0]
+    assert series.allocated <= 200
+
+    by_capacity = make_series(window=1e9, capacity=100)
+    for i in range(250):
+        by_capacity.append(float(i), float(i))
+    values = by_capacity.query()["values"]
+    assert len(values) == 100
+    assert values[0] == 150.0 and values[-1] == 249.0
+
+
+def test_series_rejects_out_of_order_samples():
+    """Samples older than the newest one are rejected"""
+    series = make_series()
+    assert series.append(10.0, 1.0)
+    assert not series.append(9.0, 2.0)
+    assert series.query()["values"] == [1.0]
+
+
+def test_series_rollups():
+    """Rollups keep min/max/mean/last per bucket"""
+    series = make_series()
+    for i in range(20):
+        series.append(100.0 + i * 0.5, float(i))
+
+    seconds = series.query(resolution="1s")
+    assert seconds["timestamps"][:2] == [100.0, 101.0]
+    assert seconds["min"][0] == 0.0
+    assert seconds["max"][0] == 1.0
+    assert seconds["mean"][0] == pytest.approx(0.5)
+    assert seconds["last"][0] == 1.0
+    assert seconds["count"][0] == 2
+
+    ten = series.query(resolution="10s", start=105.0)
+    assert ten["timestamps"] == [100.0]
+    assert ten["count"] == [20]
+
+
+def test_merge_series_from_several_workers():
+    """Raw samples interleave by time; rollup buckets with the same start combine"""
+    a, b = TelemetryStore(), TelemetryStore()
+    for ts in range(0, 10, 2):
+        a.record("bot-1", "imu", ts, {"x": ts})
+        b.record("bot-1", "imu", ts + 1, {"x": ts + 1})
+    b.record("bot-1", "imu", 20, {"y": 1})
+
+    raw = merge_series([a.query("bot-1"), b.query("bot-1")], limit=4)
+    assert [(series["field"], series["timestamps"]) for series in raw] == [("x", [6, 7, 8, 9]), ("y", [20])]
+    assert raw[0]["values"] == [6, 7, 8, 9]
+
+    rollups = merge_series([a.query("bot-1", resolution="10s"), b.query("bot-1", resolution="10s")], "10s")
+    x = rollups[0]
+    assert x["timestamps"] == [0.0]
+    assert (x["min"], x["max"], x["count"], x["mean"]) == ([0.0], [9.0], [10], [4.5])
+
+
+def test_store_flattens_payloads():
+    """Nested numeric payload fields become dotted series"""
+    store = TelemetryStore()
+    stored = store.record("imu-1", "imu", "2025-01-01T00:00:00Z", {
+        "acceleration": {"x": 1.0, "y": 2, "z": 3.5},
+        "label": "ignored",
+        "moving": True,
+    })
+    assert stored == 3
+
+    result = store.query("imu-1", field="acceleration.y")
+    assert len(result) == 1
+    assert result[0]["schema"] == "imu"
+    assert result[0]["values"] == [2.0]
+    assert store.stats()["series"] == 3
+
+
+@pytest.mark.asyncio
+async def test_bare_telemetry_drops_envelope_fields(monkeypatch):
+    """Envelope keys such as ts and seq are not stored next to the metrics"""
+    import app.services.nats_service as nats_service_module
+
+    store = TelemetryStore()
+    monkeypatch.setattr(nats_service_module, "telemetry_store", store)
+    msg = SimpleNamespace(subject="device.bot-1.telemetry", data=b"")
+    await nats_service_module.nats_service._handle_device_telemetry(
+        [({"ts": 1700000000.0, "seq": 7, "battery": 87.5, "rssi": -60}, msg)]
+    )
+
+    assert sorted(series["field"] for series in store.query("bot-1")) == ["battery", "rssi"]
+
+
+def test_telemetry_endpoint(client: TestClient):
+    """Telemetry is served from the store"""
+    telemetry_store.record("telemetry-device", "test/hal/sensor/range-tof/1.0", 1000.0,
+                           {"distance_mm": 120})
+    telemetry_store.record("telemetry-device", "test/hal/sensor/range-tof/1.0", 1001.0,
+                           {"distance_mm": 130})
+
+    response = client.get("/api/v1/devices/telemetry-device/telemetry")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["resolution"] == "raw"
+    assert data["series"][0]["schema"] == "test/hal/sensor/range-tof/1.0"
+    assert data["series"][0]["values"] == [120.0, 130.0]
+
+    response = client.get("/api/v1/devices/telemetry-device/telemetry?resolution=1m")
+    assert response.status_code == 200
+    assert response.json()["series"][0]["max"] == [130.0]
+
+    telemetry_store.remove_device("telemetry-device")
+
+
+def test_telemetry_unknown_device(client: TestClient):
+    """Unknown devices return 404"""
+    response = client.get("/api/v1/devices/nonexistent/telemetry")
+    assert response.status_code == 404
@@ -0,0 +1,189 @@
+"""
+Test WebSocket topic subscriptions and fan-out
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.websocket_service import ClientConnection, ConnectionManager, subject_matches
+
+
+class SlowWebSocket:
+    """WebSocket stand-in that records frames and can be paused"""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.sent.append(text)
+
+
+@pytest.mark.parametrize("pattern,subject,expected", [
+    ("device.abc.telemetry", "device.abc.telemetry", True),
+    ("device.*.telemetry", "device.abc.telemetry", True),
+    ("device.*.telemetry", "device.abc.status", False),
+    ("device.*", "device.abc.telemetry", False),
+    ("device.>", "device.abc.telemetry", True),
+    ("device.>", "device", False),
+    (">", "hal.v1.motor.data", True),
+])
+def test_subject_matches(pattern, subject, expected):
+    """NATS-style wildcards match tokens"""
+    assert subject_matches(pattern, subject) is expected
+
+
+@pytest.mark.asyncio
+async def test_broadcast_only_reaches_subscribers():
+    """Events are delivered to matching subscriptions only"""
+    manager = ConnectionManager()
+    ws_a, ws_b = SlowWebSocket(), SlowWebSocket()
+    client_a = await manager.connect(ws_a)
+    client_b = await manager.connect(ws_b)
+    manager.subscribe(client_a, "device.robot-1.>")
+    manager.subscribe(client_b, "device.robot-2.>")
+
+    assert manager.broadcast("device.robot-1.status", {"status": "online"}) == 1
+    await asyncio.sleep(0.01)
+
+    assert ws_a.sent == ['{"status":"online"}']
+    assert ws_b.sent == []
+    await manager.disconnect(ws_a)
+    await manager.disconnect(ws_b)
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_stops_delivery():
+    """Unsubscribing drops the cached route, including for default subscriptions"""
+    manager = ConnectionManager()
+    ws = SlowWebSocket()
+    client = await manager.connect(ws)
+    manager.subscribe(client, "device.*.status")
+
+    assert manager.broadcast("device.robot-1.status", {"status": "online"}) == 1
+    manager.unsubscribe(client, "device.*.status")
+    assert manager.broadcast("device.robot-1.status", {"status": "offline"}) == 0
+    await asyncio.sleep(0.01)
+
+    assert ws.sent == ['{"status":"online"}']
+    await manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_coalesces_and_drops_oldest():
+    """A stalled client keeps the latest value per coalesced topic and a bounded queue"""
+    ws = SlowWebSocket()
+    ws.gate.clear()
+    client = ClientConnection(ws, max_queue=3)
+    client.start()
+
+    client.enqueue("first", "warmup")
+    await asyncio.sleep(0.01)  # writer is now blocked on the first frame
+
+    for n in range(5):
+        client.enqueue(f"t{n}", "device.a.telemetry", coalesce=True)
+    for n in range(4):
+        client.enqueue(f"e{n}", "device.a.status")
+
+    assert client.coalesced == 4
+    assert client.dropped == 2
+    assert client.queue_depth == 3
+
+    ws.gate.set()
+    await asyncio.sleep(0.01)
+    assert ws.sent == ["first", "e1", "e2", "e3"]
+    await client.stop()
+
+
+def test_websocket_subscribe(client: TestClient):
+    """Clients can subscribe and unsubscribe over the socket"""
+    with client.websocket_connect("/api/v1/ws/events") as websocket:
+        assert websocket.receive_json()["type"] == "connection"
+
+        websocket.send_json({"type": "subscribe", "topic": "device.*.status"})
+        assert websocket.receive_json() == {"type": "subscribed", "topic": "device.*.status"}
+
+        websocket.send_json({"type": "ping"})
+        assert websocket.receive_json() == {"type": "pong"}
+
+        websocket.send_json({"type": "unsubscribe", "topic": "device.*.status"})
+        assert websocket.receive_json() == {"type": "unsubscribed", "topic": "device.*.status"}
+
+
+class FakeSubscription:
+    def __init__(self, subject, cb):
+        self.subject = subject
+        self.cb = cb
+        self.unsubscribed = False
+
+    async def unsubscribe(self):
+        self.unsubscribed = True
+
+
+@pytest.mark.asyncio
+async def test_nats_bridge_shares_subscriptions(monkeypatch):
+    """One NATS subscription per pattern, reference-counted across clients"""
+    import app.services.nats_bridge as bridge_module
+
+    subscriptions = []
+
+    async def subscribe(subject, cb):
+        sub = FakeSubscription(subject, cb)
+        subscriptions.append(sub)
+        return sub
+
+    monkeypatch.setattr(bridge_module.nats_client, "subscribe", subscribe)
+    bridge = bridge_module.NATSWebSocketBridge()
+
+    ws_a, ws_b = SlowWebSocket(), SlowWebSocket()
+    client_a = ClientConnection(ws_a, max_queue=10)
+    client_b = ClientConnection(ws_b, max_queue=10)
+    client_a.start()
+    client_b.start()
+
+    await bridge.add(client_a, "device.*.status")
+    await bridge.add(client_b, "device.*.status")
+    assert len(subscriptions) == 1
+    assert bridge.subscription_count == 1
+
+    msg = type("Msg", (), {"subject": "device.r1.status", "data": b'{"status":"online"}'})
+    await subscriptions[0].cb(msg)
+    await asyncio.sleep(0.01)
+    expected = ('{"type":"nats","pattern":"device.*.status","subject":"device.r1.status",'
+                '"data":{"status":"online"}}')
+    assert ws_a.sent == [expected]
+    assert ws_b.sent == [expected]
+
+    # Objects and arrays are spliced in without being parsed
+    parsed = []
+    loads = bridge_module.codec.loads
+    monkeypatch.setattr(bridge_module.codec, "loads", lambda data: parsed.append(data) or loads(data))
+    msg = type("Msg", (), {"subject": "device.r1.status", "data": b' [1, 2]'})
+    await subscriptions[0].cb(msg)
+    await asyncio.sleep(0.01)
+    assert ws_a.sent[-1].endswith('"data": [1, 2]}')
+    assert parsed == []
+
+    # Payloads that are not JSON still produce a valid frame
+    msg = type("Msg", (), {"subject": "device.r1.status", "data": b'online "now"'})
+    await subscriptions[0].cb(msg)
+    await asyncio.sleep(0.01)
+    assert json.loads(ws_a.sent[-1])["data"] == 'online "now"'
+    assert bridge.wrapped == 1
+
+    await bridge.remove(client_a, "device.*.status")
+    assert not subscriptions[0].unsubscribed
+    await bridge.remove_client(client_b)
+    assert subscriptions[0].unsubscribed
+    assert bridge.subscription_count == 0
+
+    with pytest.raises(bridge_module.SubjectNotAllowedError):
+        await bridge.add(client_a, ">")
+
+    await client_a.stop()
+    await client_b.stop()
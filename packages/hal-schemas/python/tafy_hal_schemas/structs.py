@@ -0,0 +1,377 @@
+# Generated from JSON Schema - DO NOT EDIT
+"""msgspec Struct equivalents of the HAL schemas for hot decode paths."""
+
+from datetime import datetime
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Type, Union
+
+import msgspec
+from msgspec import UNSET, Meta, Raw, Struct, UnsetType
+
+
+class ControlExposure(Struct, kw_only=True, omit_defaults=True):
+    mode: Union[Literal['auto', 'manual'], UnsetType] = UNSET
+    value: Union[float, UnsetType] = UNSET
+
+
+class ControlGain(Struct, kw_only=True, omit_defaults=True):
+    mode: Union[Literal['auto', 'manual'], UnsetType] = UNSET
+    value: Union[float, UnsetType] = UNSET
+
+
+class ControlWhiteBalance(Struct, kw_only=True, omit_defaults=True):
+    mode: Union[Literal['auto', 'manual', 'daylight', 'cloudy', 'tungsten', 'fluorescent'], UnsetType] = UNSET
+    temperature: Union[Annotated[int, Meta(ge=2000, le=8000)], UnsetType] = UNSET
+
+
+class Control(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Control commands for camera devices"""
+
+    command: Literal['start', 'stop', 'snapshot', 'configure']
+    resolution: Union[Annotated[str, Meta(pattern='^[0-9]+x[0-9]+$')], UnsetType] = UNSET
+    fps: Union[Annotated[int, Meta(ge=1, le=240)], UnsetType] = UNSET
+    format: Union[Literal['MJPEG', 'H264', 'YUYV', 'RGB', 'BGR'], UnsetType] = UNSET
+    exposure: Union[ControlExposure, UnsetType] = UNSET
+    gain: Union[ControlGain, UnsetType] = UNSET
+    white_balance: Union[ControlWhiteBalance, UnsetType] = UNSET
+
+
+class Frame(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Metadata about a camera frame for streaming"""
+
+    camera_id: str
+    resolution: Annotated[str, Meta(pattern='^[0-9]+x[0-9]+$')]
+    format: Literal['MJPEG', 'H264', 'YUYV', 'RGB', 'BGR']
+    fps: Union[Annotated[int, Meta(ge=1, le=240)], UnsetType] = UNSET
+    timestamp: int
+    frame_count: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    size: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    url: Union[str, UnsetType] = UNSET
+    exposure: Union[float, UnsetType] = UNSET
+    gain: Union[float, UnsetType] = UNSET
+
+
+class StatusCapabilities(Struct, kw_only=True, omit_defaults=True):
+    resolutions: Union[List[Annotated[str, Meta(pattern='^[0-9]+x[0-9]+$')]], UnsetType] = UNSET
+    formats: Union[List[str], UnsetType] = UNSET
+    max_fps: Union[int, UnsetType] = UNSET
+
+
+class Status(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Status information for a camera device"""
+
+    camera_id: str
+    status: Literal['ready', 'streaming', 'error', 'disconnected']
+    resolution: Union[Annotated[str, Meta(pattern='^[0-9]+x[0-9]+$')], UnsetType] = UNSET
+    fps: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    frame_count: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    error_count: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    last_error: Union[str, UnsetType] = UNSET
+    stream_url: Union[str, UnsetType] = UNSET
+    capabilities: Union[StatusCapabilities, UnsetType] = UNSET
+
+
+class Envelope(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Standard envelope for all HAL messages"""
+
+    hal_major: Annotated[int, Meta(ge=1)]
+    hal_minor: Annotated[int, Meta(ge=0)]
+    schema: Annotated[str, Meta(pattern='^[a-z0-9-]+/hal/[a-z0-9-]+/[a-z0-9-]+/[0-9]+\\.[0-9]+$')]
+    device_id: Annotated[str, Meta(min_length=1, max_length=64, pattern='^[a-zA-Z0-9-_]+$')]
+    caps: List[Annotated[str, Meta(pattern='^[a-z0-9-]+\\.[a-z0-9-]+:v[0-9]+\\.[0-9]+$')]]
+    ts: datetime
+    payload: Raw
+    seq: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    correlation_id: Union[str, UnsetType] = UNSET
+
+
+class DifferentialTelemetryOdometry(Struct, kw_only=True, omit_defaults=True):
+    x_meters: float
+    y_meters: float
+    theta_rad: float
+    distance_meters: Union[float, UnsetType] = UNSET
+
+
+class DifferentialTelemetryWheelVelocities(Struct, kw_only=True, omit_defaults=True):
+    left_meters_per_sec: Union[float, UnsetType] = UNSET
+    right_meters_per_sec: Union[float, UnsetType] = UNSET
+
+
+class DifferentialTelemetry(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Telemetry data from differential drive motors"""
+
+    actual_linear_meters_per_sec: float
+    actual_angular_rad_per_sec: float
+    commanded_linear_meters_per_sec: Union[float, UnsetType] = UNSET
+    commanded_angular_rad_per_sec: Union[float, UnsetType] = UNSET
+    odometry: DifferentialTelemetryOdometry
+    wheel_velocities: Union[DifferentialTelemetryWheelVelocities, UnsetType] = UNSET
+    current_draw_amps: Union[Annotated[float, Meta(ge=0)], UnsetType] = UNSET
+    temperature_celsius: Union[float, UnsetType] = UNSET
+    error_code: Union[str, UnsetType] = UNSET
+    status: Union[Literal['idle', 'moving', 'stalled', 'error', 'emergency_stop'], UnsetType] = UNSET
+
+
+class Differential(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Command schema for differential drive motors"""
+
+    linear_meters_per_sec: Annotated[float, Meta(ge=-10, le=10)]
+    angular_rad_per_sec: Annotated[float, Meta(ge=-6.28, le=6.28)]
+    duration_ms: Union[Annotated[int, Meta(ge=0, le=60000)], UnsetType] = UNSET
+    acceleration_meters_per_sec2: Union[Annotated[float, Meta(ge=0, le=10)], UnsetType] = UNSET
+    angular_acceleration_rad_per_sec2: Union[Annotated[float, Meta(ge=0, le=10)], UnsetType] = UNSET
+    priority: Literal['low', 'normal', 'high', 'emergency'] = 'normal'
+
+
+class ImuAcceleration(Struct, kw_only=True, omit_defaults=True):
+    x_meters_per_sec2: float
+    y_meters_per_sec2: float
+    z_meters_per_sec2: float
+
+
+class ImuAngularVelocity(Struct, kw_only=True, omit_defaults=True):
+    x_rad_per_sec: float
+    y_rad_per_sec: float
+    z_rad_per_sec: float
+
+
+class ImuMagneticField(Struct, kw_only=True, omit_defaults=True):
+    x_gauss: Union[float, UnsetType] = UNSET
+    y_gauss: Union[float, UnsetType] = UNSET
+    z_gauss: Union[float, UnsetType] = UNSET
+
+
+class ImuOrientationQuaternion(Struct, kw_only=True, omit_defaults=True):
+    w: float
+    x: float
+    y: float
+    z: float
+
+
+class ImuOrientationEuler(Struct, kw_only=True, omit_defaults=True):
+    roll_rad: Union[float, UnsetType] = UNSET
+    pitch_rad: Union[float, UnsetType] = UNSET
+    yaw_rad: Union[float, UnsetType] = UNSET
+
+
+class ImuOrientation(Struct, kw_only=True, omit_defaults=True):
+    quaternion: Union[ImuOrientationQuaternion, UnsetType] = UNSET
+    euler: Union[ImuOrientationEuler, UnsetType] = UNSET
+
+
+class ImuCalibrationStatus(Struct, kw_only=True, omit_defaults=True):
+    system: Union[Annotated[int, Meta(ge=0, le=3)], UnsetType] = UNSET
+    accelerometer: Union[Annotated[int, Meta(ge=0, le=3)], UnsetType] = UNSET
+    gyroscope: Union[Annotated[int, Meta(ge=0, le=3)], UnsetType] = UNSET
+    magnetometer: Union[Annotated[int, Meta(ge=0, le=3)], UnsetType] = UNSET
+
+
+class Imu(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Data from IMU sensors (accelerometer, gyroscope, magnetometer)"""
+
+    acceleration: ImuAcceleration
+    angular_velocity: ImuAngularVelocity
+    magnetic_field: Union[ImuMagneticField, UnsetType] = UNSET
+    orientation: Union[ImuOrientation, UnsetType] = UNSET
+    temperature_celsius: Union[float, UnsetType] = UNSET
+    calibration_status: Union[ImuCalibrationStatus, UnsetType] = UNSET
+
+
+class RangeTof(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Data from Time of Flight (ToF) range sensors"""
+
+    sensor_id: str
+    range_meters: Annotated[float, Meta(ge=0, le=10)]
+    quality: Annotated[float, Meta(ge=0, le=100)]
+    min_range_meters: float = 0.02
+    max_range_meters: float = 4.0
+    field_of_view_deg: Union[Annotated[float, Meta(ge=0, le=180)], UnsetType] = UNSET
+    ambient_light_level: Union[Annotated[float, Meta(ge=0)], UnsetType] = UNSET
+    temperature_celsius: Union[float, UnsetType] = UNSET
+    status: Union[Literal['ok', 'out_of_range', 'low_signal', 'high_ambient_light', 'error'], UnsetType] = UNSET
+    raw_value: Union[int, UnsetType] = UNSET
+
+
+class DiscoveryNetwork(Struct, kw_only=True, omit_defaults=True):
+    ip_address: Union[str, UnsetType] = UNSET
+    mac_address: Union[Annotated[str, Meta(pattern='^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$')], UnsetType] = UNSET
+    hostname: Union[str, UnsetType] = UNSET
+    port: Union[Annotated[int, Meta(ge=1, le=65535)], UnsetType] = UNSET
+
+
+class DiscoveryMetadata(Struct, kw_only=True, omit_defaults=True):
+    manufacturer: Union[str, UnsetType] = UNSET
+    model: Union[str, UnsetType] = UNSET
+    serial_number: Union[str, UnsetType] = UNSET
+    hardware_revision: Union[str, UnsetType] = UNSET
+    location: Union[str, UnsetType] = UNSET
+    description: Union[str, UnsetType] = UNSET
+
+
+class DiscoveryResources(Struct, kw_only=True, omit_defaults=True):
+    cpu_cores: Union[Annotated[int, Meta(ge=1)], UnsetType] = UNSET
+    ram_mb: Union[Annotated[int, Meta(ge=1)], UnsetType] = UNSET
+    storage_mb: Union[Annotated[int, Meta(ge=1)], UnsetType] = UNSET
+    cpu_freq_mhz: Union[Annotated[int, Meta(ge=1)], UnsetType] = UNSET
+
+
+class Discovery(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Message broadcast by devices for discovery"""
+
+    device_type: Literal['esp32', 'esp8266', 'rpi', 'jetson', 'x86', 'other']
+    hardware_id: str
+    firmware_version: Annotated[str, Meta(pattern='^[0-9]+\\.[0-9]+\\.[0-9]+(-[a-zA-Z0-9]+)?$')]
+    capabilities: List[Annotated[str, Meta(pattern='^[a-z0-9-]+\\.[a-z0-9-]+:v[0-9]+\\.[0-9]+$')]]
+    network: Union[DiscoveryNetwork, UnsetType] = UNSET
+    metadata: Union[DiscoveryMetadata, UnsetType] = UNSET
+    resources: Union[DiscoveryResources, UnsetType] = UNSET
+
+
+class HeartbeatHealth(Struct, kw_only=True, omit_defaults=True):
+    cpu_percent: Annotated[float, Meta(ge=0, le=100)]
+    memory_percent: Annotated[float, Meta(ge=0, le=100)]
+    temperature_celsius: float
+    battery_percent: Union[Annotated[float, Meta(ge=0, le=100)], UnsetType] = UNSET
+    voltage_volts: Union[Annotated[float, Meta(ge=0)], UnsetType] = UNSET
+    storage_percent: Union[Annotated[float, Meta(ge=0, le=100)], UnsetType] = UNSET
+
+
+class HeartbeatMetrics(Struct, kw_only=True, omit_defaults=True):
+    messages_sent: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    messages_received: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    commands_executed: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    commands_failed: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+
+
+class Heartbeat(Struct, kw_only=True, omit_defaults=True, forbid_unknown_fields=True):
+    """Periodic heartbeat message from devices"""
+
+    uptime_seconds: Annotated[int, Meta(ge=0)]
+    status: Literal['idle', 'active', 'error', 'maintenance', 'emergency_stop']
+    health: HeartbeatHealth
+    active_capabilities: Union[List[Annotated[str, Meta(pattern='^[a-z0-9-]+\\.[a-z0-9-]+:v[0-9]+\\.[0-9]+$')]], UnsetType] = UNSET
+    error_count: Union[Annotated[int, Meta(ge=0)], UnsetType] = UNSET
+    warnings: Union[List[str], UnsetType] = UNSET
+    metrics: Union[HeartbeatMetrics, UnsetType] = UNSET
+
+
+_decode_control_decoder = msgspec.json.Decoder(Control)
+
+
+def decode_control(data: bytes) -> Control:
+    """Decode and validate a Camera Control Commands message."""
+    return _decode_control_decoder.decode(data)
+
+
+_decode_frame_decoder = msgspec.json.Decoder(Frame)
+
+
+def decode_frame(data: bytes) -> Frame:
+    """Decode and validate a Camera Frame Metadata message."""
+    return _decode_frame_decoder.decode(data)
+
+
+_decode_status_decoder = msgspec.json.Decoder(Status)
+
+
+def decode_status(data: bytes) -> Status:
+    """Decode and validate a Camera Status message."""
+    return _decode_status_decoder.decode(data)
+
+
+_decode_envelope_decoder = msgspec.json.Decoder(Envelope)
+
+
+def decode_envelope(data: bytes) -> Envelope:
+    """Decode and validate a HAL Message Envelope message."""
+    return _decode_envelope_decoder.decode(data)
+
+
+_decode_differential_telemetry_decoder = msgspec.json.Decoder(DifferentialTelemetry)
+
+
+def decode_differential_telemetry(data: bytes) -> DifferentialTelemetry:
+    """Decode and validate a Differential Drive Motor Telemetry message."""
+    return _decode_differential_telemetry_decoder.decode(data)
+
+
+_decode_differential_decoder = msgspec.json.Decoder(Differential)
+
+
+def decode_differential(data: bytes) -> Differential:
+    """Decode and validate a Differential Drive Motor Command message."""
+    return _decode_differential_decoder.decode(data)
+
+
+_decode_imu_decoder = msgspec.json.Decoder(Imu)
+
+
+def decode_imu(data: bytes) -> Imu:
+    """Decode and validate a Inertial Measurement Unit Data message."""
+    return _decode_imu_decoder.decode(data)
+
+
+_decode_range_tof_decoder = msgspec.json.Decoder(RangeTof)
+
+
+def decode_range_tof(data: bytes) -> RangeTof:
+    """Decode and validate a Time of Flight Range Sensor Data message."""
+    return _decode_range_tof_decoder.decode(data)
+
+
+_decode_discovery_decoder = msgspec.json.Decoder(Discovery)
+
+
+def decode_discovery(data: bytes) -> Discovery:
+    """Decode and validate a Device Discovery Announcement message."""
+    return _decode_discovery_decoder.decode(data)
+
+
+_decode_heartbeat_decoder = msgspec.json.Decoder(Heartbeat)
+
+
+def decode_heartbeat(data: bytes) -> Heartbeat:
+    """Decode and validate a Device Heartbeat message."""
+    return _decode_heartbeat_decoder.decode(data)
+
+
+def schema_key(schema_id: str) -> str:
+    """Normalize a schema id to its ``hal/<category>/<name>/<version>`` suffix.
+
+    Accepts both full ``$id`` URLs and short ids such as
+    ``tafylabs/hal/motor/differential/1.0``.
+    """
+    index = schema_id.find("hal/")
+    return schema_id[index:] if index >= 0 else schema_id
+
+
+# Payload Structs keyed by schema $id
+PAYLOAD_TYPES: Dict[str, Type[Struct]] = {
+    "https://tafy.studio/schemas/hal/camera/control/1.0": Control,
+    "https://tafy.studio/schemas/hal/camera/frame/1.0": Frame,
+    "https://tafy.studio/schemas/hal/camera/status/1.0": Status,
+    "https://tafy.studio/schemas/hal/motor/differential-telemetry/1.0": DifferentialTelemetry,
+    "https://tafy.studio/schemas/hal/motor/differential/1.0": Differential,
+    "https://tafy.studio/schemas/hal/sensor/imu/1.0": Imu,
+    "https://tafy.studio/schemas/hal/sensor/range-tof/1.0": RangeTof,
+    "https://tafy.studio/schemas/hal/system/discovery/1.0": Discovery,
+    "https://tafy.studio/schemas/hal/system/heartbeat/1.0": Heartbeat,
+}
+
+_PAYLOAD_DECODERS: Dict[str, msgspec.json.Decoder] = {
+    schema_key(schema_id): msgspec.json.Decoder(struct_type)
+    for schema_id, struct_type in PAYLOAD_TYPES.items()
+}
+
+
+def decode_payload(schema_id: str, data: bytes) -> Struct:
+    """Decode and validate a payload for a schema id."""
+    decoder = _PAYLOAD_DECODERS.get(schema_key(schema_id))
+    if decoder is None:
+        raise KeyError(f"Unknown HAL schema: {schema_id}")
+    return decoder.decode(data)
+
+
+def decode_message(data: bytes) -> Tuple[Envelope, Struct]:
+    """Decode and validate an envelope and its payload in one pass over the bytes."""
+    envelope = decode_envelope(data)
+    return envelope, decode_payload(envelope.schema, envelope.payload)
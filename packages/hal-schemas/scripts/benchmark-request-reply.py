@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark the Python request/reply client as in-flight requests scale.
+
+Runs entirely in-process: replies are looped back on the event loop, so the
+numbers measure client overhead (correlation, timers, admission), not NATS.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from request_reply import HALRequestReplyClient  # noqa: E402
+
+
+class LoopbackClient(HALRequestReplyClient):
+    """Replies to every request on the next loop iteration, or never"""
+
+    def __init__(self, reply: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.reply = reply
+
+    async def send_request(self, message, subject=None):
+        if self.reply:
+            asyncio.get_running_loop().call_soon(
+                self.handle_message, self.create_reply(message, {"ok": True})
+            )
+
+
+def make_request(seq: int):
+    return {
+        "hal_major": 1,
+        "hal_minor": 0,
+        "schema": "tafylabs/hal/motor/differential/1.0",
+        "device_id": "bench-motor",
+        "caps": ["motor.differential:v1.0"],
+        "ts": "2025-01-01T00:00:00Z",
+        "seq": seq,
+        "payload": {"linear_meters_per_sec": 0.1, "angular_rad_per_sec": 0.0},
+    }
+
+
+async def bench_replies(in_flight: int, max_in_flight):
+    """Time ``in_flight`` concurrent requests that are all answered"""
+    client = LoopbackClient(max_in_flight=max_in_flight)
+    start = time.perf_counter()
+    await asyncio.gather(*(client.request(make_request(i)) for i in range(in_flight)))
+    elapsed = time.perf_counter() - start
+    assert client.in_flight == 0
+    return elapsed
+
+
+async def bench_timeouts(in_flight: int, timeout: float):
+    """Time ``in_flight`` concurrent requests that all time out"""
+    client = LoopbackClient(reply=False)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(client.request(make_request(i), timeout=timeout) for i in range(in_flight)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    assert all(isinstance(r, TimeoutError) for r in results)
+    assert client.in_flight == 0 and len(client._timeouts) == 0
+    return elapsed
+
+
+async def run(sizes, max_in_flight, timeout):
+    print(f"{'in-flight':>10} {'replied (s)':>12} {'req/s':>10} {'timed out (s)':>14} {'overhead (s)':>13}")
+    for size in sizes:
+        replied = await bench_replies(size, max_in_flight)
+        timed_out = await bench_timeouts(size, timeout)
+        print(
+            f"{size:>10} {replied:>12.4f} {size / replied:>10.0f} "
+            f"{timed_out:>14.4f} {timed_out - timeout:>13.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000, 50000],
+        help="numbers of concurrent requests to test",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="admission limit for the replied runs (default: unlimited)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=0.1,
+        help="request timeout for the timed out runs, in seconds",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.max_in_flight, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
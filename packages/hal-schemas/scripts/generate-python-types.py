@@ -91,6 +91,187 @@ def generate_pydantic_model(schema: Dict[str, Any], class_name: str) -> str:
     
     return "\n".join(lines)
 
+def msgspec_constraints(prop_schema: Dict[str, Any]) -> List[str]:
+    """Map JSON Schema validation keywords to msgspec.Meta arguments."""
+    keyword_map = {
+        "minimum": "ge",
+        "maximum": "le",
+        "exclusiveMinimum": "gt",
+        "exclusiveMaximum": "lt",
+        "minLength": "min_length",
+        "maxLength": "max_length",
+        "minItems": "min_length",
+        "maxItems": "max_length",
+        "pattern": "pattern",
+    }
+    return [
+        f"{meta_name}={prop_schema[keyword]!r}"
+        for keyword, meta_name in keyword_map.items()
+        if keyword in prop_schema
+    ]
+
+def msgspec_field_type(
+    prop_schema: Dict[str, Any],
+    class_name: str,
+    structs: List[str],
+) -> str:
+    """Build the msgspec type annotation for a property, emitting nested structs."""
+    json_type = prop_schema.get("type", "Any")
+
+    if "enum" in prop_schema:
+        field_type = "Literal[" + ", ".join(repr(v) for v in prop_schema["enum"]) + "]"
+    elif json_type == "object" and prop_schema.get("properties"):
+        generate_msgspec_struct(prop_schema, class_name, structs)
+        field_type = class_name
+    elif json_type == "array":
+        item_type = msgspec_field_type(
+            prop_schema.get("items", {}), f"{class_name}Item", structs
+        )
+        field_type = f"List[{item_type}]"
+    else:
+        field_type = json_type_to_python(json_type, prop_schema.get("format"))
+
+    constraints = msgspec_constraints(prop_schema)
+    if constraints and "enum" not in prop_schema:
+        field_type = f"Annotated[{field_type}, Meta({', '.join(constraints)})]"
+    return field_type
+
+def generate_msgspec_struct(
+    schema: Dict[str, Any],
+    class_name: str,
+    structs: List[str],
+    raw_fields: frozenset = frozenset(),
+) -> None:
+    """Generate a msgspec Struct (and any nested Structs) from a JSON schema.
+
+    Nested objects become their own Struct named after the parent class and
+    property. Optional properties default to UNSET so that absent fields are
+    accepted but explicit nulls are not. Properties listed in ``raw_fields``
+    are kept as undecoded ``msgspec.Raw`` JSON.
+    """
+    properties = schema.get("properties", {})
+    required = set(schema.get("required", []))
+
+    options = ["kw_only=True", "omit_defaults=True"]
+    if schema.get("additionalProperties") is False:
+        options.append("forbid_unknown_fields=True")
+
+    lines = [f"class {class_name}(Struct, {', '.join(options)}):"]
+    description = schema.get("description", "")
+    if description:
+        lines.append(f'    """{description}"""')
+        lines.append("")
+
+    if not properties:
+        lines.append("    pass")
+
+    for prop_name, prop_schema in properties.items():
+        nested_name = class_name + "".join(
+            word.capitalize() for word in prop_name.split("_")
+        )
+        if prop_name in raw_fields:
+            field_type = "Raw"
+        else:
+            field_type = msgspec_field_type(prop_schema, nested_name, structs)
+
+        if prop_name in required:
+            lines.append(f"    {prop_name}: {field_type}")
+        elif "default" in prop_schema:
+            lines.append(f"    {prop_name}: {field_type} = {prop_schema['default']!r}")
+        else:
+            lines.append(f"    {prop_name}: Union[{field_type}, UnsetType] = UNSET")
+
+    structs.append("\n".join(lines))
+
+def generate_msgspec_module(schemas: List[Dict[str, Any]], output_path: Path):
+    """Generate a single module of msgspec Structs and decoders for all schemas.
+
+    The envelope's payload is kept as raw JSON so ``decode_message`` can
+    validate the payload straight from the wire with the decoder registered
+    for the envelope's ``schema`` id, without building an intermediate dict.
+    """
+    structs: List[str] = []
+    registry = []
+    decoders = []
+
+    for schema_path, schema in schemas:
+        class_name = "".join(word.capitalize() for word in schema_path.stem.split("-"))
+        raw_fields = frozenset({"payload"}) if class_name == "Envelope" else frozenset()
+        generate_msgspec_struct(schema, class_name, structs, raw_fields)
+
+        func_name = f"decode_{schema_path.stem.replace('-', '_')}"
+        decoders.append(
+            f"_{func_name}_decoder = msgspec.json.Decoder({class_name})\n"
+            f"\n"
+            f"\n"
+            f"def {func_name}(data: bytes) -> {class_name}:\n"
+            f'    """Decode and validate a {schema.get("title", class_name)} message."""\n'
+            f"    return _{func_name}_decoder.decode(data)"
+        )
+        if class_name != "Envelope" and "$id" in schema:
+            registry.append(f'    "{schema["$id"]}": {class_name},')
+
+    header = [
+        "# Generated from JSON Schema - DO NOT EDIT",
+        '"""msgspec Struct equivalents of the HAL schemas for hot decode paths."""',
+        "",
+        "from datetime import datetime",
+        "from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Type, Union",
+        "",
+        "import msgspec",
+        "from msgspec import UNSET, Meta, Raw, Struct, UnsetType",
+    ]
+
+    footer = [
+        "# Payload Structs keyed by schema $id",
+        "PAYLOAD_TYPES: Dict[str, Type[Struct]] = {",
+        *registry,
+        "}",
+        "",
+        "_PAYLOAD_DECODERS: Dict[str, msgspec.json.Decoder] = {",
+        "    schema_key(schema_id): msgspec.json.Decoder(struct_type)",
+        "    for schema_id, struct_type in PAYLOAD_TYPES.items()",
+        "}",
+        "",
+        "",
+        "def decode_payload(schema_id: str, data: bytes) -> Struct:",
+        '    """Decode and validate a payload for a schema id."""',
+        "    decoder = _PAYLOAD_DECODERS.get(schema_key(schema_id))",
+        "    if decoder is None:",
+        '        raise KeyError(f"Unknown HAL schema: {schema_id}")',
+        "    return decoder.decode(data)",
+        "",
+        "",
+        "def decode_message(data: bytes) -> Tuple[Envelope, Struct]:",
+        '    """Decode and validate an envelope and its payload in one pass over the bytes."""',
+        "    envelope = decode_envelope(data)",
+        "    return envelope, decode_payload(envelope.schema, envelope.payload)",
+    ]
+
+    schema_key = [
+        "def schema_key(schema_id: str) -> str:",
+        '    """Normalize a schema id to its ``hal/<category>/<name>/<version>`` suffix.',
+        "",
+        "    Accepts both full ``$id`` URLs and short ids such as",
+        "    ``tafylabs/hal/motor/differential/1.0``.",
+        '    """',
+        '    index = schema_id.find("hal/")',
+        "    return schema_id[index:] if index >= 0 else schema_id",
+    ]
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        f.write("\n".join(header))
+        f.write("\n\n\n")
+        f.write("\n\n\n".join(structs))
+        f.write("\n\n\n")
+        f.write("\n\n\n".join(decoders))
+        f.write("\n\n\n")
+        f.write("\n".join(schema_key))
+        f.write("\n\n\n")
+        f.write("\n".join(footer))
+        f.write("\n")
+
 def process_schema_file(schema_path: Path, output_path: Path):
     """Process a single schema file."""
     with open(schema_path) as f:
@@ -132,6 +313,8 @@ def main():
     init_file = output_dir / "__init__.py"
     init_imports = []
     
+    loaded_schemas = []
+
     # Process all schema files
     for schema_file in schemas_dir.rglob("*.json"):
         relative_path = schema_file.relative_to(schemas_dir)
@@ -139,6 +322,9 @@ def main():
         
         print(f"Generating: {output_file}")
         process_schema_file(schema_file, output_file)
+
+        with open(schema_file) as f:
+            loaded_schemas.append((schema_file, json.load(f)))
         
         # Add to imports
         module_path = str(relative_path.with_suffix("")).replace("/", ".")
@@ -157,6 +343,13 @@ def main():
             f.write(f'    "{class_name}",\n')
         f.write("]\n")
     
+    # Write msgspec Structs for hot decode paths
+    structs_file = output_dir / "structs.py"
+    print(f"Generating: {structs_file}")
+    generate_msgspec_module(
+        sorted(loaded_schemas, key=lambda item: str(item[0])), structs_file
+    )
+
     print("✅ Python types generated successfully!")
 
 if __name__ == "__main__":
@@ -1,95 +1,278 @@
 import asyncio
+import itertools
 import json
-import uuid
-from typing import Dict, Optional, TypeVar, Generic, Callable, Any
+import math
+import os
+import random
+from typing import Dict, List, Optional, Tuple, TypeVar, Generic, Callable, Any, Hashable
 from datetime import datetime
 
-from .types import HALMessageEnvelope
+# Replies are decoded HAL envelopes
+T = TypeVar('T', bound=Dict[str, Any])
 
-T = TypeVar('T', bound=HALMessageEnvelope)
+# Default JSON codec: orjson when installed, stdlib otherwise
+try:
+    import orjson
+
+    default_dumps: Callable[[Any], bytes] = orjson.dumps
+    default_loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:  # pragma: no cover - depends on optional dependency
+    def default_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    default_loads = json.loads
+
+
+class TimingWheel:
+    """Hashed timing wheel for request timeouts
+
+    Timers are hashed into ``slots`` buckets of ``tick`` seconds each, so
+    scheduling and cancelling are O(1) dict operations. A single loop timer
+    drives the wheel and is only armed while timers are pending; timers
+    further out than one rotation stay in their bucket until their tick.
+    Expiry may be up to one ``tick`` late.
+    """
+
+    def __init__(self, tick: float = 0.01, slots: int = 512):
+        self.tick = tick
+        self._slots: List[Dict[Hashable, Tuple[int, Callable[[Hashable], None]]]] = [
+            {} for _ in range(slots)
+        ]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._origin = 0.0
+        self._cursor = 0
+        self._count = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _current_tick(self) -> int:
+        return int((self._loop.time() - self._origin) / self.tick)
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[Hashable], None]) -> int:
+        """Call ``callback(key)`` after ``delay`` seconds; returns the slot for cancel()"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._origin = self._loop.time()
+        if self._handle is None:
+            # Idle wheel: skip the ticks that passed with nothing scheduled
+            self._cursor = self._current_tick()
+
+        target = max(
+            self._cursor + 1,
+            math.ceil((self._loop.time() + delay - self._origin) / self.tick),
+        )
+        slot = target % len(self._slots)
+        self._slots[slot][key] = (target, callback)
+        self._count += 1
+
+        if self._handle is None:
+            self._arm()
+        return slot
+
+    def cancel(self, key: Hashable, slot: int) -> bool:
+        """Cancel a pending timer; returns False if it already fired"""
+        if self._slots[slot].pop(key, None) is None:
+            return False
+        self._count -= 1
+        if not self._count and self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        return True
+
+    def clear(self) -> None:
+        """Drop all pending timers without calling them"""
+        for bucket in self._slots:
+            bucket.clear()
+        self._count = 0
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _arm(self) -> None:
+        self._handle = self._loop.call_at(
+            self._origin + (self._cursor + 1) * self.tick, self._advance
+        )
+
+    def _advance(self) -> None:
+        self._handle = None
+        now = self._current_tick()
+        # After a stall every bucket needs at most one visit
+        first = max(self._cursor + 1, now - len(self._slots) + 1)
+        self._cursor = now
+
+        for tick in range(first, now + 1):
+            bucket = self._slots[tick % len(self._slots)]
+            if not bucket:
+                continue
+            expired = [key for key, (target, _) in bucket.items() if target <= now]
+            for key in expired:
+                _, callback = bucket.pop(key)
+                self._count -= 1
+                callback(key)
+
+        if self._count and self._handle is None:
+            self._arm()
 
 
 class ReplyHandler:
     """Handler for pending replies"""
-    def __init__(self, future: asyncio.Future, retries: int = 0):
+    __slots__ = ("future", "timeout", "timer_slot")
+
+    def __init__(self, future: asyncio.Future, timeout: float):
         self.future = future
-        self.retries = retries
-        self.timer_handle: Optional[asyncio.TimerHandle] = None
+        self.timeout = timeout
+        self.timer_slot = -1
 
 
 class HALRequestReplyClient(Generic[T]):
-    """Base class for HAL request/reply pattern"""
+    """Base class for HAL request/reply pattern
+
+    Correlation IDs are a per-client random prefix plus a counter. Timeouts
+    live on a shared timing wheel instead of one loop timer per request, and
+    retries run in a loop inside ``request`` with exponential backoff and
+    full jitter, each attempt under a fresh correlation ID. With
+    ``max_in_flight`` set, ``request`` waits for a free slot before sending;
+    the slot is held until the request (including retries) completes.
+    ``request_many`` scatters one request per subject and gathers the
+    per-subject results.
+    """
     
-    def __init__(self, default_timeout: float = 5.0, default_retries: int = 0):
+    def __init__(
+        self,
+        default_timeout: float = 5.0,
+        default_retries: int = 0,
+        max_in_flight: Optional[int] = None,
+        retry_backoff: float = 0.05,
+        retry_backoff_max: float = 2.0,
+        timer_resolution: float = 0.01
+    ):
         self.pending_requests: Dict[str, ReplyHandler] = {}
         self.default_timeout = default_timeout
         self.default_retries = default_retries
+        self.max_in_flight = max_in_flight
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self._timeouts = TimingWheel(tick=timer_resolution)
+        self._admission = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self._id_prefix = os.urandom(4).hex() + "-"
+        self._ids = itertools.count(1)
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of requests waiting for a reply"""
+        return len(self.pending_requests)
+    
+    def next_correlation_id(self) -> str:
+        """Return a new correlation ID, unique for this client"""
+        return f"{self._id_prefix}{next(self._ids)}"
+    
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff before retry number ``attempt`` (1-based), with full jitter"""
+        ceiling = min(self.retry_backoff_max, self.retry_backoff * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
     
     async def request(
         self,
         message: Dict[str, Any],
         timeout: Optional[float] = None,
-        retries: Optional[int] = None
+        retries: Optional[int] = None,
+        subject: Optional[str] = None
     ) -> T:
         """Send a request and wait for a reply"""
-        correlation_id = str(uuid.uuid4())
-        timeout = timeout or self.default_timeout
-        retries = retries or self.default_retries
-        
-        # Add correlation ID to message
-        request_message = {**message, "correlation_id": correlation_id}
-        
-        # Create future for reply
-        loop = asyncio.get_event_loop()
-        future = loop.create_future()
-        handler = ReplyHandler(future, retries)
-        
-        # Set timeout
-        async def timeout_handler():
-            if correlation_id in self.pending_requests:
-                del self.pending_requests[correlation_id]
-                if handler.retries > 0:
-                    # Retry
-                    handler.retries -= 1
-                    try:
-                        result = await self.request(
-                            message,
-                            timeout=timeout,
-                            retries=handler.retries
-                        )
-                        future.set_result(result)
-                    except Exception as e:
-                        future.set_exception(e)
-                else:
-                    future.set_exception(
-                        TimeoutError(f"Request timeout after {timeout}s")
-                    )
+        timeout = self.default_timeout if timeout is None else timeout
+        retries = self.default_retries if retries is None else retries
         
-        handler.timer_handle = loop.call_later(timeout, lambda: asyncio.create_task(timeout_handler()))
-        self.pending_requests[correlation_id] = handler
-        
-        # Send the request
-        await self.send_request(request_message)
+        if self._admission is None:
+            return await self._request(message, timeout, retries, subject)
+        async with self._admission:
+            return await self._request(message, timeout, retries, subject)
+    
+    async def request_many(
+        self,
+        requests: Dict[str, Dict[str, Any]],
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Send one request per subject concurrently and gather the replies
         
-        return await future
+        Returns a dict keyed like ``requests`` holding each reply, or the
+        exception (e.g. ``TimeoutError``) for subjects that did not answer.
+        """
+        subjects = list(requests)
+        results = await asyncio.gather(
+            *(
+                self.request(requests[subject], timeout, retries, subject)
+                for subject in subjects
+            ),
+            return_exceptions=True
+        )
+        return dict(zip(subjects, results))
+    
+    async def _request(
+        self,
+        message: Dict[str, Any],
+        timeout: float,
+        retries: int,
+        subject: Optional[str]
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            correlation_id = self.next_correlation_id()
+            handler = ReplyHandler(loop.create_future(), timeout)
+            handler.timer_slot = self._timeouts.schedule(correlation_id, timeout, self._expire)
+            self.pending_requests[correlation_id] = handler
+            
+            try:
+                # Add correlation ID to message and send
+                await self.send_request(
+                    {**message, "correlation_id": correlation_id}, subject
+                )
+                return await handler.future
+            except TimeoutError:
+                if attempt >= retries:
+                    raise
+            finally:
+                if self.pending_requests.pop(correlation_id, None) is not None:
+                    self._timeouts.cancel(correlation_id, handler.timer_slot)
+            
+            attempt += 1
+            await asyncio.sleep(self.retry_delay(attempt))
+    
+    def _expire(self, correlation_id: Hashable) -> None:
+        handler = self.pending_requests.pop(correlation_id, None)
+        if handler and not handler.future.done():
+            handler.future.set_exception(
+                TimeoutError(f"Request timeout after {handler.timeout}s")
+            )
     
     def handle_message(self, message: Dict[str, Any]) -> bool:
         """Handle an incoming message that might be a reply"""
         correlation_id = message.get("correlation_id")
         if not correlation_id:
             return False
-        
-        handler = self.pending_requests.get(correlation_id)
+        return self.resolve(correlation_id, message)
+    
+    def resolve(
+        self,
+        correlation_id: str,
+        reply: Any = None,
+        error: Optional[BaseException] = None
+    ) -> bool:
+        """Complete the pending request for a correlation ID"""
+        handler = self.pending_requests.pop(correlation_id, None)
         if not handler:
             return False
         
-        # Cancel timeout and remove from pending
-        if handler.timer_handle:
-            handler.timer_handle.cancel()
-        del self.pending_requests[correlation_id]
-        
-        # Resolve the future
-        handler.future.set_result(message)
+        # Cancel timeout and resolve the future
+        self._timeouts.cancel(correlation_id, handler.timer_slot)
+        if not handler.future.done():
+            if error is not None:
+                handler.future.set_exception(error)
+            else:
+                handler.future.set_result(reply)
         return True
     
     def create_reply(
@@ -110,42 +293,96 @@ class HALRequestReplyClient(Generic[T]):
     
     def cancel_all(self, reason: str = "Cancelled") -> None:
         """Cancel all pending requests"""
-        for correlation_id, handler in list(self.pending_requests.items()):
-            if handler.timer_handle:
-                handler.timer_handle.cancel()
-            handler.future.set_exception(Exception(reason))
+        self._timeouts.clear()
+        for handler in self.pending_requests.values():
+            if not handler.future.done():
+                handler.future.set_exception(Exception(reason))
         self.pending_requests.clear()
     
-    async def send_request(self, message: Dict[str, Any]) -> None:
+    async def send_request(self, message: Dict[str, Any], subject: Optional[str] = None) -> None:
         """Override this method to implement actual message sending"""
         raise NotImplementedError("send_request must be implemented by subclass")
 
 
 class NATSHALRequestReplyClient(HALRequestReplyClient):
-    """NATS-specific implementation of request/reply client"""
+    """NATS-specific implementation of request/reply client
+    
+    Replies arrive either on a caller-chosen subject
+    (``subscribe_to_replies``), matched by the ``correlation_id`` in the
+    decoded body, or on a client-owned ``_INBOX.<uid>.*`` wildcard
+    (``subscribe_to_inbox``). In inbox mode each request is published with
+    reply subject ``_INBOX.<uid>.<correlation_id>`` and replies are routed by
+    that last token, so unknown or late replies are dropped without decoding.
+    """
     
     def __init__(
         self,
         nats_client,
         request_subject: str,
         default_timeout: float = 5.0,
-        default_retries: int = 0
+        default_retries: int = 0,
+        dumps: Optional[Callable[[Any], bytes]] = None,
+        loads: Optional[Callable[[bytes], Any]] = None,
+        **kwargs
     ):
-        super().__init__(default_timeout, default_retries)
+        super().__init__(default_timeout, default_retries, **kwargs)
         self.nats_client = nats_client
         self.request_subject = request_subject
         self._subscription = None
+        self._inbox_subscription = None
+        self._inbox_prefix: Optional[str] = None
+        self.unmatched_replies = 0
+        # Pluggable JSON codec, e.g. the hub's app.core.codec.dumps/loads
+        self.dumps = dumps or default_dumps
+        self.loads = loads or default_loads
+    
+    @property
+    def inbox(self) -> Optional[str]:
+        """Wildcard inbox subject, when inbox mode is active"""
+        return f"{self._inbox_prefix}*" if self._inbox_prefix else None
     
-    async def send_request(self, message: Dict[str, Any]) -> None:
+    async def send_request(self, message: Dict[str, Any], subject: Optional[str] = None) -> None:
         """Send request via NATS"""
-        data = json.dumps(message).encode()
-        await self.nats_client.publish(self.request_subject, data)
+        data = self.dumps(message)
+        subject = subject or self.request_subject
+        if self._inbox_prefix:
+            reply = self._inbox_prefix + message["correlation_id"]
+            await self.nats_client.publish(subject, data, reply=reply)
+        else:
+            await self.nats_client.publish(subject, data)
+    
+    async def subscribe_to_inbox(self) -> str:
+        """Switch to inbox mode: one wildcard subscription for all replies"""
+        if self._inbox_prefix:
+            return self.inbox
+        
+        new_inbox = getattr(self.nats_client, "new_inbox", None)
+        inbox = new_inbox() if new_inbox else f"_INBOX.{os.urandom(11).hex()}"
+        prefix = inbox + "."
+        prefix_len = len(prefix)
+        
+        async def inbox_handler(msg):
+            token = msg.subject[prefix_len:]
+            if token not in self.pending_requests:
+                self.unmatched_replies += 1
+                return
+            try:
+                self.resolve(token, self.loads(msg.data))
+            except Exception as e:
+                self.resolve(token, error=ValueError(f"Invalid reply: {e}"))
+        
+        self._inbox_subscription = await self.nats_client.subscribe(
+            prefix + "*",
+            cb=inbox_handler
+        )
+        self._inbox_prefix = prefix
+        return self.inbox
     
     async def subscribe_to_replies(self, reply_subject: str) -> None:
         """Subscribe to reply subjects and handle incoming messages"""
         async def message_handler(msg):
             try:
-                message = json.loads(msg.data.decode())
+                message = self.loads(msg.data)
                 self.handle_message(message)
             except Exception as e:
                 print(f"Failed to parse reply message: {e}")
@@ -159,4 +396,8 @@ class NATSHALRequestReplyClient(HALRequestReplyClient):
         """Clean up subscriptions"""
         if self._subscription:
             await self._subscription.unsubscribe()
+        if self._inbox_subscription:
+            await self._inbox_subscription.unsubscribe()
+            self._inbox_subscription = None
+            self._inbox_prefix = None
         self.cancel_all("Client closed")
\ No newline at end of file
@@ -0,0 +1,318 @@
+"""
+Tests for the Python HAL request/reply client
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from request_reply import (  # noqa: E402
+    HALRequestReplyClient,
+    NATSHALRequestReplyClient,
+    TimingWheel,
+    default_dumps,
+    default_loads,
+)
+
+
+class RecordingClient(HALRequestReplyClient):
+    """Records every request it sends and never replies on its own"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+
+    async def send_request(self, message, subject=None):
+        self.sent.append((subject, message))
+
+    def reply(self, index, payload):
+        _, message = self.sent[index]
+        return self.handle_message(self.create_reply(message, payload))
+
+
+class FakeMsg:
+    def __init__(self, subject, data):
+        self.subject = subject
+        self.data = data
+
+
+class FakeSubscription:
+    def __init__(self, subject, cb):
+        self.subject = subject
+        self.cb = cb
+        self.unsubscribed = False
+
+    async def unsubscribe(self):
+        self.unsubscribed = True
+
+
+class FakeNATS:
+    """In-process stand-in for a nats-py client"""
+
+    def __init__(self):
+        self.published = []
+        self.subscriptions = []
+
+    def new_inbox(self):
+        return "_INBOX.test"
+
+    async def publish(self, subject, data, reply=""):
+        self.published.append((subject, default_loads(data), reply))
+
+    async def subscribe(self, subject, cb):
+        sub = FakeSubscription(subject, cb)
+        self.subscriptions.append(sub)
+        return sub
+
+    async def deliver(self, subject, payload):
+        """Deliver a message to the (single) subscription"""
+        data = payload if isinstance(payload, bytes) else default_dumps(payload)
+        await self.subscriptions[0].cb(FakeMsg(subject, data))
+
+
+@pytest.mark.asyncio
+async def test_timing_wheel_timeout_longer_than_one_rotation():
+    """Timers further out than one rotation wait for their own tick"""
+    wheel = TimingWheel(tick=0.01, slots=4)
+    loop = asyncio.get_running_loop()
+    fired = {}
+
+    start = loop.time()
+    wheel.schedule("long", 0.1, lambda key: fired.setdefault(key, loop.time()))
+    wheel.schedule("short", 0.02, lambda key: fired.setdefault(key, loop.time()))
+
+    # The long timer shares a bucket with ticks that come up before it is due
+    await asyncio.sleep(0.06)
+    assert "short" in fired
+    assert "long" not in fired
+    assert len(wheel) == 1
+
+    await asyncio.sleep(0.08)
+    assert fired["long"] - start >= 0.1 - 0.005
+    assert len(wheel) == 0
+
+
+@pytest.mark.asyncio
+async def test_timing_wheel_cancel():
+    """Cancelled timers never fire"""
+    wheel = TimingWheel(tick=0.01, slots=4)
+    fired = []
+
+    slot = wheel.schedule("key", 0.02, fired.append)
+    assert wheel.cancel("key", slot)
+    assert not wheel.cancel("key", slot)
+    await asyncio.sleep(0.04)
+    assert fired == []
+    assert len(wheel) == 0
+
+
+@pytest.mark.asyncio
+async def test_request_reply():
+    """A reply with the request's correlation ID resolves the request"""
+    client = RecordingClient(default_timeout=1.0)
+    task = asyncio.create_task(client.request({"cmd": "ping"}, subject="node.n1.ping"))
+    await asyncio.sleep(0)
+
+    subject, message = client.sent[0]
+    assert subject == "node.n1.ping"
+    assert message["cmd"] == "ping"
+    assert client.reply(0, {"pong": True})
+    assert (await task)["payload"] == {"pong": True}
+    assert client.in_flight == 0
+    assert len(client._timeouts) == 0
+
+    # Late replies are ignored
+    assert not client.reply(0, {"pong": True})
+
+
+@pytest.mark.asyncio
+async def test_request_retries_with_backoff(monkeypatch):
+    """Each retry waits a jittered backoff and uses a fresh correlation ID"""
+    client = RecordingClient(default_timeout=0.02, default_retries=2, timer_resolution=0.005)
+    delays = []
+    retry_delay = client.retry_delay
+
+    def record_delay(attempt):
+        delays.append(attempt)
+        return retry_delay(attempt)
+
+    monkeypatch.setattr(client, "retry_delay", record_delay)
+    monkeypatch.setattr("request_reply.random.uniform", lambda low, high: high / 10)
+
+    with pytest.raises(TimeoutError):
+        await client.request({"cmd": "ping"})
+
+    assert len(client.sent) == 3
+    assert len({message["correlation_id"] for _, message in client.sent}) == 3
+    assert delays == [1, 2]
+    assert client.in_flight == 0
+    assert len(client._timeouts) == 0
+
+
+def test_retry_delay_is_capped(monkeypatch):
+    """Backoff doubles per attempt up to retry_backoff_max"""
+    monkeypatch.setattr("request_reply.random.uniform", lambda low, high: high)
+    client = RecordingClient(retry_backoff=0.05, retry_backoff_max=0.3)
+    assert [client.retry_delay(attempt) for attempt in (1, 2, 3, 4, 5)] == [0.05, 0.1, 0.2, 0.3, 0.3]
+
+
+@pytest.mark.asyncio
+async def test_request_retry_succeeds():
+    """A reply to a later attempt completes the request"""
+    client = RecordingClient(default_timeout=0.02, default_retries=1, retry_backoff=0.001,
+                             timer_resolution=0.005)
+    task = asyncio.create_task(client.request({"cmd": "ping"}))
+    while len(client.sent) < 2:
+        await asyncio.sleep(0.005)
+
+    # The first attempt already timed out
+    assert not client.reply(0, {"attempt": 1})
+    assert client.reply(1, {"attempt": 2})
+    assert (await task)["payload"] == {"attempt": 2}
+
+
+@pytest.mark.asyncio
+async def test_admission_limit():
+    """No more than max_in_flight requests are sent at once"""
+    client = RecordingClient(default_timeout=1.0, max_in_flight=2)
+    tasks = [asyncio.create_task(client.request({"seq": seq})) for seq in range(5)]
+    await asyncio.sleep(0.01)
+    assert len(client.sent) == 2
+    assert client.in_flight == 2
+
+    # Each completed request lets one waiting request through
+    client.reply(0, {})
+    await asyncio.sleep(0.01)
+    assert len(client.sent) == 3
+    assert client.in_flight == 2
+
+    for index in range(1, 5):
+        client.reply(index, {})
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*tasks)
+    assert len(client.sent) == 5
+    assert client.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_cleans_up():
+    """Cancelling a request removes its pending entry, timer and admission slot"""
+    client = RecordingClient(default_timeout=1.0, max_in_flight=1)
+    task = asyncio.create_task(client.request({"cmd": "ping"}))
+    await asyncio.sleep(0)
+    assert client.in_flight == 1
+    assert len(client._timeouts) == 1
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert client.in_flight == 0
+    assert len(client._timeouts) == 0
+    assert not client.reply(0, {})
+
+    # The admission slot was released
+    task = asyncio.create_task(client.request({"cmd": "ping"}))
+    await asyncio.sleep(0)
+    assert client.reply(1, {"pong": True})
+    assert (await task)["payload"] == {"pong": True}
+
+
+@pytest.mark.asyncio
+async def test_inbox_routes_replies_by_token():
+    """Replies are matched by the last token of the inbox subject, not the body"""
+    nats = FakeNATS()
+    client = NATSHALRequestReplyClient(nats, "hal.v1.motor.cmd", default_timeout=1.0)
+    assert await client.subscribe_to_inbox() == "_INBOX.test.*"
+    assert await client.subscribe_to_inbox() == "_INBOX.test.*"
+    assert [sub.subject for sub in nats.subscriptions] == ["_INBOX.test.*"]
+
+    first = asyncio.create_task(client.request({"seq": 1}))
+    second = asyncio.create_task(client.request({"seq": 2}))
+    await asyncio.sleep(0)
+    (_, request_a, reply_a), (_, request_b, reply_b) = nats.published
+    assert reply_a == "_INBOX.test." + request_a["correlation_id"]
+    assert reply_b == "_INBOX.test." + request_b["correlation_id"]
+
+    # Answer out of order; the body carries no correlation ID
+    await nats.deliver(reply_b, {"answer": 2})
+    await nats.deliver(reply_a, {"answer": 1})
+    assert await first == {"answer": 1}
+    assert await second == {"answer": 2}
+    assert client.unmatched_replies == 0
+
+    await client.close()
+    assert nats.subscriptions[0].unsubscribed
+    assert client.inbox is None
+
+
+@pytest.mark.asyncio
+async def test_inbox_drops_late_and_unknown_replies():
+    """Replies without a pending request are counted and never decoded"""
+    nats = FakeNATS()
+    decoded = []
+
+    def loads(data):
+        decoded.append(data)
+        return default_loads(data)
+
+    client = NATSHALRequestReplyClient(
+        nats, "hal.v1.motor.cmd", default_timeout=0.02, loads=loads, timer_resolution=0.005
+    )
+    await client.subscribe_to_inbox()
+
+    with pytest.raises(TimeoutError):
+        await client.request({"seq": 1})
+    _, _, reply = nats.published[0]
+
+    await nats.deliver(reply, {"answer": "late"})
+    await nats.deliver("_INBOX.test.unknown", {"answer": "stray"})
+    assert client.unmatched_replies == 2
+    assert decoded == []
+    assert client.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_inbox_invalid_reply_fails_request():
+    """A reply that cannot be decoded fails its request instead of hanging"""
+    nats = FakeNATS()
+    client = NATSHALRequestReplyClient(nats, "hal.v1.motor.cmd", default_timeout=1.0)
+    await client.subscribe_to_inbox()
+
+    task = asyncio.create_task(client.request({"seq": 1}))
+    await asyncio.sleep(0)
+    _, _, reply = nats.published[0]
+    await nats.deliver(reply, b"not json")
+    with pytest.raises(ValueError):
+        await task
+    assert client.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_request_many_partial_timeouts():
+    """Subjects that answer return replies; the others return TimeoutError"""
+    nats = FakeNATS()
+    client = NATSHALRequestReplyClient(
+        nats, "hal.v1.motor.cmd", default_timeout=0.05, timer_resolution=0.005
+    )
+    await client.subscribe_to_inbox()
+
+    subjects = ["node.n1.ping", "node.n2.ping", "node.n3.ping"]
+    task = asyncio.create_task(client.request_many({subject: {"cmd": "ping"} for subject in subjects}))
+    await asyncio.sleep(0.01)
+    assert [subject for subject, _, _ in nats.published] == subjects
+
+    for subject, _, reply in nats.published:
+        if subject != "node.n2.ping":
+            await nats.deliver(reply, {"from": subject})
+
+    results = await task
+    assert list(results) == subjects
+    assert results["node.n1.ping"] == {"from": "node.n1.ping"}
+    assert results["node.n3.ping"] == {"from": "node.n3.ping"}
+    assert isinstance(results["node.n2.ping"], TimeoutError)
+    assert client.in_flight == 0
+    assert len(client._timeouts) == 0